@@ -0,0 +1,93 @@
+"""Онлайн-бэкапы базы через sqlite3 backup API с ротацией и проверкой копии."""
+import asyncio
+import glob
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from config import BACKUP_DIR, BACKUP_INTERVAL_HOURS, BACKUP_KEEP, BACKUP_PAGES_PER_STEP
+from database import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Не запускаем две копии одновременно (плановая + ручная по команде)
+_backup_lock = asyncio.Lock()
+
+
+def _copy_database(target_path):
+    """Скопировать базу порциями страниц. Между шагами блокировка источника снимается."""
+    src = get_connection()
+    dst = sqlite3.connect(target_path)
+    try:
+        src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=0.005)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _verify_backup(path):
+    """Проверить целостность копии."""
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute('PRAGMA integrity_check').fetchone()
+    finally:
+        conn.close()
+    return row is not None and row[0] == 'ok'
+
+
+def _rotate_backups():
+    """Удалить старые копии сверх BACKUP_KEEP. Возвращает число удалённых файлов."""
+    backups = sorted(glob.glob(os.path.join(BACKUP_DIR, 'bot-*.db')))
+    stale = backups[:-BACKUP_KEEP] if BACKUP_KEEP > 0 else []
+    for path in stale:
+        os.remove(path)
+    return len(stale)
+
+
+def make_backup():
+    """Создать проверенную копию базы. Возвращает сведения о копии."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    name = f"bot-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+    path = os.path.join(BACKUP_DIR, name)
+    # Пишем во временный файл, чтобы в ротацию не попала недописанная копия
+    tmp_path = path + '.tmp'
+
+    started = time.monotonic()
+    try:
+        _copy_database(tmp_path)
+        if not _verify_backup(tmp_path):
+            raise RuntimeError(f"Копия {name} не прошла integrity_check")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "path": path,
+        "name": name,
+        "size": os.path.getsize(path),
+        "duration": time.monotonic() - started,
+        "rotated": _rotate_backups(),
+    }
+
+
+async def create_backup():
+    """Асинхронная обёртка: копирование идёт в потоке и не блокирует обработчики."""
+    async with _backup_lock:
+        return await asyncio.to_thread(make_backup)
+
+
+async def backup_loop():
+    """Фоновая задача: резервная копия раз в BACKUP_INTERVAL_HOURS."""
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_HOURS * 3600)
+        try:
+            info = await create_backup()
+            logger.info(
+                "💾 Резервная копия %s: %.1f КБ за %.2f с",
+                info["name"], info["size"] / 1024, info["duration"]
+            )
+        except Exception:
+            logger.exception("Не удалось создать резервную копию БД")
@@ -0,0 +1,280 @@
+"""Данные inline-кнопок и маршрутизация callback-запросов.
+
+Параметризованные кнопки описаны классами CallbackData с короткими префиксами
+("fq:12", "bcl:3:2030:5"). Обработчик выбирается одним обращением к словарю:
+сначала по полному тексту (статичные кнопки вроде "back_main"), затем по префиксу.
+"""
+import inspect
+import logging
+from typing import NamedTuple, Optional
+
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_SEPARATOR = ":"
+
+STALE_BUTTON_TEXT = "Эта кнопка устарела. Откройте меню заново: /start"
+
+
+# === FAQ ===
+
+class FaqCallback(CallbackData, prefix="fq"):
+    faq_id: int
+
+
+class AdminFaqViewCallback(CallbackData, prefix="afv"):
+    faq_id: int
+
+
+class AdminFaqEditQuestionCallback(CallbackData, prefix="afq"):
+    faq_id: int
+
+
+class AdminFaqEditAnswerCallback(CallbackData, prefix="afa"):
+    faq_id: int
+
+
+class AdminFaqDeleteCallback(CallbackData, prefix="afd"):
+    faq_id: int
+
+
+class AdminFaqConfirmDeleteCallback(CallbackData, prefix="afx"):
+    faq_id: int
+
+
+# Страницы списков: start — первая строка страницы (вперёд),
+# before — первая строка следующей страницы (назад)
+
+class FaqPageCallback(CallbackData, prefix="fqp"):
+    start: Optional[int] = None
+    before: Optional[int] = None
+
+
+class AdminFaqPageCallback(CallbackData, prefix="afp"):
+    start: Optional[int] = None
+    before: Optional[int] = None
+
+
+# === Поддержка и админы ===
+
+class ReplyToUserCallback(CallbackData, prefix="rt"):
+    user_id: int
+
+
+class AdminRemoveCallback(CallbackData, prefix="arm"):
+    admin_id: int
+
+
+class AdminSubscriptionToggleCallback(CallbackData, prefix="ast"):
+    topic: str
+
+
+class AdminAdminsPageCallback(CallbackData, prefix="aap"):
+    start: Optional[int] = None
+    before: Optional[int] = None
+
+
+# === Бронирование (пользователь) ===
+
+class BookCategoryCallback(CallbackData, prefix="bct"):
+    category: str
+
+
+class BookObjectCallback(CallbackData, prefix="bob"):
+    object_id: int
+
+
+class BookCalendarCallback(CallbackData, prefix="bcl"):
+    object_id: int
+    year: int
+    month: int
+
+
+class BookDayCallback(CallbackData, prefix="bdy"):
+    object_id: int
+    day: str  # YYYY-MM-DD
+
+
+class BookDateCalendarCallback(CallbackData, prefix="bdc"):
+    """Календарь подбора по дате: сначала дата, затем свободные объекты категории."""
+    category: str
+    year: Optional[int] = None  # None — текущий месяц
+    month: Optional[int] = None
+
+
+class BookFreeObjectsCallback(CallbackData, prefix="bfo"):
+    category: str
+    day: str  # YYYY-MM-DD
+    guests: int = 0  # 0 — без учёта числа гостей
+
+
+# === Админ: бронирования ===
+
+class AdminBookingDetailCallback(CallbackData, prefix="abd"):
+    booking_id: int
+
+
+class AdminBookingConfirmCallback(CallbackData, prefix="abc"):
+    booking_id: int
+
+
+class AdminBookingRejectCallback(CallbackData, prefix="abr"):
+    booking_id: int
+
+
+class AdminBookingCancelCallback(CallbackData, prefix="abx"):
+    booking_id: int
+
+
+class AdminBookingDigestCallback(CallbackData, prefix="abg"):
+    digest_id: int
+    action: str  # confirm / reject
+
+
+class AdminBookingSelectCallback(CallbackData, prefix="abs"):
+    booking_id: int
+
+
+class AdminBookingBulkCallback(CallbackData, prefix="abb"):
+    """Подтвердить все ожидающие заявки на дату или по объекту заявки booking_id.
+
+    confirm=0 — показать экран подтверждения с числом заявок, 1 — выполнить.
+    """
+    scope: str  # date / object
+    booking_id: int
+    confirm: int = 0
+
+
+class AdminPendingPageCallback(CallbackData, prefix="abn"):
+    start: Optional[int] = None
+    before: Optional[int] = None
+
+
+# === Админ: объекты ===
+
+class AdminObjectOpenCallback(CallbackData, prefix="aoo"):
+    object_id: int
+
+
+class AdminObjectCalendarCallback(CallbackData, prefix="aoc"):
+    object_id: int
+    year: int
+    month: int
+
+
+class AdminObjectDayCallback(CallbackData, prefix="aod"):
+    object_id: int
+    day: str  # YYYY-MM-DD
+
+
+class AdminObjectActiveCallback(CallbackData, prefix="aoa"):
+    object_id: int
+    year: int
+    month: int
+
+
+# Кнопки из уже отправленных сообщений в старом формате ("admin_book_confirm_12"):
+# уведомления админам и кнопки «Ответить» живут в чатах долго.
+_LEGACY_PAYLOADS = (
+    ("admin_book_detail_", lambda rest: AdminBookingDetailCallback(booking_id=int(rest))),
+    ("admin_book_confirm_", lambda rest: AdminBookingConfirmCallback(booking_id=int(rest))),
+    ("admin_book_reject_", lambda rest: AdminBookingRejectCallback(booking_id=int(rest))),
+    ("admin_book_cancel_", lambda rest: AdminBookingCancelCallback(booking_id=int(rest))),
+    ("admin_obj_toggle_", lambda rest: AdminObjectOpenCallback(object_id=int(rest))),
+    ("reply_to_", lambda rest: ReplyToUserCallback(user_id=int(rest))),
+)
+
+
+def parse_legacy_payload(data) -> Optional[CallbackData]:
+    """Разобрать callback_data старого формата. None — если формат неизвестен."""
+    for prefix, factory in _LEGACY_PAYLOADS:
+        if data.startswith(prefix):
+            try:
+                return factory(data[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
+
+class _Route(NamedTuple):
+    handler: object
+    params: frozenset
+
+
+def _make_route(handler):
+    return _Route(handler, frozenset(inspect.signature(handler).parameters))
+
+
+class CallbackRoutes:
+    """Таблица обработчиков callback-запросов: текст кнопки или префикс -> обработчик.
+
+    Обработчик получает CallbackQuery первым аргументом, а из остальных
+    (state, callback_data, ...) — только те, что объявлены в его сигнатуре.
+    С skip_unknown=True неизвестная кнопка передаётся следующему роутеру.
+    """
+
+    def __init__(self, skip_unknown=False):
+        self.skip_unknown = skip_unknown
+        self._exact = {}
+        self._by_prefix = {}
+
+    def exact(self, *payloads):
+        """Зарегистрировать обработчик статичных кнопок."""
+        def decorator(handler):
+            route = _make_route(handler)
+            for payload in payloads:
+                if payload in self._exact:
+                    raise ValueError(f"Обработчик для {payload!r} уже зарегистрирован")
+                self._exact[payload] = route
+            return handler
+        return decorator
+
+    def data(self, callback_data_cls):
+        """Зарегистрировать обработчик кнопок класса CallbackData."""
+        prefix = callback_data_cls.__prefix__
+
+        def decorator(handler):
+            if prefix in self._by_prefix:
+                raise ValueError(f"Обработчик для префикса {prefix!r} уже зарегистрирован")
+            self._by_prefix[prefix] = (callback_data_cls, _make_route(handler))
+            return handler
+        return decorator
+
+    def resolve(self, data):
+        """Найти обработчик для callback_data. Возвращает (route, callback_data) или (None, None)."""
+        route = self._exact.get(data)
+        if route is not None:
+            return route, None
+
+        prefix, sep, _ = data.partition(CALLBACK_SEPARATOR)
+        entry = self._by_prefix.get(prefix) if sep else None
+        if entry is not None:
+            callback_data_cls, route = entry
+            try:
+                return route, callback_data_cls.unpack(data)
+            except (TypeError, ValueError):
+                return None, None
+
+        legacy = parse_legacy_payload(data)
+        if legacy is not None:
+            entry = self._by_prefix.get(legacy.__prefix__)
+            if entry is not None:
+                return entry[1], legacy
+        return None, None
+
+    async def dispatch(self, callback: CallbackQuery, **context):
+        """Вызвать обработчик кнопки; на неизвестные и устаревшие кнопки — предупреждение."""
+        route, callback_data = self.resolve(callback.data or "")
+        if route is None:
+            if self.skip_unknown:
+                raise SkipHandler()
+            logger.debug("Неизвестная кнопка: %r", callback.data)
+            await callback.answer(STALE_BUTTON_TEXT, show_alert=True)
+            return
+
+        context["callback_data"] = callback_data
+        kwargs = {name: value for name, value in context.items() if name in route.params}
+        return await route.handler(callback, **kwargs)
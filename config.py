@@ -10,3 +10,83 @@ MAIN_ADMIN_ID = 5861625780  # Замени на свой ID
 # Путь к папке с данными и базе данных
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 DB_PATH = os.path.join(DATA_DIR, "bot.db")
+
+# Обслуживание БД (архивация, очистка, PRAGMA optimize)
+MAINTENANCE_INTERVAL_HOURS = int(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+# Бронирования с датой старше горизонта (и давно отменённые) переносятся в архив
+BOOKINGS_ARCHIVE_AFTER_DAYS = int(os.getenv("BOOKINGS_ARCHIVE_AFTER_DAYS", "90"))
+# Срок жизни реф-ссылки для приглашения админа
+REF_TOKEN_TTL_DAYS = int(os.getenv("REF_TOKEN_TTL_DAYS", "7"))
+# Сессии поддержки без активности (сообщений пользователя и ответов админов)
+# дольше этого срока считаются зависшими
+SUPPORT_SESSION_TTL_HOURS = int(os.getenv("SUPPORT_SESSION_TTL_HOURS", "72"))
+# Сколько дней админ может ответить пользователю реплаем на пересланное обращение
+SUPPORT_MESSAGE_MAP_TTL_DAYS = int(os.getenv("SUPPORT_MESSAGE_MAP_TTL_DAYS", "30"))
+
+# Сводки новых заявок для админов: вместо отдельного сообщения на каждую заявку
+# заявки за окно BOOKING_DIGEST_WINDOW_SEC приходят одним сообщением
+BOOKING_DIGEST_ENABLED = os.getenv("BOOKING_DIGEST_ENABLED", "0") == "1"
+BOOKING_DIGEST_WINDOW_SEC = int(os.getenv("BOOKING_DIGEST_WINDOW_SEC", "120"))
+# Сводка отправляется сразу, когда в ней набралось столько заявок
+BOOKING_DIGEST_MAX_ITEMS = int(os.getenv("BOOKING_DIGEST_MAX_ITEMS", "15"))
+# Заявки на ближайшие дни (0 — сегодня, 1 — сегодня и завтра) не ждут сводки
+BOOKING_DIGEST_URGENT_DAYS = int(os.getenv("BOOKING_DIGEST_URGENT_DAYS", "1"))
+# Сколько дней работают кнопки массовых действий в сводке
+BOOKING_DIGEST_TTL_DAYS = int(os.getenv("BOOKING_DIGEST_TTL_DAYS", "7"))
+
+# Заявки без решения админа дольше PENDING_BOOKING_TTL_HOURS отменяются
+# автоматически (0 — не отменять). Проверка раз в PENDING_SWEEP_INTERVAL_MIN
+# минут, не больше PENDING_SWEEP_BATCH заявок за транзакцию
+PENDING_BOOKING_TTL_HOURS = int(os.getenv("PENDING_BOOKING_TTL_HOURS", "48"))
+PENDING_SWEEP_INTERVAL_MIN = int(os.getenv("PENDING_SWEEP_INTERVAL_MIN", "15"))
+PENDING_SWEEP_BATCH = int(os.getenv("PENDING_SWEEP_BATCH", "100"))
+
+# Сколько сообщений в секунду бот отправляет пользователям при массовых
+# уведомлениях (лимит Telegram — около 30 в секунду на бота)
+NOTIFY_RATE_PER_SEC = float(os.getenv("NOTIFY_RATE_PER_SEC", "20"))
+
+# Сколько строк показывать на одной странице списков (заявки, FAQ, админы)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "10"))
+
+# Резервные копии БД
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+BACKUP_INTERVAL_HOURS = int(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+# Сколько последних копий хранить
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+# Страниц за один шаг backup API: между шагами бот может писать в базу
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+
+# Обработка обновлений: сколько апдейтов разных чатов выполняется одновременно
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+# Предупреждение в лог, когда в очереди ждёт больше апдейтов
+UPDATE_QUEUE_WARN = int(os.getenv("UPDATE_QUEUE_WARN", "100"))
+
+# Ограничение частоты нажатий кнопок одним пользователем (token bucket)
+CALLBACK_RATE_PER_SEC = float(os.getenv("CALLBACK_RATE_PER_SEC", "3"))
+CALLBACK_BURST = int(os.getenv("CALLBACK_BURST", "8"))
+# Через сколько миллисекунд нажатие кнопки подтверждается автоматически,
+# если обработчик ещё не ответил сам
+CALLBACK_ACK_DELAY_MS = int(os.getenv("CALLBACK_ACK_DELAY_MS", "150"))
+
+# Состояния FSM: через сколько часов без активности сценарий сбрасывается,
+# сколько состояний держать в памяти и как часто сбрасывать изменения в базу
+FSM_STATE_TTL_HOURS = int(os.getenv("FSM_STATE_TTL_HOURS", "24"))
+FSM_MEMORY_MAX_ENTRIES = int(os.getenv("FSM_MEMORY_MAX_ENTRIES", "10000"))
+FSM_FLUSH_INTERVAL_SEC = float(os.getenv("FSM_FLUSH_INTERVAL_SEC", "1"))
+
+# Несколько реплик бота: адрес общего Redis (redis://host:6379/0).
+# Пусто — одна реплика, общее состояние хранится в памяти процесса
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "").strip()
+# Имя реплики в логах и сообщениях инвалидации
+REPLICA_ID = os.getenv("REPLICA_ID", "").strip()
+# Срок жизни блокировки лидера (polling, обслуживание, бэкапы); продлевается каждые TTL/3
+LEADER_LOCK_TTL_SEC = int(os.getenv("LEADER_LOCK_TTL_SEC", "30"))
+# Блокировка на дату объекта при создании брони
+BOOKING_LOCK_TTL_SEC = int(os.getenv("BOOKING_LOCK_TTL_SEC", "10"))
+# Сколько минут выбранная дата удерживается за пользователем, пока он вводит
+# имя и телефон (в календарях других пользователей она недоступна)
+BOOKING_HOLD_TTL_MIN = int(os.getenv("BOOKING_HOLD_TTL_MIN", "10"))
+
+# Альбом в поддержку приходит отдельными апдейтами на каждое фото: части
+# собираются, пока между ними не пройдёт столько миллисекунд
+SUPPORT_ALBUM_WAIT_MS = int(os.getenv("SUPPORT_ALBUM_WAIT_MS", "800"))
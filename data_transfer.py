@@ -0,0 +1,90 @@
+"""Потоковый экспорт и пакетный импорт бронирований и объектов (CSV / JSONL)."""
+import asyncio
+import csv
+import io
+import json
+
+from aiogram.types.input_file import InputFile
+
+from database import TRANSFER_COLUMNS, TRANSFER_REQUIRED_COLUMNS, iter_table_rows, import_table_rows
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Размер порции, которой файл отдаётся в Telegram
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def iter_export_chunks(table, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Генератор байтовых порций выгрузки таблицы."""
+    columns = TRANSFER_COLUMNS[table]
+    buffer = io.StringIO()
+
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
+
+    for row in iter_table_rows(table):
+        write_row(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class ExportInputFile(InputFile):
+    """Файл для send_document, который собирается порциями во время отправки."""
+
+    def __init__(self, table, fmt, filename):
+        super().__init__(filename=filename, chunk_size=EXPORT_CHUNK_SIZE)
+        self.table = table
+        self.fmt = fmt
+
+    async def read(self, bot):
+        for chunk in iter_export_chunks(self.table, self.fmt, self.chunk_size):
+            yield chunk
+            # Отдаём управление циклу событий между порциями
+            await asyncio.sleep(0)
+
+
+def iter_import_rows(stream, fmt, table):
+    """Разобрать бинарный поток CSV/JSONL в словари строк.
+
+    Для CSV заголовок проверяется сразу: без обязательных колонок файл не импортируется.
+    Строка JSONL, которая не разбирается как JSON, отдаётся как ValueError —
+    import_table_rows отклонит её вместе с другими ошибочными строками.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        missing = [column for column in TRANSFER_REQUIRED_COLUMNS[table] if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"в заголовке CSV нет колонок: {', '.join(missing)}")
+        for row in reader:
+            # Пустые ячейки CSV — это NULL
+            yield {key: (value if value != "" else None) for key, value in row.items()}
+    else:
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = ValueError("неверный JSON")
+            yield row
+
+
+def import_stream(table, fmt, stream, on_conflict="skip"):
+    """Импортировать поток в таблицу.
+
+    Возвращает (всего строк, записано, отклонено, первые причины отклонения).
+    """
+    return import_table_rows(table, iter_import_rows(stream, fmt, table), on_conflict=on_conflict)
@@ -1,7 +1,91 @@
 ﻿import sqlite3
 import os
 import calendar as cal_module
-from config import DB_PATH, DATA_DIR, MAIN_ADMIN_ID
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+from config import DB_PATH, DATA_DIR, MAIN_ADMIN_ID, REF_TOKEN_TTL_DAYS, LIST_PAGE_SIZE
+
+
+# Объекты бронирования по умолчанию:
+# (name, category, capacity, price_weekday, price_weekend, description, is_active, sort_order)
+DEFAULT_OBJECTS = [
+    # Малые беседки (рыбалка)
+    ("Малая беседка №1", "gazebo_fishing", 6, 2000, 2000, "", 1, 1),
+    ("Малая беседка №2", "gazebo_fishing", 6, 2000, 2000, "", 1, 2),
+    ("Малая беседка №3", "gazebo_fishing", 6, 2000, 2000, "", 1, 3),
+    ("Малая беседка №4", "gazebo_fishing", 6, 2000, 2000, "", 1, 4),
+    # Средние беседки (рыбалка)
+    ("Средняя беседка №6", "gazebo_fishing", 8, 3000, 3000, "", 1, 6),
+    ("Средняя беседка №7", "gazebo_fishing", 8, 3000, 3000, "", 1, 7),
+    ("Средняя беседка №8", "gazebo_fishing", 8, 3000, 3000, "", 1, 8),
+    ("Средняя беседка №9", "gazebo_fishing", 8, 3000, 3000, "", 1, 9),
+    ("Средняя беседка №10", "gazebo_fishing", 8, 3000, 3000, "", 1, 10),
+    # Беседки (отдых)
+    ("Большая беседка №11", "gazebo_recreation", 15, 10000, 10000, "", 1, 11),
+    ("Бар №12", "gazebo_recreation", 20, 18000, 18000, "", 1, 12),
+    # Домики
+    ("Домик №1", "house", 4, 6000, 7000, "", 1, 20),
+    ("Домик №2", "house", 4, 6000, 7000, "", 1, 21),
+    ("Домик №3", "house", 4, 6000, 7000, "", 1, 22),
+    ("Домик №4", "house", 4, 6000, 7000, "", 1, 23),
+]
+
+
+# Версии данных для кэшей отрисовки: увеличиваются при каждом изменении.
+# availability — бронирования и ручные блокировки, objects — объекты, faq — FAQ,
+# admins — список администраторов, notifications — флаги уведомлений и подписки админов.
+# Дополнительно 'availability:<object_id>' — занятость одного объекта и
+# 'availability:*' — занятость всех объектов сразу (см. _bump_availability)
+_data_versions = {'availability': 0, 'objects': 0, 'faq': 0, 'admins': 0, 'notifications': 0}
+
+# Слушатели изменений данных (рассылка инвалидации другим репликам).
+# Вызываются из потока, где произошло изменение.
+_data_change_listeners = []
+
+# Кэш списка админов для is_admin: (версия 'admins', множество ID)
+_admin_ids_cache = (None, frozenset())
+
+# Кэш получателей уведомлений: ((версии 'admins' и 'notifications'), {тема: список ID})
+_notification_recipients_cache = (None, {})
+
+
+def get_data_version(name):
+    """Текущая версия набора данных (ключ для кэшей клавиатур)."""
+    return _data_versions[name]
+
+
+def bump_data_version(*names, notify=True):
+    """Отметить изменение данных, чтобы кэши перестроили разметку.
+
+    notify=False — изменение пришло от другой реплики, слушателей не вызываем.
+    """
+    for name in names:
+        _data_versions[name] = _data_versions.get(name, 0) + 1
+    if notify:
+        for listener in _data_change_listeners:
+            listener(names)
+
+
+def _bump_availability(object_ids=None):
+    """Отметить изменение занятости: общая версия и версии затронутых объектов.
+
+    object_ids=None — затронуты все объекты (импорт, архивация).
+    """
+    if object_ids is None:
+        names = ('availability:*',)
+    else:
+        names = tuple(f'availability:{object_id}' for object_id in set(object_ids))
+    bump_data_version('availability', *names)
+
+
+def get_object_availability_version(object_id):
+    """Версия занятости одного объекта (ключ кэша его календарей)."""
+    return _data_versions.get('availability:*', 0), _data_versions.get(f'availability:{object_id}', 0)
+
+
+def add_data_change_listener(listener):
+    """Подписаться на изменения данных: listener(names) после каждого bump_data_version."""
+    _data_change_listeners.append(listener)
 
 
 def get_connection():
@@ -20,6 +104,13 @@ def init_db():
     conn = get_connection()
     cursor = conn.cursor()
 
+    # Инкрементальный VACUUM: режим можно сменить только полной пересборкой файла,
+    # поэтому делаем это один раз для уже существующих БД
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
     # Таблица админов
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS admins (
@@ -38,6 +129,18 @@ def init_db():
         )
     ''')
 
+    # Подписки админов на темы уведомлений (сценарий поддержки или категория
+    # бронирования). Нет строки — админ подписан
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admin_subscriptions (
+            user_id INTEGER NOT NULL,
+            topic TEXT NOT NULL,
+            subscribed INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, topic)
+        )
+    ''')
+
     # Глобальные настройки бота
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS bot_settings (
@@ -73,9 +176,44 @@ def init_db():
         CREATE TABLE IF NOT EXISTS active_chats (
             user_id INTEGER PRIMARY KEY,
             in_support INTEGER DEFAULT 1,
-            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Миграция: время последнего сообщения в сессии поддержки
+    columns = {row['name'] for row in cursor.execute('PRAGMA table_info(active_chats)')}
+    if 'last_activity_at' not in columns:
+        cursor.execute('ALTER TABLE active_chats ADD COLUMN last_activity_at TIMESTAMP')
+        cursor.execute('UPDATE active_chats SET last_activity_at = started_at')
+
+    # Обращения в чатах админов: ответ (reply) на сообщение уходит пользователю
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS support_message_map (
+            admin_chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (admin_chat_id, message_id)
         )
     ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_support_message_map_created
+        ON support_message_map(created_at)
+    ''')
+
+    # Состояния FSM (сценарии бронирования, поддержки, админки) переживают перезапуск
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fsm_states_updated
+        ON fsm_states(updated_at)
+    ''')
 
     # Таблица объектов бронирования
     cursor.execute('''
@@ -92,6 +230,17 @@ def init_db():
         )
     ''')
 
+    # Активные объекты категории в порядке сортировки
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_objects_category_active_sort
+        ON objects(category, is_active, sort_order)
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_objects_active_sort
+        ON objects(is_active, sort_order)
+    ''')
+
     # Таблица бронирований
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS bookings (
@@ -114,6 +263,45 @@ def init_db():
         ON bookings(object_id, date, status)
     ''')
 
+    # Список ожидающих заявок: WHERE status = ? ORDER BY created_at
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_status_created
+        ON bookings(status, created_at)
+    ''')
+
+    # Бронирования на дату по всем объектам
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_date_status
+        ON bookings(date, status)
+    ''')
+
+    # Архив бронирований (прошедшие и давно отменённые заявки)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookings_archive (
+            id INTEGER PRIMARY KEY,
+            object_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            user_name TEXT NOT NULL,
+            user_phone TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            admin_id INTEGER,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Сводки новых заявок, отправленные админам: кнопки массовых действий
+    # ссылаются на сводку, список заявок хранится здесь
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS booking_digests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            booking_ids TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     # Таблица ручных блокировок дат (занято без пользовательской заявки)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS object_manual_blocks (
@@ -182,30 +370,9 @@ def init_db():
     # Добавляем объекты бронирования по умолчанию если таблица пустая
     cursor.execute('SELECT COUNT(*) FROM objects')
     if cursor.fetchone()[0] == 0:
-        default_objects = [
-            # Малые беседки (рыбалка)
-            ("Малая беседка №1", "gazebo_fishing", 6, 2000, 2000, "", 1, 1),
-            ("Малая беседка №2", "gazebo_fishing", 6, 2000, 2000, "", 1, 2),
-            ("Малая беседка №3", "gazebo_fishing", 6, 2000, 2000, "", 1, 3),
-            ("Малая беседка №4", "gazebo_fishing", 6, 2000, 2000, "", 1, 4),
-            # Средние беседки (рыбалка)
-            ("Средняя беседка №6", "gazebo_fishing", 8, 3000, 3000, "", 1, 6),
-            ("Средняя беседка №7", "gazebo_fishing", 8, 3000, 3000, "", 1, 7),
-            ("Средняя беседка №8", "gazebo_fishing", 8, 3000, 3000, "", 1, 8),
-            ("Средняя беседка №9", "gazebo_fishing", 8, 3000, 3000, "", 1, 9),
-            ("Средняя беседка №10", "gazebo_fishing", 8, 3000, 3000, "", 1, 10),
-            # Беседки (отдых)
-            ("Большая беседка №11", "gazebo_recreation", 15, 10000, 10000, "", 1, 11),
-            ("Бар №12", "gazebo_recreation", 20, 18000, 18000, "", 1, 12),
-            # Домики
-            ("Домик №1", "house", 4, 6000, 7000, "", 1, 20),
-            ("Домик №2", "house", 4, 6000, 7000, "", 1, 21),
-            ("Домик №3", "house", 4, 6000, 7000, "", 1, 22),
-            ("Домик №4", "house", 4, 6000, 7000, "", 1, 23),
-        ]
         cursor.executemany(
             'INSERT INTO objects (name, category, capacity, price_weekday, price_weekend, description, is_active, sort_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-            default_objects
+            DEFAULT_OBJECTS
         )
 
     # Миграция: гарантируем наличие Домик №4 в уже существующих БД
@@ -219,6 +386,56 @@ def init_db():
     conn.commit()
     conn.close()
 
+# === Постраничные списки ===
+
+class Page(NamedTuple):
+    """Страница списка: строки и курсоры соседних страниц (None — страницы нет)."""
+    items: list
+    prev_before: Optional[int]
+    next_start: Optional[int]
+
+
+def _keyset_page(conn, select_sql, where, params, order_columns, cursor_sql, key_field,
+                 start=None, before=None, limit=LIST_PAGE_SIZE):
+    """Страница по ключу сортировки без OFFSET.
+
+    start — ключ первой строки страницы (вперёд, включительно), before — ключ
+    первой строки следующей страницы (назад, не включая). Ключ строки — поле
+    key_field, cursor_sql превращает его в значение для сравнения с
+    order_columns. Если строки курсора уже пропали (заявки обработаны),
+    возвращается соседняя непустая страница.
+    """
+    key_sql = order_columns[0] if len(order_columns) == 1 else f"({', '.join(order_columns)})"
+
+    def fetch(op, cursor, descending, count):
+        conditions = list(where)
+        args = list(params)
+        if cursor is not None:
+            conditions.append(f"{key_sql} {op} {cursor_sql}")
+            args.append(cursor)
+        order = ', '.join(f"{column} DESC" if descending else column for column in order_columns)
+        where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = conn.execute(f"{select_sql}{where_sql} ORDER BY {order} LIMIT ?", (*args, count)).fetchall()
+        return [dict(row) for row in rows]
+
+    if before is not None:
+        rows = fetch('<', before, True, limit + 1)
+        if rows:
+            items = rows[:limit][::-1]
+            next_start = before if fetch('>=', before, False, 1) else None
+            return Page(items, items[0][key_field] if len(rows) > limit else None, next_start)
+        start = None
+
+    rows = fetch('>=', start, False, limit + 1)
+    if not rows and start is not None:
+        return _keyset_page(conn, select_sql, where, params, order_columns, cursor_sql, key_field,
+                            before=start, limit=limit)
+    items = rows[:limit]
+    prev_before = None
+    if start is not None and fetch('<', start, True, 1):
+        prev_before = items[0][key_field]
+    return Page(items, prev_before, rows[limit][key_field] if len(rows) > limit else None)
+
 # === Админы ===
 
 def get_admins():
@@ -235,9 +452,34 @@ def get_admins():
     return admins
 
 
+def get_admins_page(start=None, before=None, limit=LIST_PAGE_SIZE):
+    """Страница админов: items — список user_id (курсоры — тоже user_id)"""
+    conn = get_connection()
+    page = _keyset_page(
+        conn, 'SELECT user_id FROM admins', [], (), ["user_id"], "?", "user_id",
+        start=start, before=before, limit=limit
+    )
+    conn.close()
+    return page._replace(items=[row['user_id'] for row in page.items])
+
+
+def count_admins():
+    """Число админов"""
+    conn = get_connection()
+    count = conn.execute('SELECT COUNT(*) FROM admins').fetchone()[0]
+    conn.close()
+    return count
+
+
 def is_admin(user_id):
-    """Проверка, является ли пользователь админом"""
-    return user_id in get_admins()
+    """Проверка, является ли пользователь админом (список кэшируется до изменения админов)"""
+    global _admin_ids_cache
+    version, admin_ids = _admin_ids_cache
+    if version != _data_versions['admins']:
+        version = _data_versions['admins']
+        admin_ids = frozenset(get_admins())
+        _admin_ids_cache = (version, admin_ids)
+    return user_id in admin_ids
 
 
 def add_admin(user_id, added_by=None):
@@ -247,6 +489,7 @@ def add_admin(user_id, added_by=None):
     try:
         cursor.execute('INSERT OR IGNORE INTO admins (user_id, added_by) VALUES (?, ?)', (user_id, added_by))
         conn.commit()
+        bump_data_version('admins')
         return True
     except:
         return False
@@ -264,8 +507,11 @@ def remove_admin(user_id):
     cursor.execute('DELETE FROM admins WHERE user_id = ?', (user_id,))
     affected = cursor.rowcount
     cursor.execute('DELETE FROM admin_settings WHERE user_id = ?', (user_id,))
+    cursor.execute('DELETE FROM admin_subscriptions WHERE user_id = ?', (user_id,))
     conn.commit()
     conn.close()
+    if affected:
+        bump_data_version('admins', 'notifications')
     return affected > 0
 
 
@@ -298,6 +544,7 @@ def set_admin_notifications_enabled(user_id, enabled):
     )
     conn.commit()
     conn.close()
+    bump_data_version('notifications')
     return True
 
 
@@ -337,6 +584,7 @@ def set_global_notifications_enabled(enabled):
     )
     conn.commit()
     conn.close()
+    bump_data_version('notifications')
     return True
 
 
@@ -347,11 +595,80 @@ def toggle_global_notifications():
     return new_value
 
 
-def get_admins_for_notifications():
-    """Список админов, которым разрешены входящие уведомления."""
-    if not get_global_notifications_enabled():
-        return []
-    return get_admins()
+def get_admin_subscriptions(user_id):
+    """Явно заданные подписки админа: {тема: подписан}. Темы без записи — подписан."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT topic, subscribed FROM admin_subscriptions WHERE user_id = ?', (user_id,))
+    subscriptions = {row['topic']: bool(row['subscribed']) for row in cursor.fetchall()}
+    conn.close()
+    return subscriptions
+
+
+def set_admin_subscription(user_id, topic, subscribed):
+    """Подписать админа на тему уведомлений или отписать от неё."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        '''INSERT INTO admin_subscriptions (user_id, topic, subscribed, updated_at)
+           VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(user_id, topic) DO UPDATE SET
+               subscribed = excluded.subscribed,
+               updated_at = CURRENT_TIMESTAMP''',
+        (user_id, topic, 1 if subscribed else 0)
+    )
+    conn.commit()
+    conn.close()
+    bump_data_version('notifications')
+    return True
+
+
+def toggle_admin_subscription(user_id, topic):
+    """Переключить подписку админа на тему. Возвращает новое состояние."""
+    new_value = not get_admin_subscriptions(user_id).get(topic, True)
+    set_admin_subscription(user_id, topic, new_value)
+    return new_value
+
+
+def _load_notification_recipients(topic):
+    """Админы с включёнными уведомлениями, подписанные на тему (одним запросом)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        '''SELECT a.user_id FROM admins a
+           LEFT JOIN admin_settings s ON s.user_id = a.user_id
+           LEFT JOIN admin_subscriptions sub ON sub.user_id = a.user_id AND sub.topic = ?
+           WHERE COALESCE(s.notifications_enabled, 1) = 1
+             AND COALESCE(sub.subscribed, 1) = 1''',
+        (topic,)
+    )
+    recipients = [row['user_id'] for row in cursor.fetchall()]
+    conn.close()
+    return recipients
+
+
+def get_admins_for_notifications(topic=None):
+    """Список админов, которым нужно отправить уведомление по теме.
+
+    topic — сценарий поддержки или категория бронирования; None — без учёта
+    подписок. Учитываются глобальный и личный флаги уведомлений. Если на тему
+    никто не подписан, уведомление получает главный админ, чтобы обращение не
+    потерялось. Результат кэшируется до изменения админов или их настроек.
+    """
+    global _notification_recipients_cache
+    versions = (_data_versions['admins'], _data_versions['notifications'])
+    cached_versions, recipients = _notification_recipients_cache
+    if cached_versions != versions:
+        recipients = {}
+        _notification_recipients_cache = (versions, recipients)
+
+    if topic not in recipients:
+        if not get_global_notifications_enabled():
+            admins = []
+        else:
+            admins = _load_notification_recipients(topic) or [MAIN_ADMIN_ID]
+        recipients[topic] = admins
+    return list(recipients[topic])
 
 # === FAQ ===
 
@@ -365,6 +682,17 @@ def get_faq():
     return faq
 
 
+def get_faq_page(start=None, before=None, limit=LIST_PAGE_SIZE):
+    """Страница FAQ (курсоры — id вопросов)"""
+    conn = get_connection()
+    page = _keyset_page(
+        conn, 'SELECT id, question, answer FROM faq', [], (), ["id"], "?", "id",
+        start=start, before=before, limit=limit
+    )
+    conn.close()
+    return page
+
+
 def get_faq_by_id(faq_id):
     """Получить FAQ по ID"""
     conn = get_connection()
@@ -383,6 +711,7 @@ def add_faq(question, answer):
     conn.commit()
     faq_id = cursor.lastrowid
     conn.close()
+    bump_data_version('faq')
     return faq_id
 
 
@@ -409,6 +738,7 @@ def update_faq(faq_id, question=None, answer=None):
     conn.commit()
     affected = cursor.rowcount
     conn.close()
+    bump_data_version('faq')
     return affected > 0
 
 
@@ -420,6 +750,7 @@ def remove_faq(faq_id):
     conn.commit()
     affected = cursor.rowcount
     conn.close()
+    bump_data_version('faq')
     return affected > 0
 
 # === Реф-токены ===
@@ -442,8 +773,11 @@ def use_ref_token(token, user_id):
     conn = get_connection()
     cursor = conn.cursor()
 
-    # Проверяем токен
-    cursor.execute('SELECT * FROM ref_tokens WHERE token = ? AND used = 0', (token,))
+    # Проверяем токен (используется один раз и только в течение срока жизни)
+    cursor.execute(
+        "SELECT * FROM ref_tokens WHERE token = ? AND used = 0 AND created_at >= datetime('now', ?)",
+        (token, f'-{REF_TOKEN_TTL_DAYS} days')
+    )
     row = cursor.fetchone()
 
     if not row:
@@ -459,6 +793,20 @@ def use_ref_token(token, user_id):
     add_admin(user_id, row['created_by'])
     return True
 
+
+def purge_ref_tokens(ttl_days):
+    """Удалить использованные и просроченные реф-токены. Возвращает число удалённых строк."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM ref_tokens WHERE used = 1 OR created_at < datetime('now', ?)",
+        (f'-{ttl_days} days',)
+    )
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    return affected
+
 # === Поддержка ===
 
 def set_user_in_support(user_id, in_support=True):
@@ -467,7 +815,10 @@ def set_user_in_support(user_id, in_support=True):
     cursor = conn.cursor()
 
     if in_support:
-        cursor.execute('INSERT OR REPLACE INTO active_chats (user_id, in_support) VALUES (?, 1)', (user_id,))
+        cursor.execute(
+            'INSERT OR REPLACE INTO active_chats (user_id, in_support, last_activity_at) VALUES (?, 1, CURRENT_TIMESTAMP)',
+            (user_id,)
+        )
     else:
         cursor.execute('DELETE FROM active_chats WHERE user_id = ?', (user_id,))
 
@@ -484,6 +835,129 @@ def is_user_in_support(user_id):
     conn.close()
     return bool(row and row['in_support'])
 
+
+def touch_support_session(user_id):
+    """Отметить активность в сессии поддержки (сообщение пользователя или ответ админа)"""
+    conn = get_connection()
+    conn.execute(
+        'UPDATE active_chats SET last_activity_at = CURRENT_TIMESTAMP WHERE user_id = ?',
+        (user_id,)
+    )
+    conn.commit()
+    conn.close()
+
+
+def purge_stale_support_sessions(max_idle_hours):
+    """Удалить сессии поддержки без активности дольше max_idle_hours. Возвращает число удалённых строк."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM active_chats WHERE last_activity_at < datetime('now', ?)",
+        (f'-{max_idle_hours} hours',)
+    )
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    return affected
+
+
+def save_support_message_links(rows):
+    """Запомнить сообщения обращений в чатах админов.
+
+    rows — список (admin_chat_id, message_id, user_id), записывается одной транзакцией.
+    """
+    if not rows:
+        return
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                '''INSERT OR REPLACE INTO support_message_map (admin_chat_id, message_id, user_id)
+                   VALUES (?, ?, ?)''',
+                rows
+            )
+    finally:
+        conn.close()
+
+
+def get_support_message_user(admin_chat_id, message_id, ttl_days):
+    """Пользователь, чьё обращение переслано сообщением message_id в чат админа, или None."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        '''SELECT user_id FROM support_message_map
+           WHERE admin_chat_id = ? AND message_id = ? AND created_at >= datetime('now', ?)''',
+        (admin_chat_id, message_id, f'-{ttl_days} days')
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return row['user_id'] if row else None
+
+
+def purge_support_message_links(ttl_days):
+    """Удалить связи сообщений старше ttl_days. Возвращает число удалённых строк."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM support_message_map WHERE created_at < datetime('now', ?)",
+        (f'-{ttl_days} days',)
+    )
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    return affected
+
+# === Состояния FSM ===
+
+def load_fsm_state(key, ttl_hours):
+    """Состояние FSM по ключу: (state, data_json, updated_at) или None, если нет или устарело."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT state, data, updated_at FROM fsm_states WHERE key = ? AND updated_at >= datetime('now', ?)",
+        (key, f'-{ttl_hours} hours')
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return (row['state'], row['data'], row['updated_at']) if row else None
+
+
+def save_fsm_states(rows):
+    """Записать пачку состояний FSM одной транзакцией.
+
+    rows — список (key, state, data_json, updated_at); пустое состояние без данных удаляется.
+    """
+    upserts = [row for row in rows if row[1] is not None or row[2] != '{}']
+    deletes = [(row[0],) for row in rows if row[1] is None and row[2] == '{}']
+    conn = get_connection()
+    try:
+        with conn:
+            if upserts:
+                conn.executemany(
+                    '''INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(key) DO UPDATE SET
+                           state = excluded.state, data = excluded.data, updated_at = excluded.updated_at''',
+                    upserts
+                )
+            if deletes:
+                conn.executemany('DELETE FROM fsm_states WHERE key = ?', deletes)
+    finally:
+        conn.close()
+
+
+def purge_fsm_states(ttl_hours):
+    """Удалить состояния FSM без активности дольше ttl_hours. Возвращает число удалённых строк."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM fsm_states WHERE updated_at < datetime('now', ?)",
+        (f'-{ttl_hours} hours',)
+    )
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    return affected
+
 # === Объекты бронирования ===
 
 def get_objects_by_category(category):
@@ -529,6 +1003,21 @@ def get_object_by_id(object_id):
     return dict(row) if row else None
 
 
+def add_object(name, category, capacity, price_weekday, price_weekend, description='', is_active=1, sort_order=0):
+    """Добавить объект. Возвращает ID."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO objects (name, category, capacity, price_weekday, price_weekend, description, is_active, sort_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (name, category, capacity, price_weekday, price_weekend, description, is_active, sort_order)
+    )
+    conn.commit()
+    object_id = cursor.lastrowid
+    conn.close()
+    bump_data_version('objects')
+    return object_id
+
+
 def update_object(object_id, **kwargs):
     """Обновить поля объекта"""
     allowed = {'name', 'category', 'capacity', 'price_weekday', 'price_weekend', 'description', 'is_active', 'sort_order'}
@@ -543,6 +1032,7 @@ def update_object(object_id, **kwargs):
     conn.commit()
     affected = cursor.rowcount
     conn.close()
+    bump_data_version('objects')
     return affected > 0
 
 
@@ -582,6 +1072,7 @@ def toggle_object_manual_block(object_id, date_str, admin_id):
         )
         conn.commit()
         conn.close()
+        _bump_availability([object_id])
         return 'unblocked'
 
     cursor.execute(
@@ -590,6 +1081,7 @@ def toggle_object_manual_block(object_id, date_str, admin_id):
     )
     conn.commit()
     conn.close()
+    _bump_availability([object_id])
     return 'blocked'
 
 
@@ -645,6 +1137,37 @@ def get_day_status(object_id, date_str):
     return 'booked' if row['status'] == 'confirmed' else 'pending'
 
 
+def get_free_objects_on_date(category, date_str, guests=None):
+    """Активные объекты категории, свободные на дату (и вмещающие guests человек).
+
+    Один запрос: объекты категории по индексу, занятость — анти-соединениями
+    с бронированиями и ручными блокировками по (object_id, date).
+    """
+    conditions = ["o.category = ?", "o.is_active = 1"]
+    params = [category]
+    if guests:
+        conditions.append("o.capacity >= ?")
+        params.append(guests)
+    conn = get_connection()
+    cursor = conn.execute(
+        f"""SELECT o.* FROM objects o
+            WHERE {' AND '.join(conditions)}
+              AND NOT EXISTS (
+                  SELECT 1 FROM bookings b
+                  WHERE b.object_id = o.id AND b.date = ? AND b.status != 'cancelled'
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM object_manual_blocks m
+                  WHERE m.object_id = o.id AND m.date = ?
+              )
+            ORDER BY o.sort_order, o.id""",
+        (*params, date_str, date_str)
+    )
+    items = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return items
+
+
 def create_booking(object_id, date_str, user_id, user_name, user_phone):
     """Создать бронирование. Возвращает ID или None если дата занята."""
     conn = get_connection()
@@ -672,6 +1195,7 @@ def create_booking(object_id, date_str, user_id, user_name, user_phone):
     conn.commit()
     booking_id = cursor.lastrowid
     conn.close()
+    _bump_availability([object_id])
     return booking_id
 
 
@@ -680,12 +1204,14 @@ def confirm_booking(booking_id, admin_id):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "UPDATE bookings SET status = 'confirmed', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'pending'",
+        "UPDATE bookings SET status = 'confirmed', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'pending' RETURNING object_id",
         (admin_id, booking_id)
     )
+    object_ids = [row['object_id'] for row in cursor.fetchall()]
     conn.commit()
-    affected = cursor.rowcount
+    affected = len(object_ids)
     conn.close()
+    _bump_availability(object_ids)
     return affected > 0
 
 
@@ -694,26 +1220,110 @@ def reject_booking(booking_id, admin_id):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "UPDATE bookings SET status = 'cancelled', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'pending'",
+        "UPDATE bookings SET status = 'cancelled', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'pending' RETURNING object_id",
         (admin_id, booking_id)
     )
+    object_ids = [row['object_id'] for row in cursor.fetchall()]
     conn.commit()
-    affected = cursor.rowcount
+    affected = len(object_ids)
     conn.close()
+    _bump_availability(object_ids)
     return affected > 0
 
 
+def _update_pending_bookings(booking_ids, status, admin_id):
+    """Перевести ожидающие заявки из списка в status одним UPDATE в одной транзакции.
+
+    Заявки, которые уже не ожидают решения, пропускаются. Возвращает изменённые
+    заявки с названием объекта (по возрастанию ID).
+    """
+    booking_ids = list(dict.fromkeys(booking_ids))
+    if not booking_ids:
+        return []
+    placeholders = ', '.join('?' for _ in booking_ids)
+    conn = get_connection()
+    try:
+        with conn:
+            # +status: искать строки по первичному ключу, а не перебирать все
+            # ожидающие заявки по индексу статуса
+            cursor = conn.execute(
+                f"""UPDATE bookings SET status = ?, admin_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id IN ({placeholders}) AND +status = 'pending'
+                    RETURNING id""",
+                (status, admin_id, *booking_ids)
+            )
+            items = _select_bookings_with_object(conn, [row['id'] for row in cursor.fetchall()])
+    finally:
+        conn.close()
+    if items:
+        _bump_availability(item['object_id'] for item in items)
+    return items
+
+
+def _select_bookings_with_object(conn, booking_ids):
+    """Заявки из списка с названием объекта (по возрастанию ID)."""
+    if not booking_ids:
+        return []
+    cursor = conn.execute(
+        f"""SELECT b.*, o.name as object_name
+            FROM bookings b JOIN objects o ON b.object_id = o.id
+            WHERE b.id IN ({', '.join('?' for _ in booking_ids)}) ORDER BY b.id""",
+        booking_ids
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def confirm_bookings(booking_ids, admin_id):
+    """Подтвердить несколько заявок разом. Возвращает подтверждённые заявки."""
+    return _update_pending_bookings(booking_ids, 'confirmed', admin_id)
+
+
+def reject_bookings(booking_ids, admin_id):
+    """Отклонить несколько заявок разом. Возвращает отклонённые заявки."""
+    return _update_pending_bookings(booking_ids, 'cancelled', admin_id)
+
+
+def expire_pending_bookings(created_before, limit):
+    """Отменить самые старые ожидающие заявки, созданные раньше created_before.
+
+    created_before — время в формате CURRENT_TIMESTAMP (UTC). За вызов
+    отменяется не больше limit заявок одной короткой транзакцией; остальные —
+    следующими вызовами. Возвращает отменённые заявки с названием объекта.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.execute(
+                """UPDATE bookings SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                   WHERE id IN (
+                       SELECT id FROM bookings
+                       WHERE status = 'pending' AND created_at < ?
+                       ORDER BY created_at, id LIMIT ?
+                   )
+                   RETURNING id""",
+                (created_before, limit)
+            )
+            items = _select_bookings_with_object(conn, [row['id'] for row in cursor.fetchall()])
+    finally:
+        conn.close()
+    if items:
+        _bump_availability(item['object_id'] for item in items)
+    return items
+
+
 def cancel_booking(booking_id, admin_id):
     """Админ отменяет подтверждённое бронирование"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "UPDATE bookings SET status = 'cancelled', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'confirmed'",
+        "UPDATE bookings SET status = 'cancelled', admin_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'confirmed' RETURNING object_id",
         (admin_id, booking_id)
     )
+    object_ids = [row['object_id'] for row in cursor.fetchall()]
     conn.commit()
-    affected = cursor.rowcount
+    affected = len(object_ids)
     conn.close()
+    _bump_availability(object_ids)
     return affected > 0
 
 
@@ -746,6 +1356,47 @@ def get_pending_bookings():
     return items
 
 
+def get_pending_bookings_page(start=None, before=None, limit=LIST_PAGE_SIZE):
+    """Страница ожидающих заявок в порядке поступления (курсоры — id заявок)"""
+    conn = get_connection()
+    page = _keyset_page(
+        conn,
+        """SELECT b.*, o.name as object_name
+           FROM bookings b JOIN objects o ON b.object_id = o.id""",
+        ["b.status = 'pending'"], (),
+        ["b.created_at", "b.id"], "(SELECT created_at, id FROM bookings WHERE id = ?)", "id",
+        start=start, before=before, limit=limit
+    )
+    conn.close()
+    return page
+
+
+def count_pending_bookings():
+    """Число ожидающих заявок"""
+    conn = get_connection()
+    count = conn.execute("SELECT COUNT(*) FROM bookings WHERE status = 'pending'").fetchone()[0]
+    conn.close()
+    return count
+
+
+def get_pending_booking_ids(object_id=None, date_str=None):
+    """ID ожидающих заявок объекта и/или даты"""
+    conditions = ["status = 'pending'"]
+    params = []
+    if object_id is not None:
+        conditions.append('object_id = ?')
+        params.append(object_id)
+    if date_str is not None:
+        conditions.append('date = ?')
+        params.append(date_str)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id FROM bookings WHERE {' AND '.join(conditions)} ORDER BY id", params)
+    ids = [row['id'] for row in cursor.fetchall()]
+    conn.close()
+    return ids
+
+
 def get_bookings_by_date(date_str):
     """Получить все активные бронирования на дату"""
     conn = get_connection()
@@ -761,6 +1412,47 @@ def get_bookings_by_date(date_str):
     return items
 
 
+def create_booking_digest(booking_ids):
+    """Сохранить список заявок сводки. Возвращает ID сводки."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO booking_digests (booking_ids) VALUES (?)',
+        (','.join(str(booking_id) for booking_id in booking_ids),)
+    )
+    conn.commit()
+    digest_id = cursor.lastrowid
+    conn.close()
+    return digest_id
+
+
+def get_booking_digest(digest_id, ttl_days):
+    """ID заявок сводки или None, если сводки нет или она устарела."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT booking_ids FROM booking_digests WHERE id = ? AND created_at >= datetime('now', ?)",
+        (digest_id, f'-{ttl_days} days')
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return [int(booking_id) for booking_id in row['booking_ids'].split(',')] if row else None
+
+
+def purge_booking_digests(ttl_days):
+    """Удалить сводки старше ttl_days. Возвращает число удалённых строк."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM booking_digests WHERE created_at < datetime('now', ?)",
+        (f'-{ttl_days} days',)
+    )
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    return affected
+
+
 def get_calendar_data_for_api(object_id, year, month):
     """Данные календаря для HTTP API: {date: status}"""
     days_in_month = cal_module.monthrange(year, month)[1]
@@ -776,3 +1468,268 @@ def get_calendar_data_for_api(object_id, year, month):
         date_str = f"{year:04d}-{month:02d}-{day:02d}"
         result[date_str] = booking_map.get(date_str, 'available')
     return result
+
+# === Экспорт / импорт ===
+
+# Колонки, которые выгружаются и принимаются при импорте
+TRANSFER_COLUMNS = {
+    'bookings': (
+        'id', 'object_id', 'date', 'user_id', 'user_name', 'user_phone',
+        'status', 'created_at', 'updated_at', 'admin_id',
+    ),
+    'objects': (
+        'id', 'name', 'category', 'capacity', 'price_weekday', 'price_weekend',
+        'description', 'is_active', 'sort_order',
+    ),
+}
+
+
+def iter_table_rows(table, batch_size=500):
+    """Построчно отдать строки таблицы (генератор, без загрузки всей таблицы в память).
+
+    Каждая пачка читается на отдельном коротком соединении по ключу id > последнего,
+    поэтому пока файл отправляется в Telegram, блокировка чтения на базе не держится.
+    """
+    columns = TRANSFER_COLUMNS[table]
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+    last_id = 0
+    while True:
+        conn = get_connection()
+        try:
+            rows = conn.execute(sql, (last_id, batch_size)).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1]['id']
+
+
+# Статусы бронирований, допустимые при импорте
+BOOKING_STATUSES = ('pending', 'confirmed', 'cancelled')
+
+# Колонки, без которых строку импортировать нельзя
+TRANSFER_REQUIRED_COLUMNS = {
+    'bookings': ('object_id', 'date', 'user_id', 'user_name', 'user_phone'),
+    'objects': ('name', 'category', 'capacity', 'price_weekday', 'price_weekend'),
+}
+
+_REQUIRED = object()
+
+
+def _import_value(row, column, convert, default=_REQUIRED):
+    """Значение колонки строки импорта, приведённое к типу; ValueError с причиной."""
+    value = row.get(column)
+    if value is None or value == '':
+        if default is _REQUIRED:
+            raise ValueError(f"нет значения {column}")
+        return default
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"неверное значение {column}: {value!r}")
+
+
+def _iso_date(value):
+    parsed = date.fromisoformat(str(value))
+    if str(value) != parsed.isoformat():
+        raise ValueError(value)
+    return str(value)
+
+
+def _normalize_booking_row(row, object_ids):
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    values = {
+        'id': _import_value(row, 'id', int, None),
+        'object_id': _import_value(row, 'object_id', int),
+        'date': _import_value(row, 'date', _iso_date),
+        'user_id': _import_value(row, 'user_id', int),
+        'user_name': _import_value(row, 'user_name', str),
+        'user_phone': _import_value(row, 'user_phone', str),
+        'status': _import_value(row, 'status', str, 'pending'),
+        'created_at': _import_value(row, 'created_at', str, now),
+        'updated_at': _import_value(row, 'updated_at', str, now),
+        'admin_id': _import_value(row, 'admin_id', int, None),
+    }
+    if values['status'] not in BOOKING_STATUSES:
+        raise ValueError(f"неизвестный статус {values['status']!r}")
+    if values['object_id'] not in object_ids:
+        raise ValueError(f"нет объекта #{values['object_id']}")
+    return values
+
+
+def _normalize_object_row(row, object_ids):
+    values = {
+        'id': _import_value(row, 'id', int, None),
+        'name': _import_value(row, 'name', str),
+        'category': _import_value(row, 'category', str),
+        'capacity': _import_value(row, 'capacity', int),
+        'price_weekday': _import_value(row, 'price_weekday', int),
+        'price_weekend': _import_value(row, 'price_weekend', int),
+        'description': _import_value(row, 'description', str, ''),
+        'is_active': _import_value(row, 'is_active', int, 1),
+        'sort_order': _import_value(row, 'sort_order', int, 0),
+    }
+    if values['capacity'] <= 0:
+        raise ValueError(f"неверное значение capacity: {values['capacity']}")
+    if values['price_weekday'] < 0 or values['price_weekend'] < 0:
+        raise ValueError("отрицательная цена")
+    if values['is_active'] not in (0, 1):
+        raise ValueError(f"неверное значение is_active: {values['is_active']}")
+    return values
+
+
+_IMPORT_NORMALIZERS = {
+    'bookings': _normalize_booking_row,
+    'objects': _normalize_object_row,
+}
+
+
+def _check_booking_free(conn, values, batch_dates):
+    """ValueError, если активная бронь займёт уже занятую или заблокированную дату.
+
+    batch_dates — (object_id, date) -> id активных броней текущей, ещё не записанной пачки.
+    """
+    if values['status'] == 'cancelled':
+        return
+    object_id, date_str = values['object_id'], values['date']
+    if conn.execute(
+        "SELECT 1 FROM object_manual_blocks WHERE object_id = ? AND date = ?",
+        (object_id, date_str)
+    ).fetchone():
+        raise ValueError(f"объект #{object_id} на {date_str} заблокирован вручную")
+    # Строка с тем же id при replace будет перезаписана — она не конфликт
+    taken = conn.execute(
+        "SELECT id FROM bookings WHERE object_id = ? AND date = ? AND status != 'cancelled' AND id IS NOT ?",
+        (object_id, date_str, values['id'])
+    ).fetchone()
+    if taken:
+        raise ValueError(f"объект #{object_id} на {date_str} уже занят бронью #{taken['id']}")
+    key = (object_id, date_str)
+    if key in batch_dates and (values['id'] is None or batch_dates[key] != values['id']):
+        raise ValueError(f"объект #{object_id} на {date_str} уже занят строкой выше в файле")
+
+
+def import_table_rows(table, rows, on_conflict='skip', batch_size=1000, max_errors=20):
+    """Импортировать строки пачками: проверка строк, затем executemany, одна транзакция на пачку.
+
+    Каждая строка проверяется: обязательные колонки, типы, статус и ISO-дата брони,
+    существование объекта. Колонки берутся из схемы (TRANSFER_COLUMNS): отсутствующие
+    в файле необязательные получают значения по умолчанию. Активная бронь не пишется,
+    если дата объекта уже занята в базе (или строкой выше в том же файле) либо
+    заблокирована вручную.
+    Строка — словарь колонок; строку, которую не удалось разобрать, источник
+    передаёт как ValueError с причиной — она отклоняется, как и остальные ошибки.
+    on_conflict: 'skip' — оставить существующие строки с тем же ID, 'replace' — перезаписать.
+    Возвращает (всего строк, записано, отклонено, первые max_errors причин
+    [(номер строки, причина)]).
+    """
+    columns = TRANSFER_COLUMNS[table]
+    normalize = _IMPORT_NORMALIZERS[table]
+    verb = 'INSERT OR REPLACE' if on_conflict == 'replace' else 'INSERT'
+    sql = (
+        f"{verb} INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+    total = written = rejected = 0
+    errors = []
+    batch = []
+    # ID и занятые даты принятых строк пачки: база их ещё не видит
+    batch_ids = set()
+    batch_dates = {}
+
+    def flush():
+        conn.executemany(sql, batch)
+        conn.commit()
+        batch.clear()
+        batch_ids.clear()
+        batch_dates.clear()
+
+    conn = get_connection()
+    try:
+        object_ids = {row['id'] for row in conn.execute("SELECT id FROM objects")}
+        for number, row in enumerate(rows, start=1):
+            total += 1
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValueError("ожидается объект")
+                values = normalize(row, object_ids)
+                if values['id'] is not None and on_conflict != 'replace' and (
+                    values['id'] in batch_ids
+                    or conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (values['id'],)).fetchone()
+                ):
+                    continue
+                if table == 'bookings':
+                    _check_booking_free(conn, values, batch_dates)
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < max_errors:
+                    errors.append((number, str(e)))
+                continue
+            batch.append(tuple(values[column] for column in columns))
+            if values['id'] is not None:
+                batch_ids.add(values['id'])
+            if table == 'bookings' and values['status'] != 'cancelled':
+                batch_dates[(values['object_id'], values['date'])] = values['id']
+            written += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        conn.close()
+    if written:
+        if table == 'bookings':
+            _bump_availability()
+        else:
+            bump_data_version('objects')
+    return total, written, rejected, errors
+
+# === Обслуживание ===
+
+_BOOKING_COLUMNS = 'id, object_id, date, user_id, user_name, user_phone, status, created_at, updated_at, admin_id'
+
+
+def archive_old_bookings(horizon_days):
+    """Перенести в bookings_archive прошедшие и давно отменённые бронирования.
+
+    Переносятся заявки с датой старше горизонта и отменённые заявки,
+    которые не менялись дольше горизонта. Возвращает число перенесённых строк.
+    """
+    cutoff_date = (date.today() - timedelta(days=horizon_days)).isoformat()
+    # Отсечку считаем один раз, чтобы INSERT и DELETE выбрали одни и те же строки
+    cutoff_ts = (datetime.utcnow() - timedelta(days=horizon_days)).strftime('%Y-%m-%d %H:%M:%S')
+    where = "date < ? OR (status = 'cancelled' AND updated_at < ?)"
+    params = (cutoff_date, cutoff_ts)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    # Копирование и удаление выполняются в одной транзакции
+    cursor.execute(
+        f"INSERT OR REPLACE INTO bookings_archive ({_BOOKING_COLUMNS}) "
+        f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE {where}",
+        params
+    )
+    cursor.execute(f"DELETE FROM bookings WHERE {where}", params)
+    conn.commit()
+    affected = cursor.rowcount
+    conn.close()
+    _bump_availability()
+    return affected
+
+
+def optimize_database():
+    """PRAGMA optimize и возврат свободных страниц файлу. Возвращает число освобождённых страниц."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA freelist_count')
+    free_pages = cursor.fetchone()[0]
+    cursor.execute('PRAGMA optimize')
+    cursor.execute('PRAGMA incremental_vacuum')
+    cursor.fetchall()
+    conn.close()
+    return free_pages
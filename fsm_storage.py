@@ -0,0 +1,147 @@
+"""Хранилище состояний FSM: ограниченный кэш в памяти поверх таблицы fsm_states."""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+
+from config import FSM_FLUSH_INTERVAL_SEC, FSM_MEMORY_MAX_ENTRIES, FSM_STATE_TTL_HOURS
+from database import load_fsm_state, save_fsm_states
+
+logger = logging.getLogger(__name__)
+
+
+def _storage_key(key: StorageKey):
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+
+def _db_timestamp(ts):
+    """Время в формате CURRENT_TIMESTAMP SQLite (UTC)."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _parse_db_timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+
+
+class SQLiteFSMStorage(BaseStorage):
+    """FSM-хранилище с вытеснением по TTL и лимиту памяти и записью в SQLite.
+
+    - В памяти хранится не больше max_entries состояний (LRU), состояния без
+      активности дольше ttl_hours сбрасываются.
+    - Изменения копятся и записываются в базу пачкой раз в flush_interval
+      секунд (flush_loop) и при закрытии: серия set_state/update_data одного
+      шага сценария даёт одну запись.
+    - Состояния, которых нет в памяти (после перезапуска или вытеснения),
+      загружаются из базы при первом обращении.
+    """
+
+    def __init__(self, ttl_hours=FSM_STATE_TTL_HOURS, max_entries=FSM_MEMORY_MAX_ENTRIES,
+                 flush_interval=FSM_FLUSH_INTERVAL_SEC):
+        self.ttl = ttl_hours * 3600
+        self.ttl_hours = ttl_hours
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        # ключ -> [state, data, время последнего изменения]
+        self._entries = OrderedDict()
+        # ключ -> (state, data, время): ещё не записанные изменения
+        self._dirty = {}
+        self._flush_lock = asyncio.Lock()
+        self.loads = 0
+        self.flushed = 0
+
+    async def _entry(self, key: StorageKey):
+        skey = _storage_key(key)
+        entry = self._entries.get(skey)
+        if entry is None:
+            pending = self._dirty.get(skey)
+            if pending is not None:
+                entry = list(pending)
+            else:
+                self.loads += 1
+                row = await asyncio.to_thread(load_fsm_state, skey, self.ttl_hours)
+                # Пока шла загрузка, состояние могло появиться в памяти
+                entry = self._entries.get(skey)
+                if entry is None:
+                    if row:
+                        entry = [row[0], json.loads(row[1]), _parse_db_timestamp(row[2])]
+                    else:
+                        entry = [None, {}, time.time()]
+            self._remember(skey, entry)
+        elif time.time() - entry[2] > self.ttl:
+            entry[:] = [None, {}, time.time()]
+        self._entries.move_to_end(skey)
+        return skey, entry
+
+    def _remember(self, skey, entry):
+        self._entries[skey] = entry
+        while len(self._entries) > self.max_entries:
+            # Несохранённые изменения вытесненного ключа остаются в _dirty до записи
+            self._entries.popitem(last=False)
+
+    def _touch(self, skey, entry):
+        entry[2] = time.time()
+        self._dirty[skey] = (entry[0], entry[1], entry[2])
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        skey, entry = await self._entry(key)
+        entry[0] = state.state if isinstance(state, State) else state
+        self._touch(skey, entry)
+
+    async def get_state(self, key: StorageKey):
+        _, entry = await self._entry(key)
+        return entry[0]
+
+    async def set_data(self, key: StorageKey, data) -> None:
+        skey, entry = await self._entry(key)
+        entry[1] = data.copy()
+        self._touch(skey, entry)
+
+    async def get_data(self, key: StorageKey):
+        _, entry = await self._entry(key)
+        return entry[1].copy()
+
+    def evict_expired(self):
+        """Убрать из памяти состояния без активности дольше TTL. Возвращает число убранных."""
+        deadline = time.time() - self.ttl
+        expired = [skey for skey, entry in self._entries.items() if entry[2] < deadline]
+        for skey in expired:
+            del self._entries[skey]
+        return len(expired)
+
+    async def flush(self):
+        """Записать накопленные изменения в базу одной транзакцией."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            pending, self._dirty = self._dirty, {}
+            rows = [
+                (skey, state, json.dumps(data, ensure_ascii=False), _db_timestamp(ts))
+                for skey, (state, data, ts) in pending.items()
+            ]
+            try:
+                await asyncio.to_thread(save_fsm_states, rows)
+            except Exception:
+                # Возвращаем в очередь то, что не успели изменить заново
+                for skey, value in pending.items():
+                    self._dirty.setdefault(skey, value)
+                raise
+            self.flushed += len(rows)
+            return len(rows)
+
+    async def flush_loop(self):
+        """Фоновая задача: периодическая запись изменений и очистка памяти."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self.evict_expired()
+            except Exception:
+                logger.exception("Не удалось сохранить состояния FSM")
+
+    async def close(self) -> None:
+        await self.flush()
@@ -1,28 +1,80 @@
 ﻿from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, CommandStart
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.enums import ContentType
+from aiogram.types import Message, CallbackQuery, TelegramObject
+from aiogram.filters import BaseFilter, Command, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+import asyncio
+import hashlib
+import logging
 from datetime import date, datetime
 from html import escape
 
 import keyboards as kb
+from backup import create_backup
+from cache import LRUCache
+from callbacks import (
+    CallbackRoutes, STALE_BUTTON_TEXT,
+    FaqCallback, AdminFaqViewCallback, AdminFaqEditQuestionCallback, AdminFaqEditAnswerCallback,
+    AdminFaqDeleteCallback, AdminFaqConfirmDeleteCallback, ReplyToUserCallback, AdminRemoveCallback,
+    BookCategoryCallback, BookObjectCallback, BookCalendarCallback, BookDayCallback,
+    AdminBookingDetailCallback, AdminBookingConfirmCallback, AdminBookingRejectCallback,
+    AdminBookingCancelCallback, AdminObjectOpenCallback, AdminObjectCalendarCallback,
+    AdminObjectDayCallback, AdminObjectActiveCallback, AdminSubscriptionToggleCallback,
+    AdminBookingDigestCallback, AdminBookingSelectCallback, AdminBookingBulkCallback,
+    FaqPageCallback, AdminFaqPageCallback, AdminAdminsPageCallback, AdminPendingPageCallback,
+    BookDateCalendarCallback, BookFreeObjectsCallback,
+)
+from data_transfer import EXPORT_FORMATS, ExportInputFile, import_stream
+from shared_state import LockTimeout, distributed_lock
+from notifier import booking_alerts, user_notifications
+from holds import date_holds
 from database import (
-    is_admin, get_admins, add_admin, remove_admin,
+    is_admin, get_admins_page, count_admins, add_admin, remove_admin,
     get_admins_for_notifications, get_global_notifications_enabled, toggle_global_notifications,
-    get_faq, get_faq_by_id, add_faq, update_faq, remove_faq,
+    get_admin_notifications_enabled, toggle_admin_notifications,
+    get_admin_subscriptions, toggle_admin_subscription,
+    get_faq_page, get_faq_by_id, add_faq, update_faq, remove_faq,
     generate_ref_token, use_ref_token,
-    set_user_in_support, is_user_in_support,
-    get_objects_by_category, get_object_by_id, get_all_objects_admin,
+    set_user_in_support, is_user_in_support, touch_support_session, save_support_message_links, get_support_message_user,
+    get_objects_by_category, get_object_by_id, get_all_objects_admin, get_free_objects_on_date,
     get_bookings_for_object_month, get_day_status, create_booking,
-    confirm_booking, reject_booking, cancel_booking,
-    get_booking_by_id, get_pending_bookings,
+    confirm_booking, reject_booking, cancel_booking, confirm_bookings, reject_bookings,
+    get_booking_by_id, get_pending_bookings_page, count_pending_bookings, get_pending_booking_ids, get_booking_digest,
     update_object, is_manual_blocked, toggle_object_manual_block,
+    TRANSFER_COLUMNS, get_data_version, get_object_availability_version,
 )
-from config import MAIN_ADMIN_ID
+from config import MAIN_ADMIN_ID, SUPPORT_ALBUM_WAIT_MS, SUPPORT_MESSAGE_MAP_TTL_DAYS, BOOKING_DIGEST_TTL_DAYS
+
+
+class IsAdmin(BaseFilter):
+    """Фильтр роутера: пользователь — администратор (проверка по кэшу списка админов)."""
+
+    async def __call__(self, event: TelegramObject) -> bool:
+        return event.from_user is not None and is_admin(event.from_user.id)
+
 
+# Пользовательские сценарии: меню, FAQ, поддержка, бронирование
+user_router = Router(name="user")
+
+# Админка: фильтр IsAdmin стоит на всём роутере, поэтому обновления обычных
+# пользователей проверяются один раз и не проходят по фильтрам админских обработчиков
+admin_router = Router(name="admin")
+admin_router.message.filter(IsAdmin())
+admin_router.callback_query.filter(IsAdmin())
+
+# Корневой роутер для Dispatcher: сначала админка, затем пользовательская часть
 router = Router()
+router.include_routers(admin_router, user_router)
+
+# Callback-кнопки маршрутизируются через таблицы (см. dispatch_* внизу);
+# неизвестные админской таблице кнопки уходят в пользовательскую
+admin_callbacks = CallbackRoutes(skip_unknown=True)
+user_callbacks = CallbackRoutes()
+logger = logging.getLogger(__name__)
 
 # Категории и deep-link сценарии бронирования
 BOOKING_CATEGORY_NAMES = {
@@ -86,6 +138,14 @@ SUPPORT_TOPICS = {
     },
 }
 
+# Темы уведомлений, на которые подписываются админы: сценарии поддержки
+# и категории бронирования
+NOTIFICATION_TOPIC_NAMES = {
+    "general": "💬 Общая поддержка",
+    "gift_certificate": "🎁 Подарочные сертификаты",
+    **BOOKING_CATEGORY_NAMES,
+}
+
 # === Состояния ===
 class AdminStates(StatesGroup):
     waiting_faq_question = State()
@@ -108,6 +168,11 @@ def get_support_topic_config(topic):
     return SUPPORT_TOPICS.get(topic, SUPPORT_TOPICS["general"])
 
 
+def get_support_topic(topic):
+    """Известный сценарий поддержки (тема уведомлений админов)."""
+    return topic if topic in SUPPORT_TOPICS else "general"
+
+
 def get_message_preview(message: Message):
     """Короткое описание содержимого сообщения для админа."""
     if message.text:
@@ -129,6 +194,172 @@ def get_message_preview(message: Message):
     return "[медиа-сообщение]"
 
 
+# Сообщения, которым при копировании можно задать свою подпись
+CAPTION_CONTENT_TYPES = {
+    ContentType.PHOTO, ContentType.VIDEO, ContentType.DOCUMENT,
+    ContentType.AUDIO, ContentType.ANIMATION, ContentType.VOICE,
+}
+# Лимиты Telegram на длину текста и подписи
+MESSAGE_TEXT_LIMIT = 4096
+CAPTION_LIMIT = 1024
+# Длина превью в заголовке, если сообщение отправляется отдельно от заголовка
+HEADER_PREVIEW_LIMIT = 300
+
+
+def build_support_header(user, topic_config, message_preview):
+    """Заголовок обращения в поддержку для админа (HTML)."""
+    user_info = f"{topic_config['admin_title']}\n\n"
+    user_info += f"Тип обращения: <b>{topic_config['label']}</b>\n"
+    user_info += f"Пользователь: {escape(user.full_name)}\n"
+    if user.username:
+        user_info += f"Username: @{user.username}\n"
+    user_info += f"Telegram ID: <code>{user.id}</code>\n"
+    user_info += f"Сообщение клиента: {escape(message_preview)}\n"
+    user_info += "\n↩️ Ответьте на это сообщение, чтобы написать клиенту.\n"
+    return user_info
+
+
+async def send_support_message_to_admin(message: Message, admin_id, topic_config):
+    """Отправить обращение админу: заголовок, содержимое и кнопка ответа одним сообщением.
+
+    Текст уходит одним send_message, медиа с подписью — одним copy_message с
+    заголовком в подписи. Если подпись не поддерживается (стикер, кружок,
+    геопозиция...) или не помещается в лимит, заголовок отправляется отдельно.
+    Возвращает message_id отправленных сообщений в чате админа.
+    """
+    user = message.from_user
+    reply_markup = kb.get_admin_reply_keyboard(user.id)
+    header = build_support_header(user, topic_config, get_message_preview(message))
+
+    if message.text and len(header) <= MESSAGE_TEXT_LIMIT:
+        sent = await message.bot.send_message(admin_id, header, reply_markup=reply_markup, parse_mode="HTML")
+        return [sent.message_id]
+    if message.content_type in CAPTION_CONTENT_TYPES and len(header) <= CAPTION_LIMIT:
+        sent = await message.copy_to(admin_id, caption=header, parse_mode="HTML", reply_markup=reply_markup)
+        return [sent.message_id]
+
+    preview = get_message_preview(message)
+    if len(preview) > HEADER_PREVIEW_LIMIT:
+        preview = preview[:HEADER_PREVIEW_LIMIT] + "…"
+    header_message = await message.bot.send_message(
+        admin_id,
+        build_support_header(user, topic_config, preview),
+        parse_mode="HTML"
+    )
+    sent = await message.copy_to(admin_id, reply_markup=reply_markup)
+    return [header_message.message_id, sent.message_id]
+
+
+async def send_support_album_to_admin(messages, admin_id, topic_config):
+    """Отправить админу альбом: заголовок с кнопкой ответа и все части одним copy_messages.
+
+    Кнопку к альбому прикрепить нельзя, поэтому она стоит под заголовком.
+    Возвращает message_id заголовка и скопированных частей в чате админа.
+    """
+    first = messages[0]
+    user = first.from_user
+    caption = next((m.caption for m in messages if m.caption), "")
+    preview = f"[альбом: {len(messages)} шт.] {caption}".rstrip()
+    if len(preview) > HEADER_PREVIEW_LIMIT:
+        preview = preview[:HEADER_PREVIEW_LIMIT] + "…"
+
+    header = await first.bot.send_message(
+        admin_id,
+        build_support_header(user, topic_config, preview),
+        reply_markup=kb.get_admin_reply_keyboard(user.id),
+        parse_mode="HTML"
+    )
+    copied = await first.bot.copy_messages(
+        admin_id,
+        from_chat_id=first.chat.id,
+        message_ids=[m.message_id for m in messages],
+    )
+    return [header.message_id] + [m.message_id for m in copied]
+
+
+# Собираемые альбомы: (chat_id, media_group_id) -> {"messages", "topic", "topic_config", "last_part", "task"}
+_support_albums = {}
+
+
+def buffer_support_album_part(message: Message, topic, topic_config):
+    """Добавить часть альбома; первая часть запускает отложенную отправку."""
+    key = (message.chat.id, message.media_group_id)
+    album = _support_albums.get(key)
+    if album is None:
+        album = _support_albums[key] = {"messages": [], "topic": topic, "topic_config": topic_config}
+        album["task"] = asyncio.create_task(_flush_support_album(key))
+    album["messages"].append(message)
+    album["last_part"] = asyncio.get_running_loop().time()
+
+
+async def _flush_support_album(key):
+    """Дождаться последней части альбома и отправить его админам."""
+    delay = SUPPORT_ALBUM_WAIT_MS / 1000
+    loop = asyncio.get_running_loop()
+    while True:
+        remaining = _support_albums[key]["last_part"] + delay - loop.time()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(remaining)
+
+    album = _support_albums.pop(key)
+    messages = sorted(album["messages"], key=lambda m: m.message_id)
+    topic_config = album["topic_config"]
+    user_id = messages[0].from_user.id
+    try:
+        links = []
+        for admin_id in get_admins_for_notifications(album["topic"]):
+            try:
+                sent_ids = await send_support_album_to_admin(messages, admin_id, topic_config)
+                links.extend((admin_id, message_id, user_id) for message_id in sent_ids)
+            except Exception:
+                logger.warning("Не удалось отправить альбом админу %s", admin_id, exc_info=True)
+        save_support_message_links(links)
+
+        await messages[0].answer(
+            topic_config["sent_text"],
+            reply_markup=kb.get_support_keyboard()
+        )
+    except Exception:
+        logger.exception("Не удалось переслать альбом %s", key)
+
+
+# Хэш последнего содержимого, отправленного в сообщение: (chat_id, message_id) -> digest
+_last_rendered = LRUCache(maxsize=10000)
+
+
+def _render_digest(text, reply_markup, parse_mode):
+    """Хэш текста и клавиатуры сообщения."""
+    markup_json = reply_markup.model_dump_json(exclude_none=True) if reply_markup else ""
+    payload = f"{parse_mode}\0{text}\0{markup_json}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+async def edit_callback_message(callback: CallbackQuery, text, reply_markup=None, parse_mode=None):
+    """Изменить сообщение с кнопкой, пропуская запрос к Telegram, если содержимое не изменилось.
+
+    Возвращает False, если сообщение уже было таким. Отвечать на callback
+    по-прежнему должен обработчик. Все правки сообщений из callback'ов должны
+    идти через эту функцию, иначе запомненный хэш устареет.
+    """
+    message = callback.message
+    key = (message.chat.id, message.message_id)
+    digest = _render_digest(text, reply_markup, parse_mode)
+
+    if _last_rendered.get(key) == digest:
+        return False
+
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        _last_rendered.set(key, digest)
+        return False
+    _last_rendered.set(key, digest)
+    return True
+
+
 async def start_support_dialog(callback: CallbackQuery, state: FSMContext, topic="general"):
     """Запустить выбранный сценарий поддержки."""
     topic_config = get_support_topic_config(topic)
@@ -136,7 +367,8 @@ async def start_support_dialog(callback: CallbackQuery, state: FSMContext, topic
     await state.update_data(support_type=topic)
     set_user_in_support(callback.from_user.id, True)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         topic_config["intro_text"],
         reply_markup=kb.get_support_keyboard(),
         parse_mode="HTML"
@@ -159,12 +391,123 @@ def get_admin_panel_text(user_id):
         text += "\n🛠 Роль: <b>админ-технарь</b>"
     return text
 
+# === Кэшируемая разметка ===
+# Ключи включают версию данных, поэтому после изменений разметка перестраивается.
+
+def get_faq_markup(start=None, before=None):
+    """Страница FAQ для пользователя. None, если вопросов нет."""
+    def build():
+        page = get_faq_page(start, before)
+        return kb.get_faq_keyboard(page.items, page.prev_before, page.next_start) if page.items else None
+    return kb.cached_markup(("faq", get_data_version("faq"), start, before), build)
+
+
+def get_admin_faq_markup(start=None, before=None):
+    """Страница управления FAQ."""
+    def build():
+        page = get_faq_page(start, before)
+        return kb.get_admin_faq_keyboard(page.items, page.prev_before, page.next_start)
+    return kb.cached_markup(("admin_faq", get_data_version("faq"), start, before), build)
+
+
+def get_booking_objects_markup(category):
+    """Список объектов категории. None, если активных объектов нет."""
+    def build():
+        objects = get_objects_by_category(category)
+        return kb.get_booking_objects_keyboard(objects, category) if objects else None
+    return kb.cached_markup(("book_objects", category, get_data_version("objects")), build)
+
+
+def get_booking_calendar_markup(object_id, year, month):
+    """Календарь бронирования объекта на месяц (с датами, которые сейчас оформляют)."""
+    key = (
+        "book_cal", object_id, year, month,
+        get_object_availability_version(object_id), date_holds.version(object_id), date.today(),
+    )
+    return kb.cached_markup(
+        key,
+        lambda: kb.get_booking_calendar_keyboard(
+            object_id, year, month, get_bookings_for_object_month(object_id, year, month),
+            held=date_holds.held_dates(object_id, year, month),
+        )
+    )
+
+
+def get_booking_date_calendar_markup(category, year, month):
+    """Календарь подбора по дате (от занятости не зависит)."""
+    return kb.cached_markup(
+        ("book_date_cal", category, year, month, date.today()),
+        lambda: kb.get_booking_date_calendar_keyboard(category, year, month)
+    )
+
+
+def get_admin_object_calendar_markup(object_id, year, month, is_active):
+    """Календарь объекта в админке."""
+    key = (
+        "admin_obj_cal", object_id, year, month, bool(is_active),
+        get_object_availability_version(object_id), date.today(),
+    )
+    return kb.cached_markup(
+        key,
+        lambda: kb.get_admin_object_calendar_keyboard(
+            object_id=object_id,
+            year=year,
+            month=month,
+            bookings=get_bookings_for_object_month(object_id, year, month),
+            is_active=is_active,
+        )
+    )
+
+# === Прогрев соседних месяцев календаря ===
+# Не больше одной фоновой задачи на пользователя: user_id -> asyncio.Task
+_calendar_prefetch_tasks = {}
+
+
+async def _prefetch_calendar_months(object_id, year, month):
+    """Построить календари следующего и предыдущего месяцев в кэш разметки."""
+    today = date.today()
+    next_month = (year + month // 12, month % 12 + 1)
+    prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    try:
+        for y, m in (next_month, prev_month):
+            # Прошлые месяцы в календаре недоступны — их не греем
+            if date(y, m, 1) < date(today.year, today.month, 1):
+                continue
+            # Даём обработчикам других апдейтов выполниться между месяцами
+            await asyncio.sleep(0)
+            get_booking_calendar_markup(object_id, y, m)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Не удалось прогреть календарь объекта %s", object_id)
+
+
+def schedule_calendar_prefetch(user_id, object_id, year, month):
+    """Запустить прогрев соседних месяцев, отменив предыдущий прогрев пользователя."""
+    cancel_calendar_prefetch(user_id)
+    task = asyncio.create_task(_prefetch_calendar_months(object_id, year, month))
+    _calendar_prefetch_tasks[user_id] = task
+
+    def forget(done_task):
+        if _calendar_prefetch_tasks.get(user_id) is done_task:
+            del _calendar_prefetch_tasks[user_id]
+
+    task.add_done_callback(forget)
+
+
+def cancel_calendar_prefetch(user_id):
+    """Отменить прогрев календаря, когда пользователь ушёл из выбора даты."""
+    task = _calendar_prefetch_tasks.pop(user_id, None)
+    if task:
+        task.cancel()
+
 # === Стартовые команды ===
 
-@router.message(CommandStart())
+@user_router.message(CommandStart())
 async def cmd_start(message: Message, state: FSMContext):
     """Обработка /start и реф-ссылок"""
     await state.clear()
+    date_holds.release(message.from_user.id)
 
     # /start аргумент, если есть
     args = (message.text or "").split(maxsplit=1)
@@ -175,8 +518,8 @@ async def cmd_start(message: Message, state: FSMContext):
         # Сначала обрабатываем deep-link сценарии с сайта
         start_category = SITE_START_CATEGORY_MAP.get(start_arg_normalized)
         if start_category:
-            objects = get_objects_by_category(start_category)
-            if not objects:
+            objects_markup = get_booking_objects_markup(start_category)
+            if not objects_markup:
                 category_name = BOOKING_CATEGORY_NAMES.get(start_category, "выбранной категории")
                 await message.answer(
                     f"📭 В <b>{category_name}</b> пока нет доступных объектов.\n\n"
@@ -190,7 +533,7 @@ async def cmd_start(message: Message, state: FSMContext):
             await message.answer(
                 f"📅 <b>{BOOKING_CATEGORY_NAMES.get(start_category, 'Бронирование')}</b>\n\n"
                 "Выберите объект:",
-                reply_markup=kb.get_booking_objects_keyboard(objects, start_category),
+                reply_markup=objects_markup,
                 parse_mode="HTML"
             )
             return
@@ -219,26 +562,25 @@ async def cmd_start(message: Message, state: FSMContext):
         parse_mode="HTML"
     )
 
-@router.message(Command("admin"))
+@user_router.message(Command("admin", "add_admin", "backup", "export"))
+@user_router.message(F.document, F.caption.startswith("/import"))
+async def cmd_admin_denied(message: Message):
+    """Админские команды от обычного пользователя"""
+    await message.answer("⛔ У вас нет доступа к этой команде.")
+
+
+@admin_router.message(Command("admin"))
 async def cmd_admin(message: Message):
     """Админ-панель"""
-    if not is_admin(message.from_user.id):
-        await message.answer("⛔ У вас нет доступа к админ-панели.")
-        return
-
     await message.answer(
         get_admin_panel_text(message.from_user.id),
         reply_markup=get_admin_panel_keyboard(message.from_user.id),
         parse_mode="HTML"
     )
 
-@router.message(Command("add_admin"))
+@admin_router.message(Command("add_admin"))
 async def cmd_add_admin(message: Message):
     """Добавить администратора по Telegram ID."""
-    if not is_admin(message.from_user.id):
-        await message.answer("⛔ У вас нет доступа к этой команде.")
-        return
-
     parts = (message.text or "").split(maxsplit=1)
     if len(parts) < 2:
         await message.answer(
@@ -270,7 +612,88 @@ async def cmd_add_admin(message: Message):
     else:
         await message.answer("❌ Не удалось добавить администратора.")
 
-@router.message(Command("help"))
+@admin_router.message(Command("backup"))
+async def cmd_backup(message: Message):
+    """Создать резервную копию базы по запросу админа."""
+    status_message = await message.answer("⏳ Создаю резервную копию базы...")
+    try:
+        info = await create_backup()
+    except Exception as e:
+        await status_message.edit_text(f"❌ Не удалось создать резервную копию: {escape(str(e))}")
+        return
+
+    await status_message.edit_text(
+        "💾 <b>Резервная копия создана</b>\n\n"
+        f"Файл: <code>{info['name']}</code>\n"
+        f"Размер: {info['size'] / 1024:.1f} КБ\n"
+        f"Время: {info['duration']:.2f} с\n"
+        f"Удалено старых копий: {info['rotated']}",
+        parse_mode="HTML"
+    )
+
+@admin_router.message(Command("export"))
+async def cmd_export(message: Message):
+    """Выгрузить бронирования или объекты файлом CSV/JSONL."""
+    parts = (message.text or "").split()
+    table = parts[1].lower() if len(parts) > 1 else "bookings"
+    fmt = parts[2].lower() if len(parts) > 2 else "csv"
+    if table not in TRANSFER_COLUMNS or fmt not in EXPORT_FORMATS:
+        await message.answer(
+            "Использование: <code>/export bookings|objects csv|jsonl</code>",
+            parse_mode="HTML"
+        )
+        return
+
+    filename = f"{table}-{date.today().isoformat()}.{fmt}"
+    await message.answer_document(
+        ExportInputFile(table, fmt, filename),
+        caption=f"📤 Выгрузка <b>{table}</b> ({fmt})",
+        parse_mode="HTML"
+    )
+
+@admin_router.message(F.document, F.caption.startswith("/import"))
+async def cmd_import(message: Message):
+    """Импорт файла CSV/JSONL, отправленного с подписью /import bookings|objects [replace]."""
+    parts = message.caption.split()
+    table = parts[1].lower() if len(parts) > 1 else ""
+    on_conflict = "replace" if len(parts) > 2 and parts[2].lower() == "replace" else "skip"
+    fmt = (message.document.file_name or "").rsplit(".", 1)[-1].lower()
+    if table not in TRANSFER_COLUMNS or fmt not in EXPORT_FORMATS:
+        await message.answer(
+            "Отправьте файл <code>.csv</code> или <code>.jsonl</code> с подписью\n"
+            "<code>/import bookings|objects [replace]</code>\n\n"
+            "По умолчанию существующие записи с тем же ID пропускаются.",
+            parse_mode="HTML"
+        )
+        return
+
+    status_message = await message.answer("⏳ Импортирую данные...")
+    try:
+        stream = await message.bot.download(message.document)
+        total, written, rejected, errors = await asyncio.to_thread(import_stream, table, fmt, stream, on_conflict)
+    except Exception as e:
+        # Пачки, прочитанные до ошибки файла, уже записаны
+        await status_message.edit_text(
+            f"❌ Ошибка импорта: {escape(str(e))}\n\n"
+            "Строки, прочитанные до ошибки, могли быть уже записаны."
+        )
+        return
+
+    text = (
+        f"✅ Импорт <b>{table}</b> завершён\n\n"
+        f"Строк в файле: {total}\n"
+        f"Записано: {written}\n"
+        f"Пропущено (ID уже есть): {total - written - rejected}\n"
+        f"Отклонено: {rejected}"
+    )
+    if errors:
+        text += "\n\n<b>Отклонённые строки:</b>\n"
+        text += "\n".join(f"• {number}: {escape(reason)}" for number, reason in errors)
+        if rejected > len(errors):
+            text += f"\n… и ещё {rejected - len(errors)}"
+    await status_message.edit_text(text, parse_mode="HTML")
+
+@user_router.message(Command("help"))
 async def cmd_help(message: Message):
     """Помощь"""
     text = (
@@ -281,18 +704,24 @@ async def cmd_help(message: Message):
     if is_admin(message.from_user.id):
         text += "/admin — Панель администратора\n"
         text += "/add_admin ID — Добавить админа по Telegram ID\n"
+        text += "/backup — Резервная копия базы\n"
+        text += "/export bookings|objects csv|jsonl — Выгрузка данных\n"
+        text += "/import — Импорт (файл с подписью /import bookings|objects)\n"
 
     await message.answer(text, parse_mode="HTML")
 
 # === Callback обработчики — Главное меню ===
 
-@router.callback_query(F.data == "back_main")
+@user_callbacks.exact("back_main")
 async def callback_back_main(callback: CallbackQuery, state: FSMContext):
     """Вернуться в главное меню"""
     await state.clear()
+    date_holds.release(callback.from_user.id)
+    cancel_calendar_prefetch(callback.from_user.id)
     set_user_in_support(callback.from_user.id, False)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "👋 <b>Главное меню</b>\n\n"
         "🏞 <b>Лебяжье озеро</b> — отдых и рыбалка в Крыму\n\n"
         "Выберите, что вас интересует:",
@@ -302,34 +731,38 @@ async def callback_back_main(callback: CallbackQuery, state: FSMContext):
 
 # === FAQ ===
 
-@router.callback_query(F.data == "faq_menu")
-async def callback_faq_menu(callback: CallbackQuery):
-    """Меню FAQ"""
-    faq_list = get_faq()
-    if not faq_list:
-        await callback.message.edit_text(
+@user_callbacks.exact("faq_menu")
+@user_callbacks.data(FaqPageCallback)
+async def callback_faq_menu(callback: CallbackQuery, callback_data: FaqPageCallback = None):
+    """Меню FAQ (страница списка вопросов)"""
+    if callback_data is not None:
+        faq_markup = get_faq_markup(callback_data.start, callback_data.before)
+    else:
+        faq_markup = get_faq_markup()
+    if not faq_markup:
+        await edit_callback_message(
+            callback,
             "📭 Пока нет частых вопросов.",
             reply_markup=kb.get_back_keyboard()
         )
         return
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "❓ <b>Частые вопросы</b>\n\nВыберите интересующий вопрос:",
-        reply_markup=kb.get_faq_keyboard(faq_list),
+        reply_markup=faq_markup,
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("faq_"))
-async def callback_faq_answer(callback: CallbackQuery):
+@user_callbacks.data(FaqCallback)
+async def callback_faq_answer(callback: CallbackQuery, callback_data: FaqCallback):
     """Ответ на FAQ"""
-    if callback.data == "faq_menu":
-        return
-
-    faq_id = int(callback.data.replace("faq_", ""))
+    faq_id = callback_data.faq_id
     item = get_faq_by_id(faq_id)
 
     if item:
-        await callback.message.edit_text(
+        await edit_callback_message(
+            callback,
             f"❓ <b>{item['question']}</b>\n\n{item['answer']}",
             reply_markup=kb.get_faq_answer_keyboard(),
             parse_mode="HTML"
@@ -339,36 +772,38 @@ async def callback_faq_answer(callback: CallbackQuery):
 
 # === Поддержка ===
 
-@router.callback_query(F.data == "gift_certificate_menu")
+@user_callbacks.exact("gift_certificate_menu")
 async def callback_gift_certificate_menu(callback: CallbackQuery, state: FSMContext):
     """Раздел подарочных сертификатов."""
     await state.clear()
     set_user_in_support(callback.from_user.id, False)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         GIFT_CERTIFICATE_MENU_TEXT,
         reply_markup=kb.get_gift_certificate_keyboard(),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "support_start")
+@user_callbacks.exact("support_start")
 async def callback_support_start(callback: CallbackQuery, state: FSMContext):
     """Начать диалог с поддержкой"""
     await start_support_dialog(callback, state, topic="general")
 
 
-@router.callback_query(F.data == "gift_certificate_support")
+@user_callbacks.exact("gift_certificate_support")
 async def callback_gift_certificate_support(callback: CallbackQuery, state: FSMContext):
     """Начать диалог по подарочным сертификатам."""
     await start_support_dialog(callback, state, topic="gift_certificate")
 
-@router.callback_query(F.data == "support_end")
+@user_callbacks.exact("support_end")
 async def callback_support_end(callback: CallbackQuery, state: FSMContext):
     """Завершить диалог с поддержкой"""
     await state.clear()
     set_user_in_support(callback.from_user.id, False)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "✅ Диалог с поддержкой завершён.\n\n"
         "Спасибо за обращение! Если у вас появятся ещё вопросы — мы всегда на связи.",
         reply_markup=kb.get_main_keyboard(is_admin(callback.from_user.id))
@@ -376,11 +811,11 @@ async def callback_support_end(callback: CallbackQuery, state: FSMContext):
 
 # === Сообщения от пользователя в режиме поддержки ===
 
-@router.message(UserStates.in_support)
+@user_router.message(UserStates.in_support)
 async def handle_support_message(message: Message, state: FSMContext):
     """Пересылка сообщения от пользователя админам"""
     state_data = await state.get_data()
-    support_type = state_data.get("support_type", "general")
+    support_type = get_support_topic(state_data.get("support_type", "general"))
     topic_config = get_support_topic_config(support_type)
 
     if not get_global_notifications_enabled():
@@ -390,38 +825,26 @@ async def handle_support_message(message: Message, state: FSMContext):
         )
         return
 
-    admins = get_admins_for_notifications()
+    # Сессия поддержки истекает по времени последнего сообщения, а не начала
+    touch_support_session(message.from_user.id)
 
-    user = message.from_user
-    message_preview = escape(get_message_preview(message))
-    user_full_name = escape(user.full_name)
+    # Части альбома собираются и уходят админам одной пачкой
+    if message.media_group_id:
+        buffer_support_album_part(message, support_type, topic_config)
+        return
 
-    user_info = f"{topic_config['admin_title']}\n\n"
-    user_info += f"Тип обращения: <b>{topic_config['label']}</b>\n"
-    user_info += f"Пользователь: {user_full_name}\n"
-    if user.username:
-        user_info += f"Username: @{user.username}\n"
-    user_info += f"Telegram ID: <code>{user.id}</code>\n"
-    user_info += f"Сообщение клиента: {message_preview}\n"
+    admins = get_admins_for_notifications(support_type)
 
-    # Отправляем всем админам
+    # Отправляем подписанным админам и запоминаем, куда ушло обращение: ответ
+    # реплаем на любое из этих сообщений попадёт пользователю
+    links = []
     for admin_id in admins:
         try:
-            await message.bot.send_message(
-                admin_id,
-                user_info,
-                parse_mode="HTML"
-            )
-            # Пересылаем оригинальное сообщение
-            await message.forward(admin_id)
-            # Кнопка ответа
-            await message.bot.send_message(
-                admin_id,
-                "Нажмите кнопку ниже, чтобы ответить:",
-                reply_markup=kb.get_admin_reply_keyboard(user.id)
-            )
+            sent_ids = await send_support_message_to_admin(message, admin_id, topic_config)
+            links.extend((admin_id, message_id, message.from_user.id) for message_id in sent_ids)
         except Exception as e:
             print(f"Не удалось отправить сообщение админу {admin_id}: {e}")
+    save_support_message_links(links)
 
     await message.answer(
         topic_config["sent_text"],
@@ -430,14 +853,10 @@ async def handle_support_message(message: Message, state: FSMContext):
 
 # === Админ: Ответ пользователю ===
 
-@router.callback_query(F.data.startswith("reply_to_"))
-async def callback_reply_to_user(callback: CallbackQuery, state: FSMContext):
+@admin_callbacks.data(ReplyToUserCallback)
+async def callback_reply_to_user(callback: CallbackQuery, state: FSMContext, callback_data: ReplyToUserCallback):
     """Начать отвечать пользователю"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    user_id = int(callback.data.replace("reply_to_", ""))
+    user_id = callback_data.user_id
     await state.set_state(AdminStates.waiting_reply_to_user)
     await state.update_data(reply_to_user_id=user_id)
 
@@ -448,11 +867,22 @@ async def callback_reply_to_user(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
-@router.message(AdminStates.waiting_reply_to_user)
+@admin_router.message(AdminStates.waiting_reply_to_user)
+@admin_router.message(F.reply_to_message)
 async def handle_admin_reply(message: Message, state: FSMContext):
-    """Отправить ответ пользователю"""
-    state_data = await state.get_data()
-    user_id = state_data.get("reply_to_user_id")
+    """Отправить ответ пользователю: реплаем на обращение или после кнопки «Ответить»"""
+    waiting_reply = await state.get_state() == AdminStates.waiting_reply_to_user.state
+    user_id = None
+    if message.reply_to_message:
+        user_id = get_support_message_user(
+            message.chat.id, message.reply_to_message.message_id, SUPPORT_MESSAGE_MAP_TTL_DAYS
+        )
+    if user_id is None:
+        if not waiting_reply:
+            # Реплай не на обращение — сообщение обработают другие хендлеры
+            raise SkipHandler()
+        state_data = await state.get_data()
+        user_id = state_data.get("reply_to_user_id")
 
     if not user_id:
         await state.clear()
@@ -471,50 +901,84 @@ async def handle_admin_reply(message: Message, state: FSMContext):
         await message.copy_to(user_id)
 
         await message.answer(f"✅ Ответ отправлен пользователю ID: {user_id}")
+        touch_support_session(user_id)
     except Exception as e:
         await message.answer(f"❌ Не удалось отправить сообщение: {e}")
 
-    await state.clear()
+    # Реплай не прерывает другой сценарий админа (например, правку FAQ)
+    if waiting_reply:
+        await state.clear()
 
 # === Админ-панель ===
 
-@router.callback_query(F.data == "admin_panel")
+@admin_callbacks.exact("admin_panel")
 async def callback_admin_panel(callback: CallbackQuery):
     """Админ-панель"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    try:
-        await callback.message.edit_text(
-            get_admin_panel_text(callback.from_user.id),
-            reply_markup=get_admin_panel_keyboard(callback.from_user.id),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        if "message is not modified" in str(e):
-            await callback.answer()
-            return
-        raise
+    edited = await edit_callback_message(
+        callback,
+        get_admin_panel_text(callback.from_user.id),
+        reply_markup=get_admin_panel_keyboard(callback.from_user.id),
+        parse_mode="HTML"
+    )
+    if not edited:
+        await callback.answer()
 
 
-@router.callback_query(F.data == "admin_toggle_notifications")
+@admin_callbacks.exact("admin_toggle_notifications")
 async def callback_admin_toggle_notifications(callback: CallbackQuery):
     """Включить/выключить все автоматические уведомления бота."""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
     notifications_enabled = toggle_global_notifications()
     status_text = "включены" if notifications_enabled else "выключены"
     await callback.answer(f"Глобальные уведомления {status_text}", show_alert=True)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         get_admin_panel_text(callback.from_user.id),
         reply_markup=get_admin_panel_keyboard(callback.from_user.id),
         parse_mode="HTML"
     )
 
+# === Админ: Личные уведомления ===
+
+async def render_admin_subscriptions(callback: CallbackQuery):
+    """Экран личных уведомлений админа."""
+    user_id = callback.from_user.id
+    notifications_enabled = get_admin_notifications_enabled(user_id)
+    status_text = "включены" if notifications_enabled else "выключены"
+    await edit_callback_message(
+        callback,
+        "🔔 <b>Мои уведомления</b>\n\n"
+        f"Уведомления для вас: <b>{status_text}</b>\n\n"
+        "Отметьте темы, по которым вам приходят обращения и заявки:",
+        reply_markup=kb.get_admin_subscriptions_keyboard(
+            NOTIFICATION_TOPIC_NAMES, get_admin_subscriptions(user_id), notifications_enabled
+        ),
+        parse_mode="HTML"
+    )
+
+@admin_callbacks.exact("admin_subscriptions")
+async def callback_admin_subscriptions(callback: CallbackQuery):
+    """Личные уведомления админа"""
+    await render_admin_subscriptions(callback)
+    await callback.answer()
+
+@admin_callbacks.exact("admin_toggle_my_notifications")
+async def callback_admin_toggle_my_notifications(callback: CallbackQuery):
+    """Включить/выключить все уведомления для себя"""
+    toggle_admin_notifications(callback.from_user.id)
+    await render_admin_subscriptions(callback)
+    await callback.answer()
+
+@admin_callbacks.data(AdminSubscriptionToggleCallback)
+async def callback_admin_toggle_subscription(callback: CallbackQuery, callback_data: AdminSubscriptionToggleCallback):
+    """Подписаться на тему уведомлений или отписаться"""
+    if callback_data.topic not in NOTIFICATION_TOPIC_NAMES:
+        await callback.answer(STALE_BUTTON_TEXT, show_alert=True)
+        return
+    toggle_admin_subscription(callback.from_user.id, callback_data.topic)
+    await render_admin_subscriptions(callback)
+    await callback.answer()
+
 # === Админ: Управление FAQ ===
 
 def build_admin_faq_item_text(item):
@@ -525,35 +989,30 @@ def build_admin_faq_item_text(item):
         f"💬 <b>Ответ:</b>\n{item['answer']}"
     )
 
-@router.callback_query(F.data == "admin_faq")
-async def callback_admin_faq(callback: CallbackQuery, state: FSMContext):
-    """Управление FAQ"""
+@admin_callbacks.exact("admin_faq")
+@admin_callbacks.data(AdminFaqPageCallback)
+async def callback_admin_faq(callback: CallbackQuery, state: FSMContext, callback_data: AdminFaqPageCallback = None):
+    """Управление FAQ (страница списка вопросов)"""
     await state.clear()
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_list = get_faq()
-    await callback.message.edit_text(
+    page = callback_data or AdminFaqPageCallback()
+    await edit_callback_message(
+        callback,
         "📝 <b>Управление FAQ</b>\n\n"
         "Нажмите на вопрос, чтобы открыть меню редактирования.",
-        reply_markup=kb.get_admin_faq_keyboard(faq_list),
+        reply_markup=get_admin_faq_markup(page.start, page.before),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_faq_view_"))
-async def callback_admin_faq_view(callback: CallbackQuery, state: FSMContext):
+@admin_callbacks.data(AdminFaqViewCallback)
+async def callback_admin_faq_view(callback: CallbackQuery, state: FSMContext, callback_data: AdminFaqViewCallback):
     """Открыть меню редактирования FAQ"""
     await state.clear()
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_id = int(callback.data.replace("admin_faq_view_", ""))
+    faq_id = callback_data.faq_id
     item = get_faq_by_id(faq_id)
 
     if item:
-        await callback.message.edit_text(
+        await edit_callback_message(
+            callback,
             build_admin_faq_item_text(item),
             reply_markup=kb.get_admin_faq_item_keyboard(faq_id),
             parse_mode="HTML"
@@ -562,14 +1021,10 @@ async def callback_admin_faq_view(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Вопрос не найден", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("admin_faq_edit_q_"))
-async def callback_admin_faq_edit_question(callback: CallbackQuery, state: FSMContext):
+@admin_callbacks.data(AdminFaqEditQuestionCallback)
+async def callback_admin_faq_edit_question(callback: CallbackQuery, state: FSMContext, callback_data: AdminFaqEditQuestionCallback):
     """Изменить текст вопроса FAQ"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_id = int(callback.data.replace("admin_faq_edit_q_", ""))
+    faq_id = callback_data.faq_id
     item = get_faq_by_id(faq_id)
     if not item:
         await callback.answer("Вопрос не найден", show_alert=True)
@@ -577,7 +1032,8 @@ async def callback_admin_faq_edit_question(callback: CallbackQuery, state: FSMCo
 
     await state.set_state(AdminStates.editing_faq_question)
     await state.update_data(edit_faq_id=faq_id)
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "✏️ <b>Редактирование вопроса</b>\n\n"
         f"Текущий вопрос:\n{item['question']}\n\n"
         "Отправьте новый текст вопроса.",
@@ -586,14 +1042,10 @@ async def callback_admin_faq_edit_question(callback: CallbackQuery, state: FSMCo
     )
 
 
-@router.callback_query(F.data.startswith("admin_faq_edit_a_"))
-async def callback_admin_faq_edit_answer(callback: CallbackQuery, state: FSMContext):
+@admin_callbacks.data(AdminFaqEditAnswerCallback)
+async def callback_admin_faq_edit_answer(callback: CallbackQuery, state: FSMContext, callback_data: AdminFaqEditAnswerCallback):
     """Изменить текст ответа FAQ"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_id = int(callback.data.replace("admin_faq_edit_a_", ""))
+    faq_id = callback_data.faq_id
     item = get_faq_by_id(faq_id)
     if not item:
         await callback.answer("Вопрос не найден", show_alert=True)
@@ -601,7 +1053,8 @@ async def callback_admin_faq_edit_answer(callback: CallbackQuery, state: FSMCont
 
     await state.set_state(AdminStates.editing_faq_answer)
     await state.update_data(edit_faq_id=faq_id)
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "📝 <b>Редактирование ответа</b>\n\n"
         f"Вопрос:\n{item['question']}\n\n"
         f"Текущий ответ:\n{item['answer']}\n\n"
@@ -611,7 +1064,7 @@ async def callback_admin_faq_edit_answer(callback: CallbackQuery, state: FSMCont
     )
 
 
-@router.message(AdminStates.editing_faq_question)
+@admin_router.message(AdminStates.editing_faq_question)
 async def handle_admin_edit_faq_question(message: Message, state: FSMContext):
     """Сохранить новый текст вопроса FAQ"""
     text = (message.text or "").strip()
@@ -647,7 +1100,7 @@ async def handle_admin_edit_faq_question(message: Message, state: FSMContext):
     )
 
 
-@router.message(AdminStates.editing_faq_answer)
+@admin_router.message(AdminStates.editing_faq_answer)
 async def handle_admin_edit_faq_answer(message: Message, state: FSMContext):
     """Сохранить новый текст ответа FAQ"""
     text = (message.text or "").strip()
@@ -682,61 +1135,51 @@ async def handle_admin_edit_faq_answer(message: Message, state: FSMContext):
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_faq_delete_"))
-async def callback_admin_faq_delete(callback: CallbackQuery):
+@admin_callbacks.data(AdminFaqDeleteCallback)
+async def callback_admin_faq_delete(callback: CallbackQuery, callback_data: AdminFaqDeleteCallback):
     """Подтверждение удаления FAQ"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_id = int(callback.data.replace("admin_faq_delete_", ""))
+    faq_id = callback_data.faq_id
     item = get_faq_by_id(faq_id)
 
     if item:
-        await callback.message.edit_text(
+        await edit_callback_message(
+            callback,
             "🗑 <b>Удалить вопрос?</b>\n\n"
             f"❓ {item['question']}",
             reply_markup=kb.get_confirm_delete_faq_keyboard(faq_id),
             parse_mode="HTML"
         )
 
-@router.callback_query(F.data.startswith("admin_faq_confirm_delete_"))
-async def callback_admin_faq_confirm_delete(callback: CallbackQuery):
+@admin_callbacks.data(AdminFaqConfirmDeleteCallback)
+async def callback_admin_faq_confirm_delete(callback: CallbackQuery, callback_data: AdminFaqConfirmDeleteCallback):
     """Удаление FAQ"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    faq_id = int(callback.data.replace("admin_faq_confirm_delete_", ""))
+    faq_id = callback_data.faq_id
 
     if remove_faq(faq_id):
         await callback.answer("✅ Вопрос удалён", show_alert=True)
-        faq_list = get_faq()
-        await callback.message.edit_text(
+        await edit_callback_message(
+            callback,
             "📝 <b>Управление FAQ</b>\n\n"
             "Нажмите на вопрос, чтобы открыть меню редактирования.",
-            reply_markup=kb.get_admin_faq_keyboard(faq_list),
+            reply_markup=get_admin_faq_markup(),
             parse_mode="HTML"
         )
     else:
         await callback.answer("❌ Ошибка удаления", show_alert=True)
 
-@router.callback_query(F.data == "admin_faq_add")
+@admin_callbacks.exact("admin_faq_add")
 async def callback_admin_faq_add(callback: CallbackQuery, state: FSMContext):
     """Добавить FAQ — шаг 1"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
     await state.set_state(AdminStates.waiting_faq_question)
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "➕ <b>Добавление FAQ</b>\n\n"
         "Шаг 1/2: Напишите вопрос",
         reply_markup=kb.get_cancel_keyboard(),
         parse_mode="HTML"
     )
 
-@router.message(AdminStates.waiting_faq_question)
+@admin_router.message(AdminStates.waiting_faq_question)
 async def handle_faq_question(message: Message, state: FSMContext):
     """Добавить FAQ — шаг 2"""
     await state.update_data(faq_question=message.text)
@@ -748,7 +1191,7 @@ async def handle_faq_question(message: Message, state: FSMContext):
         parse_mode="HTML"
     )
 
-@router.message(AdminStates.waiting_faq_answer)
+@admin_router.message(AdminStates.waiting_faq_answer)
 async def handle_faq_answer(message: Message, state: FSMContext):
     """Добавить FAQ — финал"""
     state_data = await state.get_data()
@@ -767,30 +1210,32 @@ async def handle_faq_answer(message: Message, state: FSMContext):
 
 # === Админ: Управление админами ===
 
-@router.callback_query(F.data == "admin_admins")
-async def callback_admin_admins(callback: CallbackQuery):
-    """Управление админами"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    admins = get_admins()
-    await callback.message.edit_text(
+async def render_admin_admins(callback: CallbackQuery, start=None, before=None):
+    """Страница списка админов."""
+    page = get_admins_page(start, before)
+    await edit_callback_message(
+        callback,
         "👥 <b>Управление администраторами</b>\n\n"
-        f"Всего админов: {len(admins)}\n"
+        f"Всего админов: {count_admins()}\n"
         "★ — админ-технарь (главный, нельзя удалить)",
-        reply_markup=kb.get_admin_admins_keyboard(admins, MAIN_ADMIN_ID),
+        reply_markup=kb.get_admin_admins_keyboard(page.items, MAIN_ADMIN_ID, page.prev_before, page.next_start),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_remove_"))
-async def callback_admin_remove(callback: CallbackQuery):
-    """Удалить админа"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
+@admin_callbacks.exact("admin_admins")
+async def callback_admin_admins(callback: CallbackQuery):
+    """Управление админами"""
+    await render_admin_admins(callback)
 
-    admin_id = int(callback.data.replace("admin_remove_", ""))
+@admin_callbacks.data(AdminAdminsPageCallback)
+async def callback_admin_admins_page(callback: CallbackQuery, callback_data: AdminAdminsPageCallback):
+    """Другая страница списка админов"""
+    await render_admin_admins(callback, callback_data.start, callback_data.before)
+
+@admin_callbacks.data(AdminRemoveCallback)
+async def callback_admin_remove(callback: CallbackQuery, callback_data: AdminRemoveCallback):
+    """Удалить админа"""
+    admin_id = callback_data.admin_id
 
     if admin_id == MAIN_ADMIN_ID:
         await callback.answer("⛔ Нельзя удалить главного админа", show_alert=True)
@@ -798,36 +1243,28 @@ async def callback_admin_remove(callback: CallbackQuery):
 
     if remove_admin(admin_id):
         await callback.answer("✅ Админ удалён", show_alert=True)
-        admins = get_admins()
-        await callback.message.edit_text(
-            "👥 <b>Управление администраторами</b>\n\n"
-            f"Всего админов: {len(admins)}",
-            reply_markup=kb.get_admin_admins_keyboard(admins, MAIN_ADMIN_ID),
-            parse_mode="HTML"
-        )
+        # Страница, на которой был удалённый админ
+        await render_admin_admins(callback, before=admin_id + 1)
     else:
         await callback.answer("❌ Ошибка удаления", show_alert=True)
 
-@router.callback_query(F.data == "noop")
+@user_callbacks.exact("noop")
 async def callback_noop(callback: CallbackQuery):
     """Заглушка"""
     await callback.answer()
 
 # === Админ: Создание реф-ссылки ===
 
-@router.callback_query(F.data == "admin_create_ref")
+@admin_callbacks.exact("admin_create_ref")
 async def callback_admin_create_ref(callback: CallbackQuery):
     """Создать реферальную ссылку"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
     token = generate_ref_token(callback.from_user.id)
     bot_info = await callback.bot.get_me()
 
     ref_link = f"https://t.me/{bot_info.username}?start={token}"
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "🔗 <b>Реферальная ссылка создана!</b>\n\n"
         f"<code>{ref_link}</code>\n\n"
         "Отправьте эту ссылку человеку, которого хотите сделать админом.\n"
@@ -838,47 +1275,54 @@ async def callback_admin_create_ref(callback: CallbackQuery):
 
 # === Бронирование (пользователь) ===
 
-@router.callback_query(F.data == "booking")
+@user_callbacks.exact("booking")
 async def callback_booking_start(callback: CallbackQuery, state: FSMContext):
     """Бронирование: выбор категории"""
     await state.clear()
-    await callback.message.edit_text(
+    cancel_calendar_prefetch(callback.from_user.id)
+    date_holds.release(callback.from_user.id)
+    await edit_callback_message(
+        callback,
         "📅 <b>Бронирование</b>\n\nВыберите категорию:",
         reply_markup=kb.get_booking_categories_keyboard(),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "book_back_categories")
+@user_callbacks.exact("book_back_categories")
 async def callback_book_back_categories(callback: CallbackQuery, state: FSMContext):
     """Назад к категориям"""
     await state.clear()
-    await callback.message.edit_text(
+    cancel_calendar_prefetch(callback.from_user.id)
+    date_holds.release(callback.from_user.id)
+    await edit_callback_message(
+        callback,
         "📅 <b>Бронирование</b>\n\nВыберите категорию:",
         reply_markup=kb.get_booking_categories_keyboard(),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("book_cat_"))
-async def callback_booking_category(callback: CallbackQuery, state: FSMContext):
+@user_callbacks.data(BookCategoryCallback)
+async def callback_booking_category(callback: CallbackQuery, state: FSMContext, callback_data: BookCategoryCallback):
     """Бронирование: список объектов в категории"""
-    category = callback.data.replace("book_cat_", "")
-    objects = get_objects_by_category(category)
+    category = callback_data.category
+    objects_markup = get_booking_objects_markup(category)
 
-    if not objects:
+    if not objects_markup:
         await callback.answer("Нет доступных объектов в этой категории", show_alert=True)
         return
 
     await state.update_data(booking_category=category)
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>{BOOKING_CATEGORY_NAMES.get(category, 'Бронирование')}</b>\n\nВыберите объект:",
-        reply_markup=kb.get_booking_objects_keyboard(objects, category),
+        reply_markup=objects_markup,
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("book_obj_"))
-async def callback_booking_object(callback: CallbackQuery, state: FSMContext):
+@user_callbacks.data(BookObjectCallback)
+async def callback_booking_object(callback: CallbackQuery, state: FSMContext, callback_data: BookObjectCallback):
     """Бронирование: показ календаря для объекта"""
-    object_id = int(callback.data.replace("book_obj_", ""))
+    object_id = callback_data.object_id
     obj = get_object_by_id(object_id)
     if not obj:
         await callback.answer("Объект не найден", show_alert=True)
@@ -886,7 +1330,6 @@ async def callback_booking_object(callback: CallbackQuery, state: FSMContext):
 
     today = date.today()
     year, month = today.year, today.month
-    bookings = get_bookings_for_object_month(object_id, year, month)
 
     await state.update_data(booking_object_id=object_id, booking_category=obj['category'])
 
@@ -894,64 +1337,136 @@ async def callback_booking_object(callback: CallbackQuery, state: FSMContext):
     if obj['price_weekday'] != obj['price_weekend']:
         price_text = f"{obj['price_weekday']}₽ будни / {obj['price_weekend']}₽ выходные"
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>{obj['name']}</b>\n"
         f"👥 До {obj['capacity']} человек | {price_text}\n\n"
         "Выберите дату:",
-        reply_markup=kb.get_booking_calendar_keyboard(object_id, year, month, bookings),
+        reply_markup=get_booking_calendar_markup(object_id, year, month),
         parse_mode="HTML"
     )
+    schedule_calendar_prefetch(callback.from_user.id, object_id, year, month)
 
-@router.callback_query(F.data.startswith("book_cal_"))
-async def callback_booking_calendar_nav(callback: CallbackQuery, state: FSMContext):
+@user_callbacks.data(BookCalendarCallback)
+async def callback_booking_calendar_nav(callback: CallbackQuery, state: FSMContext, callback_data: BookCalendarCallback):
     """Бронирование: навигация по месяцам"""
-    parts = callback.data.split("_")  # book_cal_{id}_{year}_{month}
-    object_id = int(parts[2])
-    year = int(parts[3])
-    month = int(parts[4])
+    object_id = callback_data.object_id
+    year = callback_data.year
+    month = callback_data.month
 
     obj = get_object_by_id(object_id)
     if not obj:
         await callback.answer("Объект не найден", show_alert=True)
         return
 
-    bookings = get_bookings_for_object_month(object_id, year, month)
-
     price_text = f"{obj['price_weekday']}₽/день"
     if obj['price_weekday'] != obj['price_weekend']:
         price_text = f"{obj['price_weekday']}₽ будни / {obj['price_weekend']}₽ выходные"
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>{obj['name']}</b>\n"
         f"👥 До {obj['capacity']} человек | {price_text}\n\n"
         "Выберите дату:",
-        reply_markup=kb.get_booking_calendar_keyboard(object_id, year, month, bookings),
+        reply_markup=get_booking_calendar_markup(object_id, year, month),
         parse_mode="HTML"
     )
+    schedule_calendar_prefetch(callback.from_user.id, object_id, year, month)
 
-@router.callback_query(F.data == "book_back_objects")
+@user_callbacks.exact("book_back_objects")
 async def callback_book_back_objects(callback: CallbackQuery, state: FSMContext):
     """Назад к списку объектов"""
+    cancel_calendar_prefetch(callback.from_user.id)
+    date_holds.release(callback.from_user.id)
     state_data = await state.get_data()
     category = state_data.get("booking_category", "gazebo_fishing")
-    objects = get_objects_by_category(category)
+    objects_markup = get_booking_objects_markup(category) or kb.get_booking_objects_keyboard([], category)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>{BOOKING_CATEGORY_NAMES.get(category, 'Бронирование')}</b>\n\nВыберите объект:",
-        reply_markup=kb.get_booking_objects_keyboard(objects, category),
+        reply_markup=objects_markup,
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("book_day_"))
-async def callback_booking_select_date(callback: CallbackQuery, state: FSMContext):
+@user_callbacks.data(BookDateCalendarCallback)
+async def callback_booking_date_calendar(callback: CallbackQuery, state: FSMContext, callback_data: BookDateCalendarCallback):
+    """Подбор по дате: выбор даты"""
+    cancel_calendar_prefetch(callback.from_user.id)
+    date_holds.release(callback.from_user.id)
+    category = callback_data.category
+    today = date.today()
+    year = callback_data.year or today.year
+    month = callback_data.month or today.month
+
+    await state.update_data(booking_category=category)
+    await edit_callback_message(
+        callback,
+        f"📅 <b>{BOOKING_CATEGORY_NAMES.get(category, 'Бронирование')}</b>\n\n"
+        "Выберите дату — покажем объекты, свободные в этот день:",
+        reply_markup=get_booking_date_calendar_markup(category, year, month),
+        parse_mode="HTML"
+    )
+
+@user_callbacks.data(BookFreeObjectsCallback)
+async def callback_booking_free_objects(callback: CallbackQuery, state: FSMContext, callback_data: BookFreeObjectsCallback):
+    """Подбор по дате: свободные объекты категории на выбранную дату"""
+    category = callback_data.category
+    date_str = callback_data.day
+    guests = callback_data.guests
+    try:
+        day = date.fromisoformat(date_str)
+    except ValueError:
+        await callback.answer(STALE_BUTTON_TEXT, show_alert=True)
+        return
+    if day < date.today():
+        await callback.answer("Эта дата уже прошла", show_alert=True)
+        return
+
+    user_id = callback.from_user.id
+    objects = [
+        obj for obj in get_free_objects_on_date(category, date_str, guests or None)
+        # Даты, которые сейчас оформляют другие гости, тоже недоступны
+        if date_holds.holder(obj['id'], date_str) in (None, user_id)
+    ]
+
+    text = f"📅 <b>{BOOKING_CATEGORY_NAMES.get(category, 'Бронирование')}</b>\n📆 Дата: {date_str}"
+    if guests:
+        text += f"\n👥 Гостей: {guests}"
+    if objects:
+        text += "\n\nСвободны в этот день — выберите объект:"
+    else:
+        text += "\n\n😔 На эту дату нет свободных объектов. Выберите другую дату"
+        text += " или уменьшите число гостей." if guests else "."
+
+    await state.update_data(booking_category=category)
+    await edit_callback_message(
+        callback,
+        text,
+        reply_markup=kb.get_free_objects_keyboard(objects, category, date_str, guests),
+        parse_mode="HTML"
+    )
+
+@user_callbacks.data(BookDayCallback)
+async def callback_booking_select_date(callback: CallbackQuery, state: FSMContext, callback_data: BookDayCallback):
     """Бронирование: дата выбрана, запрос имени"""
-    parts = callback.data.split("_")  # book_day_{id}_{YYYY-MM-DD}
-    object_id = int(parts[2])
-    date_str = parts[3]  # "YYYY-MM-DD"
+    cancel_calendar_prefetch(callback.from_user.id)
+    object_id = callback_data.object_id
+    date_str = callback_data.day  # "YYYY-MM-DD"
+
+    # Сначала удержание в памяти: дату, которую оформляет другой гость,
+    # отклоняем без запроса к базе
+    if not date_holds.acquire(object_id, date_str, callback.from_user.id):
+        await callback.answer(
+            "Эту дату сейчас оформляет другой гость. Выберите другую дату или загляните через несколько минут.",
+            show_alert=True
+        )
+        return
 
     # Проверяем доступность
     status = get_day_status(object_id, date_str)
     if status != 'available':
+        date_holds.release(callback.from_user.id)
         await callback.answer("Эта дата уже занята!", show_alert=True)
         return
 
@@ -963,7 +1478,8 @@ async def callback_booking_select_date(callback: CallbackQuery, state: FSMContex
     )
     await state.set_state(BookingStates.entering_name)
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>Бронирование: {obj['name']}</b>\n"
         f"📆 Дата: {date_str}\n\n"
         "Введите ваше имя:",
@@ -971,7 +1487,7 @@ async def callback_booking_select_date(callback: CallbackQuery, state: FSMContex
         parse_mode="HTML"
     )
 
-@router.message(BookingStates.entering_name)
+@user_router.message(BookingStates.entering_name)
 async def handle_booking_name(message: Message, state: FSMContext):
     """Бронирование: имя введено, запрос телефона"""
     name = message.text.strip()
@@ -988,7 +1504,7 @@ async def handle_booking_name(message: Message, state: FSMContext):
         reply_markup=kb.get_booking_cancel_keyboard()
     )
 
-@router.message(BookingStates.entering_phone)
+@user_router.message(BookingStates.entering_phone)
 async def handle_booking_phone(message: Message, state: FSMContext):
     """Бронирование: телефон введён, показ подтверждения"""
     phone = message.text.strip()
@@ -1021,21 +1537,41 @@ async def handle_booking_phone(message: Message, state: FSMContext):
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "book_confirm", BookingStates.confirming)
+@user_callbacks.exact("book_confirm")
 async def callback_booking_confirm(callback: CallbackQuery, state: FSMContext):
     """Бронирование: подтверждение, создание заявки"""
+    if await state.get_state() != BookingStates.confirming.state:
+        await callback.answer(STALE_BUTTON_TEXT, show_alert=True)
+        return
+
     state_data = await state.get_data()
+    user_id = callback.from_user.id
 
-    booking_id = create_booking(
-        object_id=state_data['booking_object_id'],
-        date_str=state_data['booking_date'],
-        user_id=callback.from_user.id,
-        user_name=state_data['booking_user_name'],
-        user_phone=state_data['booking_user_phone'],
-    )
+    # Удержание истекло, и дату успел выбрать другой гость
+    holder = date_holds.holder(state_data['booking_object_id'], state_data['booking_date'])
+    if holder not in (None, user_id):
+        booking_id = None
+    else:
+        # Проверка занятости и вставка в create_booking не атомарны между репликами
+        lock_name = f"booking:{state_data['booking_object_id']}:{state_data['booking_date']}"
+        try:
+            async with distributed_lock(lock_name):
+                booking_id = create_booking(
+                    object_id=state_data['booking_object_id'],
+                    date_str=state_data['booking_date'],
+                    user_id=user_id,
+                    user_name=state_data['booking_user_name'],
+                    user_phone=state_data['booking_user_phone'],
+                )
+        except LockTimeout:
+            await callback.answer("Сервис занят, попробуйте ещё раз через несколько секунд.", show_alert=True)
+            return
+        # Заявка создана (или дата занята в базе) — удержание больше не нужно
+        date_holds.release(user_id)
 
     if booking_id is None:
-        await callback.message.edit_text(
+        await edit_callback_message(
+            callback,
             "❌ К сожалению, эта дата уже занята.\n"
             "Попробуйте выбрать другую дату.",
             reply_markup=kb.get_booking_categories_keyboard()
@@ -1045,7 +1581,8 @@ async def callback_booking_confirm(callback: CallbackQuery, state: FSMContext):
 
     await state.clear()
 
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "✅ <b>Заявка отправлена!</b>\n\n"
         f"Номер брони: #{booking_id}\n"
         f"🏠 {state_data['booking_object_name']}\n"
@@ -1056,33 +1593,28 @@ async def callback_booking_confirm(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
 
-    # Уведомляем админов
-    admins = get_admins_for_notifications()
-    admin_text = (
-        "🔔 <b>Новая заявка на бронирование!</b>\n\n"
-        f"#{booking_id}\n"
-        f"🏠 {state_data['booking_object_name']}\n"
-        f"📆 {state_data['booking_date']}\n"
-        f"👤 {state_data['booking_user_name']}\n"
-        f"📱 {state_data['booking_user_phone']}\n"
-        f"Telegram ID: <code>{callback.from_user.id}</code>"
+    # Уведомляем админов, подписанных на категорию объекта (сразу или сводкой)
+    await booking_alerts.notify_new_booking(
+        callback.bot,
+        {
+            "id": booking_id,
+            "object_name": state_data['booking_object_name'],
+            "date": state_data['booking_date'],
+            "user_id": callback.from_user.id,
+            "user_name": state_data['booking_user_name'],
+            "user_phone": state_data['booking_user_phone'],
+        },
+        get_admins_for_notifications(state_data.get('booking_category')),
     )
-    for admin_id in admins:
-        try:
-            await callback.bot.send_message(
-                admin_id,
-                admin_text,
-                reply_markup=kb.get_admin_booking_detail_keyboard(booking_id, 'pending'),
-                parse_mode="HTML"
-            )
-        except Exception as e:
-            print(f"Не удалось уведомить админа {admin_id}: {e}")
 
-@router.callback_query(F.data == "book_cancel")
+@user_callbacks.exact("book_cancel")
 async def callback_booking_cancel(callback: CallbackQuery, state: FSMContext):
     """Отмена бронирования"""
     await state.clear()
-    await callback.message.edit_text(
+    cancel_calendar_prefetch(callback.from_user.id)
+    date_holds.release(callback.from_user.id)
+    await edit_callback_message(
+        callback,
         "❌ Бронирование отменено.\n\n"
         "Вы можете начать заново из главного меню.",
         reply_markup=kb.get_main_keyboard(is_admin(callback.from_user.id))
@@ -1090,51 +1622,218 @@ async def callback_booking_cancel(callback: CallbackQuery, state: FSMContext):
 
 # === Админ: Управление бронированиями ===
 
-@router.callback_query(F.data == "admin_bookings")
+# Уведомления пользователю об изменении статуса брони: статус -> (заголовок, концовка)
+USER_BOOKING_STATUS_TEXTS = {
+    "confirmed": ("✅ <b>Ваше бронирование подтверждено!</b>", "Ждём вас!"),
+    "rejected": ("❌ <b>Ваше бронирование отклонено</b>", "Свяжитесь с поддержкой для уточнения."),
+    "cancelled": ("🚫 <b>Ваше бронирование отменено администратором</b>", "Свяжитесь с поддержкой для уточнения."),
+    "expired": ("⌛ <b>Заявка на бронирование не подтверждена вовремя и отменена</b>", "Дата снова свободна — оформите заявку заново или свяжитесь с поддержкой."),
+}
+
+# Сколько заявок перечислять в уведомлении админам об автоотмене
+EXPIRED_LIST_LIMIT = 20
+
+
+def build_user_booking_status_text(booking, status):
+    """Текст уведомления пользователю о решении по брони (HTML)."""
+    title, footer = USER_BOOKING_STATUS_TEXTS[status]
+    return (
+        f"{title}\n\n"
+        f"#{booking['id']}\n"
+        f"🏠 {booking['object_name']}\n"
+        f"📆 {booking['date']}\n\n"
+        f"{footer}"
+    )
+
+
+async def notify_booking_user(bot, booking, status):
+    """Сообщить пользователю о решении по его брони (если уведомления включены)."""
+    if not get_global_notifications_enabled():
+        return
+    try:
+        await bot.send_message(
+            booking['user_id'],
+            build_user_booking_status_text(booking, status),
+            parse_mode="HTML"
+        )
+    except Exception:
+        pass
+
+
+def notify_booking_users(bot, bookings, status):
+    """Передать уведомления о решении по нескольким броням в фоновую рассылку одной пачкой."""
+    if not bookings or not get_global_notifications_enabled():
+        return
+    user_notifications.submit(
+        bot,
+        [(booking['user_id'], build_user_booking_status_text(booking, status)) for booking in bookings]
+    )
+
+
+def build_expired_bookings_text(bookings, ttl_hours):
+    """Уведомление админам об автоматически отменённых заявках (HTML)."""
+    lines = [
+        f"⌛ <b>Заявки без ответа отменены автоматически ({len(bookings)})</b>",
+        f"Они ждали решения дольше {ttl_hours} ч.\n",
+    ]
+    for booking in bookings[:EXPIRED_LIST_LIMIT]:
+        lines.append(f"#{booking['id']} · 🏠 {escape(booking['object_name'])} · 📆 {booking['date']}")
+    if len(bookings) > EXPIRED_LIST_LIMIT:
+        lines.append(f"…и ещё {len(bookings) - EXPIRED_LIST_LIMIT}")
+    return "\n".join(lines)
+
+
+def notify_expired_bookings(bot, bookings, ttl_hours):
+    """Сообщить клиентам и админам об автоотмене заявок через фоновую рассылку."""
+    if not bookings:
+        return
+    notify_booking_users(bot, bookings, "expired")
+    text = build_expired_bookings_text(bookings, ttl_hours)
+    user_notifications.submit(bot, [(admin_id, text) for admin_id in get_admins_for_notifications()])
+
+
+def format_bulk_result(confirm, done, requested):
+    """Итог массового действия: сколько заявок обработано и сколько пропущено."""
+    text = f"✅ Подтверждено: {done}" if confirm else f"❌ Отклонено: {done}"
+    if requested > done:
+        text += f", уже обработано ранее: {requested - done}"
+    return text
+
+
+async def render_admin_pending_bookings(callback: CallbackQuery, state: FSMContext, start=None, before=None):
+    """Страница ожидающих заявок с отметками выбранных.
+
+    Без курсоров показывается страница, открытая последней (после отметки
+    заявки или массового действия админ остаётся на своей странице).
+    """
+    data = await state.get_data()
+    if start is None and before is None:
+        start = data.get("pending_page_start")
+    page = get_pending_bookings_page(start, before)
+    if not page.items:
+        await state.update_data(selected_bookings=[], pending_page_start=None)
+        await edit_callback_message(
+            callback,
+            "📅 Нет ожидающих заявок.",
+            reply_markup=kb.get_admin_bookings_keyboard()
+        )
+        return
+    # Отметки на других страницах сохраняются; уже обработанные заявки
+    # массовое действие пропустит само
+    selected = data.get("selected_bookings", [])
+    await state.update_data(pending_page_start=page.items[0]['id'])
+    await edit_callback_message(
+        callback,
+        f"⏳ <b>Ожидающие подтверждения ({count_pending_bookings()})</b>\n\n"
+        "Отметьте заявки ⬜, чтобы подтвердить или отклонить их разом.",
+        reply_markup=kb.get_admin_pending_bookings_keyboard(
+            page.items, frozenset(selected), page.prev_before, page.next_start
+        ),
+        parse_mode="HTML"
+    )
+
+@admin_callbacks.exact("admin_bookings")
 async def callback_admin_bookings(callback: CallbackQuery):
     """Меню управления бронированиями"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "📅 <b>Управление бронированиями</b>",
         reply_markup=kb.get_admin_bookings_keyboard(),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "admin_book_pending")
-async def callback_admin_book_pending(callback: CallbackQuery):
-    """Список ожидающих бронирований"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
+@admin_callbacks.exact("admin_book_pending")
+async def callback_admin_book_pending(callback: CallbackQuery, state: FSMContext):
+    """Список ожидающих бронирований (с первой страницы)"""
+    await state.update_data(pending_page_start=None)
+    await render_admin_pending_bookings(callback, state)
+
+@admin_callbacks.data(AdminPendingPageCallback)
+async def callback_admin_book_pending_page(callback: CallbackQuery, state: FSMContext, callback_data: AdminPendingPageCallback):
+    """Другая страница ожидающих бронирований"""
+    await render_admin_pending_bookings(callback, state, callback_data.start, callback_data.before)
+
+@admin_callbacks.data(AdminBookingSelectCallback)
+async def callback_admin_book_select(callback: CallbackQuery, state: FSMContext, callback_data: AdminBookingSelectCallback):
+    """Отметить заявку для массового действия или снять отметку"""
+    selected = (await state.get_data()).get("selected_bookings", [])
+    if callback_data.booking_id in selected:
+        selected.remove(callback_data.booking_id)
+    else:
+        selected.append(callback_data.booking_id)
+    await state.update_data(selected_bookings=selected)
+    await render_admin_pending_bookings(callback, state)
+    await callback.answer()
+
+@admin_callbacks.exact("admin_book_bulk_confirm", "admin_book_bulk_reject")
+async def callback_admin_book_bulk_selected(callback: CallbackQuery, state: FSMContext):
+    """Подтвердить или отклонить отмеченные заявки"""
+    confirm = callback.data == "admin_book_bulk_confirm"
+    selected = (await state.get_data()).get("selected_bookings", [])
+    if not selected:
+        await callback.answer("Отметьте заявки в списке", show_alert=True)
+        return
+
+    done = (confirm_bookings if confirm else reject_bookings)(selected, callback.from_user.id)
+    await state.update_data(selected_bookings=[])
+    await callback.answer(format_bulk_result(confirm, len(done), len(selected)), show_alert=True)
+    await render_admin_pending_bookings(callback, state)
+    notify_booking_users(callback.bot, done, "confirmed" if confirm else "rejected")
+
+@admin_callbacks.data(AdminBookingBulkCallback)
+async def callback_admin_book_bulk_scope(callback: CallbackQuery, state: FSMContext, callback_data: AdminBookingBulkCallback):
+    """Подтвердить все ожидающие заявки на дату или по объекту.
+
+    Первое нажатие показывает, сколько заявок будет подтверждено; подтверждаются
+    ровно те заявки, что были на экране подтверждения (ID хранятся в FSM).
+    """
+    booking = get_booking_by_id(callback_data.booking_id)
+    if not booking or callback_data.scope not in ("date", "object"):
+        await callback.answer("Бронирование не найдено", show_alert=True)
         return
-    bookings = get_pending_bookings()
-    if not bookings:
-        await callback.message.edit_text(
-            "📅 Нет ожидающих заявок.",
-            reply_markup=kb.get_admin_bookings_keyboard()
-        )
+
+    bulk = (await state.get_data()).get("bulk_scope")
+    scope_key = [callback_data.scope, callback_data.booking_id]
+    if callback_data.confirm and bulk and bulk["key"] == scope_key:
+        booking_ids = bulk["ids"]
+        await state.update_data(bulk_scope=None)
+        done = confirm_bookings(booking_ids, callback.from_user.id)
+        await callback.answer(format_bulk_result(True, len(done), len(booking_ids)), show_alert=True)
+        await render_admin_pending_bookings(callback, state)
+        notify_booking_users(callback.bot, done, "confirmed")
         return
-    await callback.message.edit_text(
-        f"⏳ <b>Ожидающие подтверждения ({len(bookings)})</b>",
-        reply_markup=kb.get_admin_pending_bookings_keyboard(bookings),
+
+    if callback_data.scope == "date":
+        booking_ids = get_pending_booking_ids(date_str=booking['date'])
+        scope_text = f"на 📆 {booking['date']}"
+    else:
+        booking_ids = get_pending_booking_ids(object_id=booking['object_id'])
+        scope_text = f"по объекту 🏠 {escape(booking['object_name'])} (все даты)"
+    if not booking_ids:
+        await callback.answer("Нет ожидающих заявок", show_alert=True)
+        return
+
+    await state.update_data(bulk_scope={"key": scope_key, "ids": booking_ids})
+    await edit_callback_message(
+        callback,
+        f"❓ Подтвердить <b>{len(booking_ids)}</b> ожидающих заявок {scope_text}?\n\n"
+        "Клиенты получат уведомления о подтверждении.",
+        reply_markup=kb.get_admin_booking_bulk_confirm_keyboard(callback_data.scope, callback_data.booking_id, len(booking_ids)),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_book_detail_"))
-async def callback_admin_book_detail(callback: CallbackQuery):
+@admin_callbacks.data(AdminBookingDetailCallback)
+async def callback_admin_book_detail(callback: CallbackQuery, callback_data: AdminBookingDetailCallback):
     """Детали бронирования"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-    booking_id = int(callback.data.replace("admin_book_detail_", ""))
+    booking_id = callback_data.booking_id
     booking = get_booking_by_id(booking_id)
     if not booking:
         await callback.answer("Бронирование не найдено", show_alert=True)
         return
 
     status_text = {"pending": "⏳ Ожидает", "confirmed": "✅ Подтверждено", "cancelled": "❌ Отменено"}
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📋 <b>Бронирование #{booking['id']}</b>\n\n"
         f"🏠 {booking['object_name']}\n"
         f"📆 {booking['date']}\n"
@@ -1147,13 +1846,10 @@ async def callback_admin_book_detail(callback: CallbackQuery):
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_book_confirm_"))
-async def callback_admin_book_confirm(callback: CallbackQuery):
+@admin_callbacks.data(AdminBookingConfirmCallback)
+async def callback_admin_book_confirm(callback: CallbackQuery, callback_data: AdminBookingConfirmCallback):
     """Подтвердить бронирование"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-    booking_id = int(callback.data.replace("admin_book_confirm_", ""))
+    booking_id = callback_data.booking_id
     booking = get_booking_by_id(booking_id)
     if confirm_booking(booking_id, callback.from_user.id):
         await callback.answer("✅ Бронирование подтверждено", show_alert=True)
@@ -1161,7 +1857,8 @@ async def callback_admin_book_confirm(callback: CallbackQuery):
         booking = get_booking_by_id(booking_id)
         if booking:
             status_text = {"pending": "⏳ Ожидает", "confirmed": "✅ Подтверждено", "cancelled": "❌ Отменено"}
-            await callback.message.edit_text(
+            await edit_callback_message(
+                callback,
                 f"📋 <b>Бронирование #{booking['id']}</b>\n\n"
                 f"🏠 {booking['object_name']}\n"
                 f"📆 {booking['date']}\n"
@@ -1174,70 +1871,29 @@ async def callback_admin_book_confirm(callback: CallbackQuery):
                 parse_mode="HTML"
             )
             # Уведомляем пользователя
-            if get_global_notifications_enabled():
-                try:
-                    await callback.bot.send_message(
-                        booking['user_id'],
-                        f"✅ <b>Ваше бронирование подтверждено!</b>\n\n"
-                        f"#{booking['id']}\n"
-                        f"🏠 {booking['object_name']}\n"
-                        f"📆 {booking['date']}\n\n"
-                        "Ждём вас!",
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    pass
+            await notify_booking_user(callback.bot, booking, "confirmed")
     else:
         await callback.answer("❌ Не удалось подтвердить", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_book_reject_"))
-async def callback_admin_book_reject(callback: CallbackQuery):
+@admin_callbacks.data(AdminBookingRejectCallback)
+async def callback_admin_book_reject(callback: CallbackQuery, state: FSMContext, callback_data: AdminBookingRejectCallback):
     """Отклонить бронирование"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-    booking_id = int(callback.data.replace("admin_book_reject_", ""))
+    booking_id = callback_data.booking_id
     booking = get_booking_by_id(booking_id)
     if reject_booking(booking_id, callback.from_user.id):
         await callback.answer("❌ Бронирование отклонено", show_alert=True)
         # Возврат к списку ожидающих
-        bookings = get_pending_bookings()
-        if not bookings:
-            await callback.message.edit_text(
-                "📅 Нет ожидающих заявок.",
-                reply_markup=kb.get_admin_bookings_keyboard()
-            )
-        else:
-            await callback.message.edit_text(
-                f"⏳ <b>Ожидающие подтверждения ({len(bookings)})</b>",
-                reply_markup=kb.get_admin_pending_bookings_keyboard(bookings),
-                parse_mode="HTML"
-            )
+        await render_admin_pending_bookings(callback, state)
         # Уведомляем пользователя
         if booking:
-            if get_global_notifications_enabled():
-                try:
-                    await callback.bot.send_message(
-                        booking['user_id'],
-                        f"❌ <b>Ваше бронирование отклонено</b>\n\n"
-                        f"#{booking['id']}\n"
-                        f"🏠 {booking['object_name']}\n"
-                        f"📆 {booking['date']}\n\n"
-                        "Свяжитесь с поддержкой для уточнения.",
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    pass
+            await notify_booking_user(callback.bot, booking, "rejected")
     else:
         await callback.answer("❌ Ошибка", show_alert=True)
 
-@router.callback_query(F.data.startswith("admin_book_cancel_"))
-async def callback_admin_book_cancel(callback: CallbackQuery):
+@admin_callbacks.data(AdminBookingCancelCallback)
+async def callback_admin_book_cancel(callback: CallbackQuery, callback_data: AdminBookingCancelCallback):
     """Отменить подтверждённое бронирование"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-    booking_id = int(callback.data.replace("admin_book_cancel_", ""))
+    booking_id = callback_data.booking_id
     booking = get_booking_by_id(booking_id)
     if cancel_booking(booking_id, callback.from_user.id):
         await callback.answer("🚫 Бронирование отменено", show_alert=True)
@@ -1245,7 +1901,8 @@ async def callback_admin_book_cancel(callback: CallbackQuery):
         booking = get_booking_by_id(booking_id)
         if booking:
             status_text = {"pending": "⏳ Ожидает", "confirmed": "✅ Подтверждено", "cancelled": "❌ Отменено"}
-            await callback.message.edit_text(
+            await edit_callback_message(
+                callback,
                 f"📋 <b>Бронирование #{booking['id']}</b>\n\n"
                 f"🏠 {booking['object_name']}\n"
                 f"📆 {booking['date']}\n"
@@ -1259,57 +1916,57 @@ async def callback_admin_book_cancel(callback: CallbackQuery):
             )
         # Уведомляем пользователя
         if booking:
-            if get_global_notifications_enabled():
-                try:
-                    await callback.bot.send_message(
-                        booking['user_id'],
-                        f"🚫 <b>Ваше бронирование отменено администратором</b>\n\n"
-                        f"#{booking['id']}\n"
-                        f"🏠 {booking['object_name']}\n"
-                        f"📆 {booking['date']}\n\n"
-                        "Свяжитесь с поддержкой для уточнения.",
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    pass
+            await notify_booking_user(callback.bot, booking, "cancelled")
     else:
         await callback.answer("❌ Ошибка", show_alert=True)
 
+@admin_callbacks.data(AdminBookingDigestCallback)
+async def callback_admin_book_digest(callback: CallbackQuery, callback_data: AdminBookingDigestCallback):
+    """Подтвердить или отклонить все заявки из сводки"""
+    booking_ids = get_booking_digest(callback_data.digest_id, BOOKING_DIGEST_TTL_DAYS)
+    if booking_ids is None or callback_data.action not in ("confirm", "reject"):
+        await callback.answer(STALE_BUTTON_TEXT, show_alert=True)
+        return
+
+    confirm = callback_data.action == "confirm"
+    # Заявки, уже обработанные по отдельности, пропускаются (статус не pending)
+    done = (confirm_bookings if confirm else reject_bookings)(booking_ids, callback.from_user.id)
+
+    result_text = format_bulk_result(confirm, len(done), len(booking_ids))
+    await callback.answer(result_text, show_alert=True)
+    await edit_callback_message(
+        callback,
+        f"{callback.message.html_text}\n\n<b>{result_text}</b>",
+        parse_mode="HTML"
+    )
+    notify_booking_users(callback.bot, done, "confirmed" if confirm else "rejected")
+
 # === Админ: Управление объектами ===
 
-async def render_admin_object_calendar(message, obj, year, month):
+async def render_admin_object_calendar(callback, obj, year, month):
     """Отрисовать календарь объекта для админки"""
-    bookings = get_bookings_for_object_month(obj['id'], year, month)
-
     price_text = f"{obj['price_weekday']}₽/день"
     if obj['price_weekday'] != obj['price_weekend']:
         price_text = f"{obj['price_weekday']}₽ будни / {obj['price_weekend']}₽ выходные"
 
     active_text = "🟢 активен" if obj['is_active'] else "🔴 отключён"
 
-    await message.edit_text(
+    await edit_callback_message(
+        callback,
         f"📅 <b>{obj['name']}</b>\n"
         f"👥 До {obj['capacity']} человек | {price_text}\n"
         f"Статус объекта: {active_text}\n\n"
         "Нажмите на день, чтобы отметить занятость или снять ручную блокировку.",
-        reply_markup=kb.get_admin_object_calendar_keyboard(
-            object_id=obj['id'],
-            year=year,
-            month=month,
-            bookings=bookings,
-            is_active=obj['is_active'],
-        ),
+        reply_markup=get_admin_object_calendar_markup(obj['id'], year, month, obj['is_active']),
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data == "admin_objects")
+@admin_callbacks.exact("admin_objects")
 async def callback_admin_objects(callback: CallbackQuery):
     """Список объектов для управления"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
     objects = get_all_objects_admin()
-    await callback.message.edit_text(
+    await edit_callback_message(
+        callback,
         "🔧 <b>Управление объектами</b>\n\n"
         "🟢 активен | 🔴 отключён\n"
         "Нажмите на объект, чтобы открыть календарь занятости:",
@@ -1317,54 +1974,39 @@ async def callback_admin_objects(callback: CallbackQuery):
         parse_mode="HTML"
     )
 
-@router.callback_query(F.data.startswith("admin_obj_open_"))
-async def callback_admin_obj_open(callback: CallbackQuery):
+@admin_callbacks.data(AdminObjectOpenCallback)
+async def callback_admin_obj_open(callback: CallbackQuery, callback_data: AdminObjectOpenCallback):
     """Открыть календарь объекта в админке"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    object_id = int(callback.data.replace("admin_obj_open_", ""))
+    object_id = callback_data.object_id
     obj = get_object_by_id(object_id)
     if not obj:
         await callback.answer("Объект не найден", show_alert=True)
         return
 
     today = date.today()
-    await render_admin_object_calendar(callback.message, obj, today.year, today.month)
+    await render_admin_object_calendar(callback, obj, today.year, today.month)
 
 
-@router.callback_query(F.data.startswith("admin_obj_cal_"))
-async def callback_admin_obj_calendar_nav(callback: CallbackQuery):
+@admin_callbacks.data(AdminObjectCalendarCallback)
+async def callback_admin_obj_calendar_nav(callback: CallbackQuery, callback_data: AdminObjectCalendarCallback):
     """Навигация календаря объекта в админке"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    payload = callback.data.replace("admin_obj_cal_", "", 1)
-    object_id_str, year_str, month_str = payload.split("_", 2)
-    object_id = int(object_id_str)
-    year = int(year_str)
-    month = int(month_str)
+    object_id = callback_data.object_id
+    year = callback_data.year
+    month = callback_data.month
 
     obj = get_object_by_id(object_id)
     if not obj:
         await callback.answer("Объект не найден", show_alert=True)
         return
 
-    await render_admin_object_calendar(callback.message, obj, year, month)
+    await render_admin_object_calendar(callback, obj, year, month)
 
 
-@router.callback_query(F.data.startswith("admin_obj_day_"))
-async def callback_admin_obj_day_toggle(callback: CallbackQuery):
+@admin_callbacks.data(AdminObjectDayCallback)
+async def callback_admin_obj_day_toggle(callback: CallbackQuery, callback_data: AdminObjectDayCallback):
     """Переключить ручную блокировку даты объекта"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    payload = callback.data.replace("admin_obj_day_", "", 1)
-    object_id_str, date_str = payload.split("_", 1)
-    object_id = int(object_id_str)
+    object_id = callback_data.object_id
+    date_str = callback_data.day
 
     obj = get_object_by_id(object_id)
     if not obj:
@@ -1392,21 +2034,15 @@ async def callback_admin_obj_day_toggle(callback: CallbackQuery):
     elif result == 'unblocked':
         await callback.answer("Ручная блокировка снята", show_alert=True)
 
-    await render_admin_object_calendar(callback.message, obj, day_date.year, day_date.month)
+    await render_admin_object_calendar(callback, obj, day_date.year, day_date.month)
 
 
-@router.callback_query(F.data.startswith("admin_obj_active_"))
-async def callback_admin_obj_active_toggle(callback: CallbackQuery):
+@admin_callbacks.data(AdminObjectActiveCallback)
+async def callback_admin_obj_active_toggle(callback: CallbackQuery, callback_data: AdminObjectActiveCallback):
     """Включить/отключить объект из календаря"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    payload = callback.data.replace("admin_obj_active_", "", 1)
-    object_id_str, year_str, month_str = payload.split("_", 2)
-    object_id = int(object_id_str)
-    year = int(year_str)
-    month = int(month_str)
+    object_id = callback_data.object_id
+    year = callback_data.year
+    month = callback_data.month
 
     obj = get_object_by_id(object_id)
     if not obj:
@@ -1424,21 +2060,18 @@ async def callback_admin_obj_active_toggle(callback: CallbackQuery):
         await callback.answer("Объект не найден", show_alert=True)
         return
 
-    await render_admin_object_calendar(callback.message, updated_obj, year, month)
+    await render_admin_object_calendar(callback, updated_obj, year, month)
 
 
-@router.callback_query(F.data.startswith("admin_obj_toggle_"))
-async def callback_admin_obj_toggle_legacy(callback: CallbackQuery):
-    """Совместимость со старыми сообщениями: открыть календарь объекта"""
-    if not is_admin(callback.from_user.id):
-        await callback.answer("⛔ Нет доступа", show_alert=True)
-        return
+# === Маршрутизация кнопок ===
 
-    object_id = int(callback.data.replace("admin_obj_toggle_", ""))
-    obj = get_object_by_id(object_id)
-    if not obj:
-        await callback.answer("Объект не найден", show_alert=True)
-        return
+@admin_router.callback_query()
+async def dispatch_admin_callback(callback: CallbackQuery, state: FSMContext):
+    """Точка входа админских callback-кнопок: поиск обработчика по таблице."""
+    await admin_callbacks.dispatch(callback, state=state)
 
-    today = date.today()
-    await render_admin_object_calendar(callback.message, obj, today.year, today.month)
+
+@user_router.callback_query()
+async def dispatch_user_callback(callback: CallbackQuery, state: FSMContext):
+    """Точка входа пользовательских callback-кнопок: поиск обработчика по таблице."""
+    await user_callbacks.dispatch(callback, state=state)
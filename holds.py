@@ -0,0 +1,93 @@
+"""Временные удержания дат на время оформления заявки.
+
+Пока пользователь вводит имя и телефон, выбранная дата объекта удерживается
+за ним BOOKING_HOLD_TTL_MIN минут: в календарях она показана как 🔒 и выбрать
+её нельзя. Удержание снимается при отмене, возврате назад, отправке заявки или
+по истечении срока. Удержания живут в памяти процесса: обработчики бота
+выполняются только на реплике-лидере.
+"""
+import heapq
+import time
+
+from config import BOOKING_HOLD_TTL_MIN
+
+
+class DateHolds:
+    """Таблица удержаний (object_id, date) -> пользователь с кучей сроков истечения.
+
+    У пользователя не больше одного удержания: новое снимает предыдущее.
+    Истёкшие удержания убираются при любом обращении — из вершины кучи,
+    без перебора таблицы.
+    """
+
+    def __init__(self, ttl=BOOKING_HOLD_TTL_MIN * 60):
+        self.ttl = ttl
+        # object_id -> {date_str: (user_id, время истечения)}
+        self._holds = {}
+        # user_id -> (object_id, date_str)
+        self._by_user = {}
+        # (время истечения, object_id, date_str); продлённые и снятые записи
+        # остаются в куче и пропускаются при извлечении
+        self._heap = []
+        # object_id -> счётчик изменений удержаний (часть ключа кэша календаря)
+        self._versions = {}
+
+    def _expire(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, object_id, date_str = heapq.heappop(self._heap)
+            hold = self._holds.get(object_id, {}).get(date_str)
+            if hold and hold[1] == expires_at:
+                self._drop(object_id, date_str, hold[0])
+
+    def _drop(self, object_id, date_str, user_id):
+        dates = self._holds[object_id]
+        del dates[date_str]
+        if not dates:
+            del self._holds[object_id]
+        if self._by_user.get(user_id) == (object_id, date_str):
+            del self._by_user[user_id]
+        self._versions[object_id] = self._versions.get(object_id, 0) + 1
+
+    def acquire(self, object_id, date_str, user_id):
+        """Удержать дату за пользователем (или продлить его удержание).
+
+        False — дату уже удерживает другой пользователь.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        hold = self._holds.get(object_id, {}).get(date_str)
+        if hold and hold[0] != user_id:
+            return False
+        self.release(user_id)
+        expires_at = now + self.ttl
+        self._holds.setdefault(object_id, {})[date_str] = (user_id, expires_at)
+        self._by_user[user_id] = (object_id, date_str)
+        heapq.heappush(self._heap, (expires_at, object_id, date_str))
+        self._versions[object_id] = self._versions.get(object_id, 0) + 1
+        return True
+
+    def release(self, user_id):
+        """Снять удержание пользователя, если оно есть."""
+        key = self._by_user.get(user_id)
+        if key is not None:
+            self._drop(key[0], key[1], user_id)
+
+    def holder(self, object_id, date_str):
+        """Пользователь, удерживающий дату, или None."""
+        self._expire(time.monotonic())
+        hold = self._holds.get(object_id, {}).get(date_str)
+        return hold[0] if hold else None
+
+    def held_dates(self, object_id, year, month):
+        """Удерживаемые даты объекта в месяце (множество строк YYYY-MM-DD)."""
+        self._expire(time.monotonic())
+        prefix = f"{year:04d}-{month:02d}-"
+        return {date_str for date_str in self._holds.get(object_id, ()) if date_str.startswith(prefix)}
+
+    def version(self, object_id):
+        """Номер изменения удержаний объекта: меняется при каждом удержании и снятии."""
+        self._expire(time.monotonic())
+        return self._versions.get(object_id, 0)
+
+
+date_holds = DateHolds()
@@ -2,6 +2,59 @@
 import calendar as cal_module
 from datetime import date
 
+from cache import LRUCache
+from callbacks import (
+    FaqCallback, AdminFaqViewCallback, AdminFaqEditQuestionCallback, AdminFaqEditAnswerCallback,
+    AdminFaqDeleteCallback, AdminFaqConfirmDeleteCallback, ReplyToUserCallback, AdminRemoveCallback,
+    BookCategoryCallback, BookObjectCallback, BookCalendarCallback, BookDayCallback,
+    AdminBookingDetailCallback, AdminBookingConfirmCallback, AdminBookingRejectCallback,
+    AdminBookingCancelCallback, AdminObjectOpenCallback, AdminObjectCalendarCallback,
+    AdminObjectDayCallback, AdminObjectActiveCallback, AdminSubscriptionToggleCallback,
+    AdminBookingDigestCallback, AdminBookingSelectCallback, AdminBookingBulkCallback,
+    FaqPageCallback, AdminFaqPageCallback, AdminAdminsPageCallback, AdminPendingPageCallback,
+    BookDateCalendarCallback, BookFreeObjectsCallback,
+)
+
+MONTH_NAMES = {
+    1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
+    5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
+    9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
+}
+
+WEEK_HEADERS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+# Фильтр подбора по дате: сколько гостей (объект должен вмещать не меньше)
+GUEST_FILTERS = (2, 4, 6, 8, 15)
+
+# Кэш готовой разметки: календари, FAQ, списки объектов.
+# Ключ включает версию данных (database.get_data_version), поэтому
+# после изменений разметка строится заново, а старые ключи вытесняются.
+_markup_cache = LRUCache(maxsize=512)
+_EMPTY = object()
+
+
+def cached_markup(key, build):
+    """Вернуть разметку из кэша или построить через build() и запомнить.
+
+    build() может вернуть None (например, пустой список) — это тоже кэшируется.
+    """
+    markup = _markup_cache.get(key, _EMPTY)
+    if markup is _EMPTY:
+        markup = build()
+        _markup_cache.set(key, markup)
+    return markup
+
+
+def page_nav_row(page_callback, prev_before=None, next_start=None):
+    """Кнопки «назад/вперёд» для страницы списка. None, если страница одна."""
+    row = []
+    if prev_before is not None:
+        row.append(InlineKeyboardButton(text="⬅️ Пред.", callback_data=page_callback(before=prev_before).pack()))
+    if next_start is not None:
+        row.append(InlineKeyboardButton(text="След. ➡️", callback_data=page_callback(start=next_start).pack()))
+    return row or None
+
+
 def get_main_keyboard(is_admin_user=False):
     """Главная клавиатура"""
     buttons = [
@@ -14,14 +67,17 @@ def get_main_keyboard(is_admin_user=False):
         buttons.append([InlineKeyboardButton(text="🔧 Админ меню", callback_data="admin_panel")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_faq_keyboard(faq_list):
-    """Клавиатура FAQ"""
+def get_faq_keyboard(faq_list, prev_before=None, next_start=None):
+    """Клавиатура FAQ (одна страница)"""
     buttons = []
     for item in faq_list:
         # Обрезаем вопрос если слишком длинный
         question = item["question"][:50] + "..." if len(item["question"]) > 50 else item["question"]
-        buttons.append([InlineKeyboardButton(text=f"📌 {question}", callback_data=f"faq_{item['id']}")])
+        buttons.append([InlineKeyboardButton(text=f"📌 {question}", callback_data=FaqCallback(faq_id=item['id']).pack())])
 
+    nav = page_nav_row(FaqPageCallback, prev_before, next_start)
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="back_main")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -65,6 +121,7 @@ def get_admin_keyboard(notifications_enabled=True):
         [InlineKeyboardButton(text="📝 Изменить FAQ", callback_data="admin_faq")],
         [InlineKeyboardButton(text="🔗 Пригласить админа (реф-ссылка)", callback_data="admin_create_ref")],
         [InlineKeyboardButton(text="👥 Управление админами", callback_data="admin_admins")],
+        [InlineKeyboardButton(text="🔔 Мои уведомления", callback_data="admin_subscriptions")],
     ]
 
     toggle_text = "🔕 Выключить уведомления" if notifications_enabled else "🔔 Включить уведомления"
@@ -74,16 +131,32 @@ def get_admin_keyboard(notifications_enabled=True):
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
-def get_admin_faq_keyboard(faq_list):
-    """Админское управление FAQ"""
+def get_admin_subscriptions_keyboard(topic_names, subscriptions, notifications_enabled=True):
+    """Личные уведомления админа: общий флаг и подписки по темам"""
+    toggle_text = "🔕 Выключить мои уведомления" if notifications_enabled else "🔔 Включить мои уведомления"
+    buttons = [[InlineKeyboardButton(text=toggle_text, callback_data="admin_toggle_my_notifications")]]
+    for topic, name in topic_names.items():
+        mark = "✅" if subscriptions.get(topic, True) else "❌"
+        buttons.append([InlineKeyboardButton(
+            text=f"{mark} {name}",
+            callback_data=AdminSubscriptionToggleCallback(topic=topic).pack()
+        )])
+    buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_panel")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+def get_admin_faq_keyboard(faq_list, prev_before=None, next_start=None):
+    """Админское управление FAQ (одна страница)"""
     buttons = []
     for item in faq_list:
         question = item["question"][:30] + "..." if len(item["question"]) > 30 else item["question"]
         buttons.append([
-            InlineKeyboardButton(text=f"📌 {question}", callback_data=f"admin_faq_view_{item['id']}"),
-            InlineKeyboardButton(text="🗑", callback_data=f"admin_faq_delete_{item['id']}")
+            InlineKeyboardButton(text=f"📌 {question}", callback_data=AdminFaqViewCallback(faq_id=item['id']).pack()),
+            InlineKeyboardButton(text="🗑", callback_data=AdminFaqDeleteCallback(faq_id=item['id']).pack())
         ])
 
+    nav = page_nav_row(AdminFaqPageCallback, prev_before, next_start)
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="➕ Добавить вопрос", callback_data="admin_faq_add")])
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_panel")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -92,23 +165,26 @@ def get_admin_faq_keyboard(faq_list):
 def get_admin_faq_item_keyboard(faq_id):
     """Меню редактирования одного FAQ-элемента"""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✏️ Изменить вопрос", callback_data=f"admin_faq_edit_q_{faq_id}")],
-        [InlineKeyboardButton(text="📝 Изменить ответ", callback_data=f"admin_faq_edit_a_{faq_id}")],
-        [InlineKeyboardButton(text="🗑 Удалить вопрос", callback_data=f"admin_faq_delete_{faq_id}")],
+        [InlineKeyboardButton(text="✏️ Изменить вопрос", callback_data=AdminFaqEditQuestionCallback(faq_id=faq_id).pack())],
+        [InlineKeyboardButton(text="📝 Изменить ответ", callback_data=AdminFaqEditAnswerCallback(faq_id=faq_id).pack())],
+        [InlineKeyboardButton(text="🗑 Удалить вопрос", callback_data=AdminFaqDeleteCallback(faq_id=faq_id).pack())],
         [InlineKeyboardButton(text="⬅️ К списку FAQ", callback_data="admin_faq")],
     ])
 
 
-def get_admin_admins_keyboard(admins, main_admin_id):
-    """Админское управление админами"""
+def get_admin_admins_keyboard(admins, main_admin_id, prev_before=None, next_start=None):
+    """Админское управление админами (одна страница)"""
     buttons = []
     for admin_id in admins:
         is_main = " (админ-технарь)" if admin_id == main_admin_id else ""
         buttons.append([
-            InlineKeyboardButton(text=f"👤 {admin_id}{is_main}", callback_data=f"admin_info_{admin_id}"),
-            InlineKeyboardButton(text="🗑" if admin_id != main_admin_id else "⭐", callback_data=f"admin_remove_{admin_id}" if admin_id != main_admin_id else "noop")
+            InlineKeyboardButton(text=f"👤 {admin_id}{is_main}", callback_data="noop"),
+            InlineKeyboardButton(text="🗑" if admin_id != main_admin_id else "⭐", callback_data=AdminRemoveCallback(admin_id=admin_id).pack() if admin_id != main_admin_id else "noop")
         ])
 
+    nav = page_nav_row(AdminAdminsPageCallback, prev_before, next_start)
+    if nav:
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_panel")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -116,7 +192,7 @@ def get_confirm_delete_faq_keyboard(faq_id):
     """Подтверждение удаления FAQ"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text="✅ Да, удалить", callback_data=f"admin_faq_confirm_delete_{faq_id}"),
+            InlineKeyboardButton(text="✅ Да, удалить", callback_data=AdminFaqConfirmDeleteCallback(faq_id=faq_id).pack()),
             InlineKeyboardButton(text="❌ Отмена", callback_data="admin_faq")
         ],
     ])
@@ -132,7 +208,7 @@ def get_cancel_keyboard():
 def get_admin_reply_keyboard(user_id):
     """Клавиатура для ответа пользователю"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="💬 Ответить", callback_data=f"reply_to_{user_id}")],
+        [InlineKeyboardButton(text="💬 Ответить", callback_data=ReplyToUserCallback(user_id=user_id).pack())],
     ])
     return keyboard
 
@@ -141,9 +217,9 @@ def get_admin_reply_keyboard(user_id):
 def get_booking_categories_keyboard():
     """Выбор категории бронирования"""
     buttons = [
-        [InlineKeyboardButton(text="🎣 Беседки (рыбалка)", callback_data="book_cat_gazebo_fishing")],
-        [InlineKeyboardButton(text="🏖 Беседки (отдых)", callback_data="book_cat_gazebo_recreation")],
-        [InlineKeyboardButton(text="🏠 Домики", callback_data="book_cat_house")],
+        [InlineKeyboardButton(text="🎣 Беседки (рыбалка)", callback_data=BookCategoryCallback(category="gazebo_fishing").pack())],
+        [InlineKeyboardButton(text="🏖 Беседки (отдых)", callback_data=BookCategoryCallback(category="gazebo_recreation").pack())],
+        [InlineKeyboardButton(text="🏠 Домики", callback_data=BookCategoryCallback(category="house").pack())],
         [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_main")],
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -157,27 +233,96 @@ def get_booking_objects_keyboard(objects, category):
         if obj['price_weekday'] != obj['price_weekend']:
             price_text = f"{obj['price_weekday']}/{obj['price_weekend']}₽"
         text = f"{obj['name']} (до {obj['capacity']} чел., {price_text})"
-        buttons.append([InlineKeyboardButton(text=text, callback_data=f"book_obj_{obj['id']}")])
+        buttons.append([InlineKeyboardButton(text=text, callback_data=BookObjectCallback(object_id=obj['id']).pack())])
+    buttons.append([InlineKeyboardButton(text="📆 Подобрать по дате", callback_data=BookDateCalendarCallback(category=category).pack())])
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="book_back_categories")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def get_booking_calendar_keyboard(object_id, year, month, bookings):
-    """Календарь для выбора даты бронирования"""
+def get_booking_date_calendar_keyboard(category, year, month):
+    """Календарь подбора по дате: любая будущая дата ведёт к списку свободных объектов"""
+    today = date.today()
+    buttons = []
+
+    prev_month = month - 1 if month > 1 else 12
+    prev_year = year if month > 1 else year - 1
+    next_month = month + 1 if month < 12 else 1
+    next_year = year if month < 12 else year + 1
+
+    can_go_prev = date(prev_year, prev_month, 1) >= date(today.year, today.month, 1)
+    prev_btn = InlineKeyboardButton(
+        text="◀️" if can_go_prev else " ",
+        callback_data=BookDateCalendarCallback(category=category, year=prev_year, month=prev_month).pack() if can_go_prev else "noop"
+    )
+    next_btn = InlineKeyboardButton(
+        text="▶️",
+        callback_data=BookDateCalendarCallback(category=category, year=next_year, month=next_month).pack()
+    )
+    header_btn = InlineKeyboardButton(
+        text=f"{MONTH_NAMES[month]} {year}",
+        callback_data="noop"
+    )
+    buttons.append([prev_btn, header_btn, next_btn])
+
+    buttons.append([InlineKeyboardButton(text=d, callback_data="noop") for d in WEEK_HEADERS])
+
+    for week in cal_module.monthcalendar(year, month):
+        row = []
+        for day_num in week:
+            if day_num == 0:
+                row.append(InlineKeyboardButton(text=" ", callback_data="noop"))
+            elif date(year, month, day_num) < today:
+                row.append(InlineKeyboardButton(text=f"{day_num}", callback_data="noop"))
+            else:
+                date_str = f"{year:04d}-{month:02d}-{day_num:02d}"
+                row.append(InlineKeyboardButton(
+                    text=f"{day_num}",
+                    callback_data=BookFreeObjectsCallback(category=category, day=date_str).pack()
+                ))
+        buttons.append(row)
+    buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data=BookCategoryCallback(category=category).pack())])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_free_objects_keyboard(objects, category, day, guests=0):
+    """Свободные на дату объекты категории с фильтром по числу гостей"""
+    is_weekend = date.fromisoformat(day).weekday() >= 5
+    buttons = []
+    for obj in objects:
+        price = obj['price_weekend'] if is_weekend else obj['price_weekday']
+        text = f"{obj['name']} (до {obj['capacity']} чел., {price}₽)"
+        buttons.append([InlineKeyboardButton(text=text, callback_data=BookDayCallback(object_id=obj['id'], day=day).pack())])
+
+    # Фильтр по гостям: повторное нажатие на выбранный вариант снимает фильтр
+    buttons.append([
+        InlineKeyboardButton(
+            text=f"{'☑️' if guests == count else '👥'}{count}",
+            callback_data=BookFreeObjectsCallback(category=category, day=day, guests=0 if guests == count else count).pack()
+        )
+        for count in GUEST_FILTERS
+    ])
+    day_date = date.fromisoformat(day)
+    buttons.append([
+        InlineKeyboardButton(
+            text="📆 Другая дата",
+            callback_data=BookDateCalendarCallback(category=category, year=day_date.year, month=day_date.month).pack()
+        ),
+        InlineKeyboardButton(text="⬅️ К объектам", callback_data=BookCategoryCallback(category=category).pack()),
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_booking_calendar_keyboard(object_id, year, month, bookings, held=()):
+    """Календарь для выбора даты бронирования (held — даты, которые сейчас оформляют)"""
     # Карта статусов: date_str -> status
-    status_map = {}
+    status_map = dict.fromkeys(held, 'held')
     for b in bookings:
         if b['status'] in ('confirmed', 'blocked'):
             status_map[b['date']] = 'booked'
-        elif b['status'] == 'pending' and b['date'] not in status_map:
+        elif b['status'] == 'pending' and status_map.get(b['date']) != 'booked':
             status_map[b['date']] = 'pending'
 
     today = date.today()
-    month_names = {
-        1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
-        5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
-        9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
-    }
 
     buttons = []
 
@@ -190,22 +335,21 @@ def get_booking_calendar_keyboard(object_id, year, month, bookings):
     can_go_prev = date(prev_year, prev_month, 1) >= date(today.year, today.month, 1)
     prev_btn = InlineKeyboardButton(
         text="◀️" if can_go_prev else " ",
-        callback_data=f"book_cal_{object_id}_{prev_year}_{prev_month}" if can_go_prev else "noop"
+        callback_data=BookCalendarCallback(object_id=object_id, year=prev_year, month=prev_month).pack() if can_go_prev else "noop"
     )
     next_btn = InlineKeyboardButton(
         text="▶️",
-        callback_data=f"book_cal_{object_id}_{next_year}_{next_month}"
+        callback_data=BookCalendarCallback(object_id=object_id, year=next_year, month=next_month).pack()
     )
     header_btn = InlineKeyboardButton(
-        text=f"{month_names[month]} {year}",
+        text=f"{MONTH_NAMES[month]} {year}",
         callback_data="noop"
     )
     buttons.append([prev_btn, header_btn, next_btn])
 
     # Дни недели
-    week_headers = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
     buttons.append([
-        InlineKeyboardButton(text=d, callback_data="noop") for d in week_headers
+        InlineKeyboardButton(text=d, callback_data="noop") for d in WEEK_HEADERS
     ])
 
     # Сетка дней
@@ -231,8 +375,10 @@ def get_booking_calendar_keyboard(object_id, year, month, bookings):
                 row.append(InlineKeyboardButton(text=f"❌{day_num}", callback_data="noop"))
             elif status == 'pending':
                 row.append(InlineKeyboardButton(text=f"⏳{day_num}", callback_data="noop"))
+            elif status == 'held':
+                row.append(InlineKeyboardButton(text=f"🔒{day_num}", callback_data="noop"))
             else:
-                row.append(InlineKeyboardButton(text=f"✅{day_num}", callback_data=f"book_day_{object_id}_{date_str}"))
+                row.append(InlineKeyboardButton(text=f"✅{day_num}", callback_data=BookDayCallback(object_id=object_id, day=date_str).pack()))
 
         buttons.append(row)
 
@@ -242,6 +388,8 @@ def get_booking_calendar_keyboard(object_id, year, month, bookings):
         InlineKeyboardButton(text="⏳ожидание", callback_data="noop"),
         InlineKeyboardButton(text="❌занято", callback_data="noop"),
     ])
+    if 'held' in status_map.values():
+        buttons.append([InlineKeyboardButton(text="🔒 дату сейчас оформляет другой гость", callback_data="noop")])
     buttons.append([
         InlineKeyboardButton(text="⬅️ Назад", callback_data="book_back_objects")
     ])
@@ -276,14 +424,26 @@ def get_admin_bookings_keyboard():
     ])
 
 
-def get_admin_pending_bookings_keyboard(bookings):
-    """Список ожидающих бронирований"""
+def get_admin_pending_bookings_keyboard(bookings, selected=(), prev_before=None, next_start=None):
+    """Страница ожидающих бронирований с отметками для массовых действий"""
     buttons = []
     for b in bookings:
         text = f"#{b['id']} | {b['object_name']} | {b['date']}"
         if len(text) > 60:
             text = text[:57] + "..."
-        buttons.append([InlineKeyboardButton(text=text, callback_data=f"admin_book_detail_{b['id']}")])
+        mark = "☑️" if b['id'] in selected else "⬜"
+        buttons.append([
+            InlineKeyboardButton(text=mark, callback_data=AdminBookingSelectCallback(booking_id=b['id']).pack()),
+            InlineKeyboardButton(text=text, callback_data=AdminBookingDetailCallback(booking_id=b['id']).pack()),
+        ])
+    nav = page_nav_row(AdminPendingPageCallback, prev_before, next_start)
+    if nav:
+        buttons.append(nav)
+    if selected:
+        buttons.append([
+            InlineKeyboardButton(text=f"✅ Подтвердить ({len(selected)})", callback_data="admin_book_bulk_confirm"),
+            InlineKeyboardButton(text=f"❌ Отклонить ({len(selected)})", callback_data="admin_book_bulk_reject"),
+        ])
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_bookings")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -293,17 +453,52 @@ def get_admin_booking_detail_keyboard(booking_id, status):
     buttons = []
     if status == 'pending':
         buttons.append([
-            InlineKeyboardButton(text="✅ Подтвердить", callback_data=f"admin_book_confirm_{booking_id}"),
-            InlineKeyboardButton(text="❌ Отклонить", callback_data=f"admin_book_reject_{booking_id}"),
+            InlineKeyboardButton(text="✅ Подтвердить", callback_data=AdminBookingConfirmCallback(booking_id=booking_id).pack()),
+            InlineKeyboardButton(text="❌ Отклонить", callback_data=AdminBookingRejectCallback(booking_id=booking_id).pack()),
+        ])
+        buttons.append([
+            InlineKeyboardButton(text="✅ Все на эту дату", callback_data=AdminBookingBulkCallback(scope="date", booking_id=booking_id).pack()),
+            InlineKeyboardButton(text="✅ Все по объекту", callback_data=AdminBookingBulkCallback(scope="object", booking_id=booking_id).pack()),
         ])
     elif status == 'confirmed':
         buttons.append([
-            InlineKeyboardButton(text="🚫 Отменить бронь", callback_data=f"admin_book_cancel_{booking_id}"),
+            InlineKeyboardButton(text="🚫 Отменить бронь", callback_data=AdminBookingCancelCallback(booking_id=booking_id).pack()),
         ])
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_book_pending")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def get_admin_booking_bulk_confirm_keyboard(scope, booking_id, count):
+    """Подтверждение массового подтверждения заявок"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text=f"✅ Да, подтвердить ({count})",
+                callback_data=AdminBookingBulkCallback(scope=scope, booking_id=booking_id, confirm=1).pack()
+            ),
+            InlineKeyboardButton(text="❌ Отмена", callback_data=AdminBookingDetailCallback(booking_id=booking_id).pack()),
+        ],
+    ])
+
+
+def get_admin_booking_digest_keyboard(digest_id, bookings):
+    """Сводка новых заявок: карточки заявок и массовые действия"""
+    buttons = []
+    row = []
+    for b in bookings:
+        row.append(InlineKeyboardButton(text=f"#{b['id']}", callback_data=AdminBookingDetailCallback(booking_id=b['id']).pack()))
+        if len(row) == 5:
+            buttons.append(row)
+            row = []
+    if row:
+        buttons.append(row)
+    buttons.append([
+        InlineKeyboardButton(text="✅ Подтвердить все", callback_data=AdminBookingDigestCallback(digest_id=digest_id, action="confirm").pack()),
+        InlineKeyboardButton(text="❌ Отклонить все", callback_data=AdminBookingDigestCallback(digest_id=digest_id, action="reject").pack()),
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def get_admin_objects_keyboard(objects):
     """Управление объектами"""
     buttons = []
@@ -311,7 +506,7 @@ def get_admin_objects_keyboard(objects):
         status_icon = "🟢" if obj['is_active'] else "🔴"
         text = f"{status_icon} {obj['name']}"
         buttons.append([
-            InlineKeyboardButton(text=text, callback_data=f"admin_obj_open_{obj['id']}")
+            InlineKeyboardButton(text=text, callback_data=AdminObjectOpenCallback(object_id=obj['id']).pack())
         ])
     buttons.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_bookings")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -329,11 +524,6 @@ def get_admin_object_calendar_keyboard(object_id, year, month, bookings, is_acti
             status_map[b['date']] = 'blocked'
 
     today = date.today()
-    month_names = {
-        1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
-        5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
-        9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
-    }
     buttons = []
 
     prev_month = month - 1 if month > 1 else 12
@@ -344,20 +534,19 @@ def get_admin_object_calendar_keyboard(object_id, year, month, bookings, is_acti
     can_go_prev = date(prev_year, prev_month, 1) >= date(today.year, today.month, 1)
     prev_btn = InlineKeyboardButton(
         text="◀️" if can_go_prev else " ",
-        callback_data=f"admin_obj_cal_{object_id}_{prev_year}_{prev_month}" if can_go_prev else "noop"
+        callback_data=AdminObjectCalendarCallback(object_id=object_id, year=prev_year, month=prev_month).pack() if can_go_prev else "noop"
     )
     next_btn = InlineKeyboardButton(
         text="▶️",
-        callback_data=f"admin_obj_cal_{object_id}_{next_year}_{next_month}"
+        callback_data=AdminObjectCalendarCallback(object_id=object_id, year=next_year, month=next_month).pack()
     )
     header_btn = InlineKeyboardButton(
-        text=f"{month_names[month]} {year}",
+        text=f"{MONTH_NAMES[month]} {year}",
         callback_data="noop"
     )
     buttons.append([prev_btn, header_btn, next_btn])
 
-    week_headers = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
-    buttons.append([InlineKeyboardButton(text=d, callback_data="noop") for d in week_headers])
+    buttons.append([InlineKeyboardButton(text=d, callback_data="noop") for d in WEEK_HEADERS])
 
     cal = cal_module.monthcalendar(year, month)
     for week in cal:
@@ -380,9 +569,9 @@ def get_admin_object_calendar_keyboard(object_id, year, month, bookings, is_acti
             elif status == 'pending':
                 row.append(InlineKeyboardButton(text=f"⏳{day_num}", callback_data="noop"))
             elif status == 'blocked':
-                row.append(InlineKeyboardButton(text=f"🚫{day_num}", callback_data=f"admin_obj_day_{object_id}_{date_str}"))
+                row.append(InlineKeyboardButton(text=f"🚫{day_num}", callback_data=AdminObjectDayCallback(object_id=object_id, day=date_str).pack()))
             else:
-                row.append(InlineKeyboardButton(text=f"✅{day_num}", callback_data=f"admin_obj_day_{object_id}_{date_str}"))
+                row.append(InlineKeyboardButton(text=f"✅{day_num}", callback_data=AdminObjectDayCallback(object_id=object_id, day=date_str).pack()))
         buttons.append(row)
 
     buttons.append([
@@ -394,7 +583,7 @@ def get_admin_object_calendar_keyboard(object_id, year, month, bookings, is_acti
 
     active_btn_text = "🔴 Отключить объект" if is_active else "🟢 Включить объект"
     buttons.append([
-        InlineKeyboardButton(text=active_btn_text, callback_data=f"admin_obj_active_{object_id}_{year}_{month}")
+        InlineKeyboardButton(text=active_btn_text, callback_data=AdminObjectActiveCallback(object_id=object_id, year=year, month=month).pack())
     ])
     buttons.append([InlineKeyboardButton(text="⬅️ К объектам", callback_data="admin_objects")])
 
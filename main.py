@@ -1,4 +1,5 @@
 ﻿import asyncio
+import functools
 import logging
 import os
 from datetime import date
@@ -9,8 +10,15 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
 from config import API_TOKEN
-from handlers import router
-from database import init_db, get_all_objects, get_object_by_id, get_calendar_data_for_api
+from handlers import router, notify_expired_bookings
+from database import init_db
+from storage import get_storage
+from maintenance import maintenance_loop, pending_sweep_loop
+from backup import backup_loop
+from fsm_storage import SQLiteFSMStorage
+from shared_state import get_shared_state, invalidation_loop, run_as_leader
+from notifier import booking_alerts, user_notifications
+from middlewares import CallbackAckMiddleware, CallbackThrottlingMiddleware, UpdateSchedulerMiddleware
 
 # Настройки логирования
 logging.basicConfig(
@@ -31,7 +39,7 @@ def add_cors_headers(response):
 
 async def handle_objects(request):
     """GET /api/objects — список всех объектов бронирования"""
-    objects = get_all_objects()
+    objects = get_storage().get_all_objects()
     result = []
     for obj in objects:
         result.append({
@@ -55,7 +63,7 @@ async def handle_calendar(request):
         resp = web.json_response({"error": "Invalid object_id"}, status=400)
         return add_cors_headers(resp)
 
-    obj = get_object_by_id(object_id)
+    obj = get_storage().get_object_by_id(object_id)
     if not obj:
         resp = web.json_response({"error": "Object not found"}, status=404)
         return add_cors_headers(resp)
@@ -72,7 +80,7 @@ async def handle_calendar(request):
         today = date.today()
         year, month = today.year, today.month
 
-    data = get_calendar_data_for_api(object_id, year, month)
+    data = get_storage().get_calendar_data_for_api(object_id, year, month)
     resp = web.json_response(data)
     return add_cors_headers(resp)
 
@@ -122,19 +130,74 @@ async def main():
         token=API_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher()
+    # Общее состояние реплик: в памяти процесса или в Redis (SHARED_STATE_URL)
+    shared = get_shared_state()
+    # Состояния FSM переживают перезапуск: SQLite для одной реплики, Redis для нескольких
+    fsm_storage = shared.create_fsm_storage()
+    dp = Dispatcher(storage=fsm_storage)
+
+    # Нажатия кнопок подтверждаются сразу, не дожидаясь очереди чата и работы обработчика
+    ack = CallbackAckMiddleware()
+    dp.update.outer_middleware(ack)
+    bot.session.middleware(ack.request_middleware)
+    # Лимит частоты нажатий проверяется до очереди чата, чтобы лишние нажатия
+    # не ждали своей очереди и не занимали слоты обработки
+    throttling = CallbackThrottlingMiddleware()
+    dp.update.outer_middleware(throttling)
+    # Апдейты разных чатов обрабатываются параллельно, одного чата — по очереди
+    scheduler = UpdateSchedulerMiddleware()
+    dp.update.outer_middleware(scheduler)
+    # Схлопывание навигации: проверяется, когда подошла очередь чата
+    dp.callback_query.outer_middleware(throttling.coalesce)
 
     # Подключаем роутеры
     dp.include_router(router)
 
-    # Запуск API в фоне
+    # Запуск API в фоне (на каждой реплике)
     await start_api()
 
-    # Запуск бота
-    logger.info("🚀 Бот запущен...")
+    # Инвалидация кэшей между репликами
+    invalidation_task = asyncio.create_task(invalidation_loop(shared))
+    # Пакетная запись состояний FSM в базу
+    fsm_flush_task = None
+    if isinstance(fsm_storage, SQLiteFSMStorage):
+        fsm_flush_task = asyncio.create_task(fsm_storage.flush_loop())
+
+    async def leader_duties():
+        """Задачи лидера: polling, плановое обслуживание, автоотмена заявок и резервные копии БД."""
+        maintenance_task = asyncio.create_task(maintenance_loop())
+        sweep_task = asyncio.create_task(pending_sweep_loop(functools.partial(notify_expired_bookings, bot)))
+        backup_task = asyncio.create_task(backup_loop())
+        try:
+            # Запрашиваем у Telegram только те типы обновлений, для которых есть обработчики
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                handle_as_tasks=True,
+            )
+        finally:
+            maintenance_task.cancel()
+            sweep_task.cancel()
+            backup_task.cancel()
+
+    # Запуск бота: опрашивает Telegram только одна реплика
+    logger.info("🚀 Бот запущен (реплика %s)...", shared.replica_id)
     try:
-        await dp.start_polling(bot)
+        await run_as_leader(leader_duties, name="polling", shared=shared)
     finally:
+        logger.info(
+            "Статистика обработки апдейтов: %s, отброшено нажатий: %s, схлопнуто: %s",
+            scheduler.stats(), throttling.dropped, throttling.coalesced,
+        )
+        invalidation_task.cancel()
+        if fsm_flush_task:
+            fsm_flush_task.cancel()
+        # Dispatcher закрывает хранилище при остановке; повторная запись безопасна
+        await fsm_storage.close()
+        # Накопленные сводки заявок и уведомления отправляются до закрытия сессии бота
+        await booking_alerts.close()
+        await user_notifications.close()
+        await shared.close()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""Плановое обслуживание БД: архивация бронирований, очистка и оптимизация,
+автоотмена заявок без ответа."""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from config import (
+    MAINTENANCE_INTERVAL_HOURS, BOOKINGS_ARCHIVE_AFTER_DAYS,
+    REF_TOKEN_TTL_DAYS, SUPPORT_SESSION_TTL_HOURS, SUPPORT_MESSAGE_MAP_TTL_DAYS,
+    FSM_STATE_TTL_HOURS, BOOKING_DIGEST_TTL_DAYS,
+    PENDING_BOOKING_TTL_HOURS, PENDING_SWEEP_INTERVAL_MIN, PENDING_SWEEP_BATCH,
+)
+from database import (
+    archive_old_bookings, purge_ref_tokens, purge_stale_support_sessions,
+    purge_support_message_links, purge_fsm_states, purge_booking_digests, optimize_database,
+    expire_pending_bookings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_maintenance():
+    """Один проход обслуживания. Возвращает статистику по шагам."""
+    stats = {}
+    stats["archived_bookings"] = archive_old_bookings(BOOKINGS_ARCHIVE_AFTER_DAYS)
+    stats["purged_ref_tokens"] = purge_ref_tokens(REF_TOKEN_TTL_DAYS)
+    stats["purged_support_sessions"] = purge_stale_support_sessions(SUPPORT_SESSION_TTL_HOURS)
+    stats["purged_support_message_links"] = purge_support_message_links(SUPPORT_MESSAGE_MAP_TTL_DAYS)
+    stats["purged_fsm_states"] = purge_fsm_states(FSM_STATE_TTL_HOURS)
+    stats["purged_booking_digests"] = purge_booking_digests(BOOKING_DIGEST_TTL_DAYS)
+    # Оптимизация в конце, чтобы вернуть страницы, освобождённые удалениями
+    stats["freed_pages"] = optimize_database()
+    return stats
+
+
+async def maintenance_loop():
+    """Фоновая задача: запускать обслуживание раз в MAINTENANCE_INTERVAL_HOURS."""
+    while True:
+        try:
+            # Работа с SQLite синхронная — выносим в поток, чтобы не блокировать бота
+            stats = await asyncio.to_thread(run_maintenance)
+            logger.info("🧹 Обслуживание БД выполнено: %s", stats)
+        except Exception:
+            logger.exception("Ошибка при обслуживании БД")
+        await asyncio.sleep(MAINTENANCE_INTERVAL_HOURS * 3600)
+
+
+async def sweep_pending_bookings(on_expired, ttl_hours=PENDING_BOOKING_TTL_HOURS, batch_size=PENDING_SWEEP_BATCH):
+    """Отменить заявки, ждущие решения дольше ttl_hours. Возвращает число отменённых.
+
+    Заявки отменяются пачками по batch_size, каждая пачка — отдельной
+    транзакцией, поэтому большой хвост не блокирует запись в базу надолго.
+    По каждой пачке вызывается on_expired(bookings, ttl_hours) — уведомления
+    подключаются в main.py.
+    """
+    created_before = (datetime.utcnow() - timedelta(hours=ttl_hours)).strftime('%Y-%m-%d %H:%M:%S')
+    total = 0
+    while True:
+        expired = await asyncio.to_thread(expire_pending_bookings, created_before, batch_size)
+        on_expired(expired, ttl_hours)
+        total += len(expired)
+        if len(expired) < batch_size:
+            return total
+
+
+async def pending_sweep_loop(on_expired):
+    """Фоновая задача: раз в PENDING_SWEEP_INTERVAL_MIN отменять заявки без ответа."""
+    if PENDING_BOOKING_TTL_HOURS <= 0:
+        return
+    while True:
+        try:
+            expired = await sweep_pending_bookings(on_expired)
+            if expired:
+                logger.info("⌛ Автоматически отменено заявок без ответа: %s", expired)
+        except Exception:
+            logger.exception("Ошибка при отмене заявок без ответа")
+        await asyncio.sleep(PENDING_SWEEP_INTERVAL_MIN * 60)
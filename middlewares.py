@@ -0,0 +1,287 @@
+"""Middleware диспетчера."""
+import asyncio
+import logging
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import Update
+
+from cache import LRUCache
+from callbacks import (
+    CALLBACK_SEPARATOR,
+    AdminObjectCalendarCallback, AdminObjectDayCallback, BookCalendarCallback, BookDayCallback,
+    BookDateCalendarCallback,
+)
+from config import (
+    CALLBACK_ACK_DELAY_MS, CALLBACK_BURST, CALLBACK_RATE_PER_SEC, UPDATE_CONCURRENCY, UPDATE_QUEUE_WARN,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """Планировщик обработки обновлений.
+
+    Polling запускает каждый апдейт отдельной задачей (handle_as_tasks), поэтому
+    медленная рассылка админам не задерживает остальных пользователей. Middleware
+    добавляет к этому два ограничения:
+    - апдейты одного чата выполняются строго по очереди (FSM бронирования не
+      получит «телефон» раньше «имени»);
+    - одновременно выполняется не больше max_concurrency апдейтов, остальные ждут.
+
+    Регистрируется как outer-middleware на dp.update.
+    """
+
+    def __init__(self, max_concurrency=UPDATE_CONCURRENCY, queue_warn=UPDATE_QUEUE_WARN):
+        self.max_concurrency = max_concurrency
+        self.queue_warn = queue_warn
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Ключ чата -> [Lock, число апдейтов чата в работе и в очереди]
+        self._chat_locks = {}
+        self._warned = False
+
+        # Метрики
+        self.waiting = 0
+        self.active = 0
+        self.max_waiting = 0
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @staticmethod
+    def _chat_key(event: Update, data):
+        chat = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user = data.get("event_from_user")
+        if user is not None:
+            return ("user", user.id)
+        return ("update", event.update_id)
+
+    async def __call__(self, handler, event, data):
+        key = self._chat_key(event, data)
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        self._check_backpressure()
+        queued_at = time.monotonic()
+        started = False
+        try:
+            # Сначала очередь своего чата, затем общий лимит: чат, ожидающий
+            # свободного слота, не держит слоты других чатов
+            async with entry[0]:
+                async with self._semaphore:
+                    wait = time.monotonic() - queued_at
+                    self.waiting -= 1
+                    started = True
+                    self.active += 1
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.active -= 1
+                        self.processed += 1
+        finally:
+            if not started:
+                self.waiting -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    def _check_backpressure(self):
+        if self.waiting > self.queue_warn and not self._warned:
+            self._warned = True
+            logger.warning(
+                "Очередь апдейтов: %s ждут, %s выполняются (лимит %s)",
+                self.waiting, self.active, self.max_concurrency,
+            )
+        elif self.waiting <= self.queue_warn // 2:
+            self._warned = False
+
+    def stats(self):
+        """Снимок метрик планировщика."""
+        return {
+            "waiting": self.waiting,
+            "active": self.active,
+            "chats": len(self._chat_locks),
+            "max_waiting": self.max_waiting,
+            "processed": self.processed,
+            "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+# Лимиты по семействам кнопок: префикс CallbackData -> (нажатий в секунду, запас)
+CALLBACK_FAMILY_LIMITS = {
+    BookCalendarCallback.__prefix__: (2.0, 5),
+    BookDateCalendarCallback.__prefix__: (2.0, 5),
+    AdminObjectCalendarCallback.__prefix__: (2.0, 5),
+    BookDayCallback.__prefix__: (1.0, 3),
+    AdminObjectDayCallback.__prefix__: (1.0, 3),
+}
+
+# Навигация: из серии нажатий на одном сообщении отрисовывается только последнее
+COALESCED_FAMILIES = frozenset({
+    BookCalendarCallback.__prefix__,
+    BookDateCalendarCallback.__prefix__,
+    AdminObjectCalendarCallback.__prefix__,
+})
+
+
+def callback_family(data):
+    """Семейство кнопки: префикс CallbackData или сам текст статичной кнопки."""
+    prefix, sep, _ = (data or "").partition(CALLBACK_SEPARATOR)
+    return prefix if sep else data
+
+
+class CallbackThrottlingMiddleware(BaseMiddleware):
+    """Ограничение частоты нажатий кнопок для каждого пользователя.
+
+    - token bucket на пользователя и семейство кнопок (лимиты в
+      CALLBACK_FAMILY_LIMITS, для остальных — общий CALLBACK_RATE_PER_SEC);
+    - лишние нажатия сразу получают пустой answer() без запросов к базе;
+    - нажатия навигации по календарю схлопываются: пока ждёт очередь чата,
+      более новое нажатие на том же сообщении отменяет предыдущие.
+
+    Регистрируется дважды: на dp.update до UpdateSchedulerMiddleware (видит
+    нажатие сразу при получении) и coalesce на dp.callback_query (проверка
+    уже после очереди чата).
+    """
+
+    def __init__(self, rate=CALLBACK_RATE_PER_SEC, burst=CALLBACK_BURST, family_limits=None):
+        self.default_limit = (rate, burst)
+        self.family_limits = CALLBACK_FAMILY_LIMITS if family_limits is None else family_limits
+        # (user_id, группа) -> (токены, время последнего пополнения)
+        self._buckets = LRUCache(maxsize=10000)
+        # (user_id, message_id, семейство) -> update_id последнего нажатия
+        self._latest = {}
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _take_token(self, user_id, family):
+        group = family if family in self.family_limits else "*"
+        rate, burst = self.family_limits.get(family, self.default_limit)
+        key = (user_id, group)
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            return False
+        self._buckets.set(key, (tokens - 1, now))
+        return True
+
+    async def __call__(self, handler, event: Update, data):
+        callback = event.callback_query
+        if callback is None:
+            return await handler(event, data)
+
+        family = callback_family(callback.data)
+        if not self._take_token(callback.from_user.id, family):
+            self.dropped += 1
+            await callback.answer()
+            return None
+
+        if family in COALESCED_FAMILIES and callback.message is not None:
+            key = (callback.from_user.id, callback.message.message_id, family)
+            self._latest[key] = event.update_id
+            data["coalesce_key"] = key
+            try:
+                return await handler(event, data)
+            finally:
+                if self._latest.get(key) == event.update_id:
+                    del self._latest[key]
+        return await handler(event, data)
+
+    async def coalesce(self, handler, event, data):
+        """Пропустить нажатие, если за время ожидания пришло более новое."""
+        key = data.get("coalesce_key")
+        if key is not None and self._latest.get(key) != data["event_update"].update_id:
+            self.coalesced += 1
+            await event.answer()
+            return None
+        return await handler(event, data)
+
+
+class _AckState:
+    __slots__ = ("chat_id", "answered")
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.answered = False
+
+
+class CallbackAckMiddleware(BaseMiddleware):
+    """Быстрое подтверждение нажатий кнопок.
+
+    Если обработчик не ответил на callback за delay секунд (пока апдейт ждёт
+    очереди чата или работает с базой), middleware отвечает сам — «часики» на
+    кнопке пропадают сразу. Повторные answer() перехватывает request_middleware
+    сессии бота: Telegram принимает только один ответ, поэтому всплывающее
+    окно (show_alert) из обработчика после автоответа отправляется сообщением
+    в чат, а короткие уведомления без окна пропускаются.
+
+    Регистрируется на dp.update первым и как middleware сессии бота
+    (bot.session.middleware(ack.request_middleware)).
+    """
+
+    def __init__(self, delay=CALLBACK_ACK_DELAY_MS / 1000):
+        self.delay = delay
+        # id callback-запроса -> _AckState
+        self._pending = {}
+        self.auto_answered = 0
+        self.late_alerts = 0
+
+    async def __call__(self, handler, event: Update, data):
+        callback = event.callback_query
+        if callback is None:
+            return await handler(event, data)
+
+        chat_id = callback.message.chat.id if callback.message else callback.from_user.id
+        state = self._pending[callback.id] = _AckState(chat_id)
+        timer = asyncio.create_task(self._answer_later(callback))
+        try:
+            return await handler(event, data)
+        finally:
+            if not state.answered:
+                # Таймер ещё спит — отменяем и отвечаем сами. Если ответ уже
+                # отправляется таймером, его не прерываем.
+                timer.cancel()
+                await self._auto_answer(callback)
+            del self._pending[callback.id]
+
+    async def _answer_later(self, callback):
+        await asyncio.sleep(self.delay)
+        await self._auto_answer(callback)
+
+    async def _auto_answer(self, callback):
+        state = self._pending.get(callback.id)
+        if state is None or state.answered:
+            return
+        self.auto_answered += 1
+        try:
+            await callback.answer()
+        except TelegramAPIError as e:
+            logger.debug("Не удалось подтвердить нажатие %s: %s", callback.id, e)
+
+    async def request_middleware(self, make_request, bot, method):
+        """Пропускает только первый answerCallbackQuery на каждое нажатие."""
+        if isinstance(method, AnswerCallbackQuery):
+            state = self._pending.get(method.callback_query_id)
+            if state is not None:
+                if not state.answered:
+                    state.answered = True
+                    return await make_request(bot, method)
+                if method.text and method.show_alert:
+                    self.late_alerts += 1
+                    # Текст алерта — простой текст, а не HTML по умолчанию бота
+                    await bot.send_message(state.chat_id, method.text, parse_mode=None)
+                return True
+        return await make_request(bot, method)
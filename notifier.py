@@ -0,0 +1,210 @@
+"""Исходящие уведомления: заявки админам (по одной или сводкой) и массовые рассылки пользователям."""
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from html import escape
+
+from aiogram.exceptions import TelegramRetryAfter
+
+import keyboards as kb
+from config import (
+    BOOKING_DIGEST_ENABLED, BOOKING_DIGEST_WINDOW_SEC, BOOKING_DIGEST_MAX_ITEMS, BOOKING_DIGEST_URGENT_DAYS,
+    NOTIFY_RATE_PER_SEC,
+)
+from database import create_booking_digest
+
+logger = logging.getLogger(__name__)
+
+
+def build_booking_alert_text(booking):
+    """Уведомление админу об одной новой заявке (HTML)."""
+    return (
+        "🔔 <b>Новая заявка на бронирование!</b>\n\n"
+        f"#{booking['id']}\n"
+        f"🏠 {escape(booking['object_name'])}\n"
+        f"📆 {booking['date']}\n"
+        f"👤 {escape(booking['user_name'])}\n"
+        f"📱 {escape(booking['user_phone'])}\n"
+        f"Telegram ID: <code>{booking['user_id']}</code>"
+    )
+
+
+def build_booking_digest_text(bookings):
+    """Сводка новых заявок для админа (HTML)."""
+    lines = [f"🔔 <b>Новые заявки на бронирование ({len(bookings)})</b>\n"]
+    for booking in bookings:
+        lines.append(
+            f"#{booking['id']} · 🏠 {escape(booking['object_name'])} · 📆 {booking['date']}\n"
+            f"👤 {escape(booking['user_name'])}, 📱 {escape(booking['user_phone'])}"
+        )
+    return "\n".join(lines)
+
+
+class _AdminBatch:
+    """Заявки, ожидающие сводки для одного админа."""
+    __slots__ = ("bot", "bookings", "window_end", "task")
+
+    def __init__(self, bot, window_end):
+        self.bot = bot
+        self.bookings = []
+        self.window_end = window_end
+        self.task = None
+
+
+class BookingAlertNotifier:
+    """Рассылка уведомлений о новых заявках.
+
+    Без сводок (enabled=False) каждая заявка сразу уходит каждому админу
+    отдельным сообщением с кнопками. В режиме сводок:
+    - первая заявка после затишья и срочные заявки (дата в пределах
+      urgent_days) отправляются сразу, как раньше;
+    - остальные заявки в течение window секунд после предыдущей отправки
+      копятся и уходят одним сообщением со списком и кнопками «подтвердить
+      все» / «отклонить все»; окно продлевается, пока заявки продолжают идти;
+    - сводка отправляется досрочно, когда в ней max_items заявок;
+    - если за окно пришла одна заявка, она отправляется обычным уведомлением.
+    """
+
+    def __init__(self, enabled=BOOKING_DIGEST_ENABLED, window=BOOKING_DIGEST_WINDOW_SEC,
+                 max_items=BOOKING_DIGEST_MAX_ITEMS, urgent_days=BOOKING_DIGEST_URGENT_DAYS):
+        self.enabled = enabled
+        self.window = window
+        self.max_items = max_items
+        self.urgent_days = urgent_days
+        # admin_id -> _AdminBatch
+        self._batches = {}
+        self.sent_alerts = 0
+        self.sent_digests = 0
+
+    def is_urgent(self, booking):
+        return date.fromisoformat(booking['date']) <= date.today() + timedelta(days=self.urgent_days)
+
+    async def notify_new_booking(self, bot, booking, admins):
+        """Уведомить админов о новой заявке (booking — словарь с полями заявки и object_name)."""
+        urgent = not self.enabled or self.is_urgent(booking)
+        now = time.monotonic()
+        for admin_id in admins:
+            batch = self._batches.get(admin_id)
+            if urgent or batch is None:
+                await self._send_alert(bot, admin_id, booking)
+                if not urgent:
+                    self._open_window(bot, admin_id, now)
+                continue
+
+            batch.bookings.append(booking)
+            if len(batch.bookings) >= self.max_items:
+                await self._flush(admin_id, batch)
+
+    def _open_window(self, bot, admin_id, now):
+        batch = self._batches[admin_id] = _AdminBatch(bot, now + self.window)
+        batch.task = asyncio.create_task(self._window_loop(admin_id, batch))
+
+    async def _window_loop(self, admin_id, batch):
+        """Отправлять накопленное в конце окна; закрыть окно, когда заявки перестали идти."""
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, batch.window_end - time.monotonic()))
+                if not batch.bookings:
+                    break
+                await self._flush(admin_id, batch)
+        finally:
+            if self._batches.get(admin_id) is batch:
+                del self._batches[admin_id]
+
+    async def _flush(self, admin_id, batch):
+        if not batch.bookings:
+            return
+        bookings, batch.bookings = batch.bookings, []
+        batch.window_end = time.monotonic() + self.window
+        if len(bookings) == 1:
+            await self._send_alert(batch.bot, admin_id, bookings[0])
+        else:
+            await self._send_digest(batch.bot, admin_id, bookings)
+
+    async def _send_alert(self, bot, admin_id, booking):
+        try:
+            await bot.send_message(
+                admin_id,
+                build_booking_alert_text(booking),
+                reply_markup=kb.get_admin_booking_detail_keyboard(booking['id'], 'pending'),
+                parse_mode="HTML"
+            )
+            self.sent_alerts += 1
+        except Exception:
+            logger.warning("Не удалось уведомить админа %s", admin_id, exc_info=True)
+
+    async def _send_digest(self, bot, admin_id, bookings):
+        try:
+            digest_id = await asyncio.to_thread(create_booking_digest, [b['id'] for b in bookings])
+            await bot.send_message(
+                admin_id,
+                build_booking_digest_text(bookings),
+                reply_markup=kb.get_admin_booking_digest_keyboard(digest_id, bookings),
+                parse_mode="HTML"
+            )
+            self.sent_digests += 1
+        except Exception:
+            logger.warning("Не удалось отправить сводку админу %s", admin_id, exc_info=True)
+
+    async def close(self):
+        """Отправить все накопленные сводки (при остановке бота)."""
+        batches, self._batches = self._batches, {}
+        for admin_id, batch in batches.items():
+            batch.task.cancel()
+            await self._flush(admin_id, batch)
+
+
+class NotificationSender:
+    """Очередь массовых уведомлений с ограничением частоты.
+
+    Обработчик передаёт пачку сообщений через submit() и сразу отвечает админу;
+    сообщения отправляются в фоне не чаще rate в секунду. На TelegramRetryAfter
+    отправка ждёт указанное время и повторяет сообщение один раз.
+    """
+
+    def __init__(self, rate=NOTIFY_RATE_PER_SEC):
+        self.interval = 1 / rate
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, bot, messages):
+        """Поставить в очередь пачку сообщений [(chat_id, text), ...] (HTML)."""
+        for chat_id, text in messages:
+            self._queue.put_nowait((bot, chat_id, text))
+        if self._queue.qsize() and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._queue.empty():
+            bot, chat_id, text = self._queue.get_nowait()
+            await self._send(bot, chat_id, text)
+            await asyncio.sleep(self.interval)
+
+    async def _send(self, bot, chat_id, text, retry=True):
+        try:
+            await bot.send_message(chat_id, text, parse_mode="HTML")
+            self.sent += 1
+        except TelegramRetryAfter as e:
+            if not retry:
+                self.failed += 1
+                return
+            await asyncio.sleep(e.retry_after)
+            await self._send(bot, chat_id, text, retry=False)
+        except Exception as e:
+            self.failed += 1
+            logger.debug("Не удалось отправить уведомление %s: %s", chat_id, e)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    async def close(self):
+        """Дождаться отправки очереди (при остановке бота)."""
+        if self._worker is not None and not self._worker.done():
+            await self._worker
+
+
+booking_alerts = BookingAlertNotifier()
+user_notifications = NotificationSender()
@@ -0,0 +1,307 @@
+"""Общее состояние реплик бота: FSM, инвалидация кэшей, блокировки, выбор лидера.
+
+LocalSharedState — одна реплика: всё в памяти процесса (по умолчанию, а также
+как фейк для проверок: несколько «реплик» в одном процессе делят один объект).
+RedisSharedState — несколько реплик с общим Redis (SHARED_STATE_URL), нужен
+пакет redis.
+
+Polling, обслуживание БД и бэкапы выполняет только лидер; HTTP API работает
+на всех репликах.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+
+import database
+from config import (
+    SHARED_STATE_URL, REPLICA_ID, LEADER_LOCK_TTL_SEC, BOOKING_LOCK_TTL_SEC,
+    FSM_STATE_TTL_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "bot:data_versions"
+LOCK_PREFIX = "bot:lock:"
+
+
+class LockTimeout(Exception):
+    """Не удалось получить блокировку за отведённое время."""
+
+
+class SharedState(ABC):
+    """Интерфейс общего состояния."""
+
+    def __init__(self, replica_id=None):
+        self.replica_id = replica_id or REPLICA_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+    @abstractmethod
+    def create_fsm_storage(self):
+        raise NotImplementedError
+
+    # Блокировки: token — уникальная метка владельца, ttl в секундах
+    @abstractmethod
+    async def acquire_lock(self, name, token, ttl):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def renew_lock(self, name, token, ttl):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_lock(self, name, token):
+        raise NotImplementedError
+
+    # Сообщения между репликами
+    @abstractmethod
+    async def publish(self, channel, message):
+        raise NotImplementedError
+
+    @abstractmethod
+    def listen(self, channel):
+        """Асинхронный итератор сообщений канала (в реализациях — async-генератор)."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalSharedState(SharedState):
+    """Общее состояние в памяти процесса."""
+
+    def __init__(self, replica_id=None):
+        super().__init__(replica_id)
+        # имя -> (token, время истечения)
+        self._locks = {}
+        # канал -> список очередей подписчиков
+        self._subscribers = {}
+
+    def create_fsm_storage(self):
+        from fsm_storage import SQLiteFSMStorage
+        return SQLiteFSMStorage()
+
+    def _lock_owner(self, name):
+        owner = self._locks.get(name)
+        if owner and owner[1] <= time.monotonic():
+            del self._locks[name]
+            return None
+        return owner
+
+    async def acquire_lock(self, name, token, ttl):
+        if self._lock_owner(name):
+            return False
+        self._locks[name] = (token, time.monotonic() + ttl)
+        return True
+
+    async def renew_lock(self, name, token, ttl):
+        owner = self._lock_owner(name)
+        if not owner or owner[0] != token:
+            return False
+        self._locks[name] = (token, time.monotonic() + ttl)
+        return True
+
+    async def release_lock(self, name, token):
+        owner = self._lock_owner(name)
+        if owner and owner[0] == token:
+            del self._locks[name]
+
+    async def publish(self, channel, message):
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def listen(self, channel):
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+
+
+# Освободить/продлить блокировку, только если ею владеет token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisSharedState(SharedState):
+    """Общее состояние в Redis."""
+
+    def __init__(self, url, replica_id=None):
+        super().__init__(replica_id)
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError("Для SHARED_STATE_URL нужен пакет redis: pip install redis") from e
+        self.url = url
+        self.redis = Redis.from_url(url, decode_responses=True)
+
+    def create_fsm_storage(self):
+        from aiogram.fsm.storage.redis import RedisStorage
+        ttl = FSM_STATE_TTL_HOURS * 3600
+        return RedisStorage.from_url(self.url, state_ttl=ttl, data_ttl=ttl)
+
+    async def acquire_lock(self, name, token, ttl):
+        return bool(await self.redis.set(LOCK_PREFIX + name, token, nx=True, px=int(ttl * 1000)))
+
+    async def renew_lock(self, name, token, ttl):
+        return bool(await self.redis.eval(_RENEW_SCRIPT, 1, LOCK_PREFIX + name, token, int(ttl * 1000)))
+
+    async def release_lock(self, name, token):
+        await self.redis.eval(_RELEASE_SCRIPT, 1, LOCK_PREFIX + name, token)
+
+    async def publish(self, channel, message):
+        await self.redis.publish(channel, message)
+
+    async def listen(self, channel):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") == "message":
+                    yield item["data"]
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def close(self):
+        await self.redis.close()
+
+
+_shared_state = None
+
+
+def get_shared_state():
+    """Текущее общее состояние (по умолчанию — из config.SHARED_STATE_URL)."""
+    global _shared_state
+    if _shared_state is None:
+        _shared_state = RedisSharedState(SHARED_STATE_URL) if SHARED_STATE_URL else LocalSharedState()
+    return _shared_state
+
+
+def set_shared_state(shared_state):
+    """Подменить общее состояние (проверки, несколько реплик в одном процессе)."""
+    global _shared_state
+    _shared_state = shared_state
+
+
+# === Блокировки ===
+
+@asynccontextmanager
+async def distributed_lock(name, ttl=BOOKING_LOCK_TTL_SEC, wait=None, shared=None):
+    """Блокировка, общая для всех реплик. LockTimeout — если не дождались за wait секунд."""
+    shared = shared or get_shared_state()
+    token = uuid.uuid4().hex
+    wait = ttl if wait is None else wait
+    deadline = time.monotonic() + wait
+    delay = 0.01
+    while not await shared.acquire_lock(name, token, ttl):
+        if time.monotonic() >= deadline:
+            raise LockTimeout(name)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.2)
+    try:
+        yield
+    finally:
+        await shared.release_lock(name, token)
+
+
+# === Инвалидация кэшей ===
+
+async def invalidation_loop(shared=None):
+    """Фоновая задача: обмен изменениями версий данных с другими репликами.
+
+    Локальные bump_data_version рассылаются в канал, чужие — применяются
+    к своим версиям, и кэши клавиатур и списка админов перестраиваются.
+    """
+    shared = shared or get_shared_state()
+    loop = asyncio.get_running_loop()
+    outgoing = asyncio.Queue()
+
+    # Изменения могут происходить в потоках (asyncio.to_thread)
+    def on_change(names):
+        loop.call_soon_threadsafe(outgoing.put_nowait, names)
+
+    database.add_data_change_listener(on_change)
+
+    async def publish_changes():
+        while True:
+            names = await outgoing.get()
+            message = json.dumps({"origin": shared.replica_id, "names": list(names)})
+            try:
+                await shared.publish(INVALIDATION_CHANNEL, message)
+            except Exception:
+                logger.exception("Не удалось разослать инвалидацию %s", names)
+
+    publisher = asyncio.create_task(publish_changes())
+    try:
+        while True:
+            try:
+                async for message in shared.listen(INVALIDATION_CHANNEL):
+                    payload = json.loads(message)
+                    if payload.get("origin") != shared.replica_id:
+                        database.bump_data_version(*payload["names"], notify=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Подписка на инвалидацию прервалась, переподключение")
+                await asyncio.sleep(1)
+    finally:
+        publisher.cancel()
+
+
+# === Выбор лидера ===
+
+async def run_as_leader(duty, name="leader", ttl=LEADER_LOCK_TTL_SEC, shared=None):
+    """Выполнять duty() только пока эта реплика — лидер.
+
+    Реплика пытается захватить блокировку name; получив её, запускает duty
+    и продлевает блокировку каждые ttl/3 секунд. Если продлить не удалось,
+    duty отменяется и реплика снова ждёт своей очереди. Возвращает результат
+    duty, если она завершилась сама (например, polling остановлен сигналом).
+    """
+    shared = shared or get_shared_state()
+    token = f"{shared.replica_id}:{uuid.uuid4().hex}"
+    while True:
+        if not await shared.acquire_lock(name, token, ttl):
+            await asyncio.sleep(ttl / 3)
+            continue
+
+        logger.info("Реплика %s стала лидером (%s)", shared.replica_id, name)
+        task = asyncio.create_task(duty())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=ttl / 3)
+                if done:
+                    return task.result()
+                try:
+                    renewed = await shared.renew_lock(name, token, ttl)
+                except Exception:
+                    logger.exception("Ошибка продления блокировки лидера")
+                    renewed = False
+                if not renewed:
+                    logger.warning("Реплика %s потеряла лидерство (%s)", shared.replica_id, name)
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            await shared.release_lock(name, token)
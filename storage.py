@@ -0,0 +1,483 @@
+"""Хранилище объектов и бронирований: общий интерфейс, SQLite и in-memory реализации.
+
+SQLiteStorage работает через функции database.py (config.DB_PATH).
+MemoryStorage держит данные в словарях с отсортированными индексами по объектам
+и нужен для тестов, нагрузочных прогонов и сравнения движков.
+"""
+import bisect
+import calendar as cal_module
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import database
+from database import DEFAULT_OBJECTS
+
+OBJECT_FIELDS = ('name', 'category', 'capacity', 'price_weekday', 'price_weekend', 'description', 'is_active', 'sort_order')
+
+
+def _month_bounds(year, month):
+    """Границы месяца [date_from, date_to) в формате YYYY-MM-DD."""
+    date_from = f"{year:04d}-{month:02d}-01"
+    if month == 12:
+        date_to = f"{year + 1:04d}-01-01"
+    else:
+        date_to = f"{year:04d}-{month + 1:02d}-01"
+    return date_from, date_to
+
+
+class BookingStorage(ABC):
+    """Интерфейс хранилища. Методы повторяют одноимённые функции database.py."""
+
+    # Объекты
+    @abstractmethod
+    def add_object(self, name, category, capacity, price_weekday, price_weekend, description='', is_active=1, sort_order=0):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_objects_by_category(self, category):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_objects(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_objects_admin(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_object_by_id(self, object_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_object(self, object_id, **kwargs):
+        raise NotImplementedError
+
+    # Ручные блокировки
+    @abstractmethod
+    def is_manual_blocked(self, object_id, date_str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def toggle_object_manual_block(self, object_id, date_str, admin_id):
+        raise NotImplementedError
+
+    # Бронирования
+    @abstractmethod
+    def get_bookings_for_object_month(self, object_id, year, month):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_day_status(self, object_id, date_str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_free_objects_on_date(self, category, date_str, guests=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_booking(self, object_id, date_str, user_id, user_name, user_phone):
+        raise NotImplementedError
+
+    @abstractmethod
+    def confirm_booking(self, booking_id, admin_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def reject_booking(self, booking_id, admin_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def confirm_bookings(self, booking_ids, admin_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def reject_bookings(self, booking_ids, admin_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def expire_pending_bookings(self, created_before, limit):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cancel_booking(self, booking_id, admin_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_booking_by_id(self, booking_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pending_bookings(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pending_booking_ids(self, object_id=None, date_str=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_bookings_by_date(self, date_str):
+        raise NotImplementedError
+
+    def get_calendar_data_for_api(self, object_id, year, month):
+        """Данные календаря для HTTP API: {date: status}"""
+        days_in_month = cal_module.monthrange(year, month)[1]
+        booking_map = {}
+        for b in self.get_bookings_for_object_month(object_id, year, month):
+            if b['status'] in ('confirmed', 'blocked'):
+                booking_map[b['date']] = 'booked'
+            elif b['date'] not in booking_map:
+                booking_map[b['date']] = 'partially'
+        result = {}
+        for day in range(1, days_in_month + 1):
+            date_str = f"{year:04d}-{month:02d}-{day:02d}"
+            result[date_str] = booking_map.get(date_str, 'available')
+        return result
+
+
+class SQLiteStorage(BookingStorage):
+    """Текущее хранилище: SQLite через функции database.py."""
+
+    def add_object(self, name, category, capacity, price_weekday, price_weekend, description='', is_active=1, sort_order=0):
+        return database.add_object(name, category, capacity, price_weekday, price_weekend, description, is_active, sort_order)
+
+    def get_objects_by_category(self, category):
+        return database.get_objects_by_category(category)
+
+    def get_all_objects(self):
+        return database.get_all_objects()
+
+    def get_all_objects_admin(self):
+        return database.get_all_objects_admin()
+
+    def get_object_by_id(self, object_id):
+        return database.get_object_by_id(object_id)
+
+    def update_object(self, object_id, **kwargs):
+        return database.update_object(object_id, **kwargs)
+
+    def is_manual_blocked(self, object_id, date_str):
+        return database.is_manual_blocked(object_id, date_str)
+
+    def toggle_object_manual_block(self, object_id, date_str, admin_id):
+        return database.toggle_object_manual_block(object_id, date_str, admin_id)
+
+    def get_bookings_for_object_month(self, object_id, year, month):
+        return database.get_bookings_for_object_month(object_id, year, month)
+
+    def get_day_status(self, object_id, date_str):
+        return database.get_day_status(object_id, date_str)
+
+    def get_free_objects_on_date(self, category, date_str, guests=None):
+        return database.get_free_objects_on_date(category, date_str, guests)
+
+    def create_booking(self, object_id, date_str, user_id, user_name, user_phone):
+        return database.create_booking(object_id, date_str, user_id, user_name, user_phone)
+
+    def confirm_booking(self, booking_id, admin_id):
+        return database.confirm_booking(booking_id, admin_id)
+
+    def reject_booking(self, booking_id, admin_id):
+        return database.reject_booking(booking_id, admin_id)
+
+    def confirm_bookings(self, booking_ids, admin_id):
+        return database.confirm_bookings(booking_ids, admin_id)
+
+    def reject_bookings(self, booking_ids, admin_id):
+        return database.reject_bookings(booking_ids, admin_id)
+
+    def expire_pending_bookings(self, created_before, limit):
+        return database.expire_pending_bookings(created_before, limit)
+
+    def cancel_booking(self, booking_id, admin_id):
+        return database.cancel_booking(booking_id, admin_id)
+
+    def get_booking_by_id(self, booking_id):
+        return database.get_booking_by_id(booking_id)
+
+    def get_pending_bookings(self):
+        return database.get_pending_bookings()
+
+    def get_pending_booking_ids(self, object_id=None, date_str=None):
+        return database.get_pending_booking_ids(object_id, date_str)
+
+    def get_bookings_by_date(self, date_str):
+        return database.get_bookings_by_date(date_str)
+
+    def get_calendar_data_for_api(self, object_id, year, month):
+        return database.get_calendar_data_for_api(object_id, year, month)
+
+
+class MemoryStorage(BookingStorage):
+    """In-memory хранилище.
+
+    Индексы:
+    - bookings_by_object: object_id -> отсортированный список (date, status, id)
+      активных (не отменённых) бронирований, как idx_bookings_object_date;
+    - bookings_by_date: date -> отсортированный список id активных бронирований;
+    - blocks_by_object: object_id -> отсортированный список дат ручных блокировок;
+    - pending: отсортированный список (created_at, id) ожидающих заявок.
+    """
+
+    def __init__(self, seed_defaults=True):
+        self.objects = {}
+        self.bookings = {}
+        self.bookings_by_object = {}
+        self.bookings_by_date = {}
+        self.blocks_by_object = {}
+        self.pending = []
+        self._next_object_id = 1
+        self._next_booking_id = 1
+        if seed_defaults:
+            for row in DEFAULT_OBJECTS:
+                self.add_object(*row)
+
+    @staticmethod
+    def _now():
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+    # === Объекты ===
+
+    def add_object(self, name, category, capacity, price_weekday, price_weekend, description='', is_active=1, sort_order=0):
+        object_id = self._next_object_id
+        self._next_object_id += 1
+        self.objects[object_id] = {
+            'id': object_id,
+            'name': name,
+            'category': category,
+            'capacity': capacity,
+            'price_weekday': price_weekday,
+            'price_weekend': price_weekend,
+            'description': description,
+            'is_active': is_active,
+            'sort_order': sort_order,
+        }
+        return object_id
+
+    def _sorted_objects(self, predicate):
+        items = [dict(obj) for obj in self.objects.values() if predicate(obj)]
+        items.sort(key=lambda obj: (obj['sort_order'], obj['id']))
+        return items
+
+    def get_objects_by_category(self, category):
+        return self._sorted_objects(lambda obj: obj['category'] == category and obj['is_active'] == 1)
+
+    def get_all_objects(self):
+        return self._sorted_objects(lambda obj: obj['is_active'] == 1)
+
+    def get_all_objects_admin(self):
+        return self._sorted_objects(lambda obj: True)
+
+    def get_object_by_id(self, object_id):
+        obj = self.objects.get(object_id)
+        return dict(obj) if obj else None
+
+    def update_object(self, object_id, **kwargs):
+        fields = {k: v for k, v in kwargs.items() if k in OBJECT_FIELDS}
+        if not fields or object_id not in self.objects:
+            return False
+        self.objects[object_id].update(fields)
+        return True
+
+    # === Ручные блокировки ===
+
+    def is_manual_blocked(self, object_id, date_str):
+        dates = self.blocks_by_object.get(object_id, [])
+        i = bisect.bisect_left(dates, date_str)
+        return i < len(dates) and dates[i] == date_str
+
+    def toggle_object_manual_block(self, object_id, date_str, admin_id):
+        dates = self.blocks_by_object.setdefault(object_id, [])
+        i = bisect.bisect_left(dates, date_str)
+        if i < len(dates) and dates[i] == date_str:
+            del dates[i]
+            return 'unblocked'
+        dates.insert(i, date_str)
+        return 'blocked'
+
+    # === Бронирования ===
+
+    def _index_add(self, booking):
+        bisect.insort(
+            self.bookings_by_object.setdefault(booking['object_id'], []),
+            (booking['date'], booking['status'], booking['id'])
+        )
+        bisect.insort(self.bookings_by_date.setdefault(booking['date'], []), booking['id'])
+        if booking['status'] == 'pending':
+            bisect.insort(self.pending, (booking['created_at'], booking['id']))
+
+    def _index_remove(self, booking):
+        entries = self.bookings_by_object.get(booking['object_id'], [])
+        key = (booking['date'], booking['status'], booking['id'])
+        i = bisect.bisect_left(entries, key)
+        if i < len(entries) and entries[i] == key:
+            del entries[i]
+        ids = self.bookings_by_date.get(booking['date'], [])
+        i = bisect.bisect_left(ids, booking['id'])
+        if i < len(ids) and ids[i] == booking['id']:
+            del ids[i]
+        if booking['status'] == 'pending':
+            key = (booking['created_at'], booking['id'])
+            i = bisect.bisect_left(self.pending, key)
+            if i < len(self.pending) and self.pending[i] == key:
+                del self.pending[i]
+
+    def _active_range(self, object_id, date_from, date_to):
+        """Активные бронирования объекта в диапазоне дат [date_from, date_to)."""
+        entries = self.bookings_by_object.get(object_id, [])
+        lo = bisect.bisect_left(entries, (date_from,))
+        hi = bisect.bisect_left(entries, (date_to,))
+        return entries[lo:hi]
+
+    def _set_status(self, booking_id, from_status, to_status, admin_id):
+        booking = self.bookings.get(booking_id)
+        if not booking or booking['status'] != from_status:
+            return False
+        self._index_remove(booking)
+        booking['status'] = to_status
+        booking['admin_id'] = admin_id
+        booking['updated_at'] = self._now()
+        # Отменённые бронирования в индекс занятости не попадают
+        if to_status != 'cancelled':
+            self._index_add(booking)
+        return True
+
+    def _with_object(self, booking, *fields):
+        obj = self.objects.get(booking['object_id'])
+        if not obj:
+            return None
+        item = dict(booking)
+        for field in fields:
+            item[f'object_{field}'] = obj[field]
+        return item
+
+    def get_bookings_for_object_month(self, object_id, year, month):
+        date_from, date_to = _month_bounds(year, month)
+        items = [dict(self.bookings[booking_id]) for _, _, booking_id in self._active_range(object_id, date_from, date_to)]
+        dates = self.blocks_by_object.get(object_id, [])
+        lo = bisect.bisect_left(dates, date_from)
+        hi = bisect.bisect_left(dates, date_to)
+        for date_str in dates[lo:hi]:
+            items.append({
+                "object_id": object_id,
+                "date": date_str,
+                "status": "blocked",
+            })
+        items.sort(key=lambda item: item["date"])
+        return items
+
+    def get_day_status(self, object_id, date_str):
+        if self.is_manual_blocked(object_id, date_str):
+            return 'booked'
+        statuses = {status for _, status, _ in self._active_range(object_id, date_str, date_str + '\x00')}
+        if not statuses:
+            return 'available'
+        return 'booked' if 'confirmed' in statuses else 'pending'
+
+    def get_free_objects_on_date(self, category, date_str, guests=None):
+        return self._sorted_objects(
+            lambda obj: obj['category'] == category and obj['is_active'] == 1
+            and (not guests or obj['capacity'] >= guests)
+            and not self.is_manual_blocked(obj['id'], date_str)
+            and not self._active_range(obj['id'], date_str, date_str + '\x00')
+        )
+
+    def create_booking(self, object_id, date_str, user_id, user_name, user_phone):
+        if self.is_manual_blocked(object_id, date_str):
+            return None
+        if self._active_range(object_id, date_str, date_str + '\x00'):
+            return None
+        booking_id = self._next_booking_id
+        self._next_booking_id += 1
+        now = self._now()
+        booking = {
+            'id': booking_id,
+            'object_id': object_id,
+            'date': date_str,
+            'user_id': user_id,
+            'user_name': user_name,
+            'user_phone': user_phone,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now,
+            'admin_id': None,
+        }
+        self.bookings[booking_id] = booking
+        self._index_add(booking)
+        return booking_id
+
+    def confirm_booking(self, booking_id, admin_id):
+        return self._set_status(booking_id, 'pending', 'confirmed', admin_id)
+
+    def reject_booking(self, booking_id, admin_id):
+        return self._set_status(booking_id, 'pending', 'cancelled', admin_id)
+
+    def cancel_booking(self, booking_id, admin_id):
+        return self._set_status(booking_id, 'confirmed', 'cancelled', admin_id)
+
+    def _set_statuses(self, booking_ids, to_status, admin_id):
+        changed = [
+            booking_id for booking_id in sorted(set(booking_ids))
+            if self._set_status(booking_id, 'pending', to_status, admin_id)
+        ]
+        items = [self._with_object(self.bookings[booking_id], 'name') for booking_id in changed]
+        return [item for item in items if item]
+
+    def confirm_bookings(self, booking_ids, admin_id):
+        return self._set_statuses(booking_ids, 'confirmed', admin_id)
+
+    def reject_bookings(self, booking_ids, admin_id):
+        return self._set_statuses(booking_ids, 'cancelled', admin_id)
+
+    def expire_pending_bookings(self, created_before, limit):
+        # pending отсортирован по (created_at, id): самые старые заявки в начале
+        end = bisect.bisect_left(self.pending, (created_before,))
+        expired = [booking_id for _, booking_id in self.pending[:min(end, limit)]]
+        return self._set_statuses(expired, 'cancelled', None)
+
+    def get_booking_by_id(self, booking_id):
+        booking = self.bookings.get(booking_id)
+        if not booking:
+            return None
+        return self._with_object(booking, 'name', 'category')
+
+    def get_pending_bookings(self):
+        items = []
+        for _, booking_id in self.pending:
+            item = self._with_object(self.bookings[booking_id], 'name')
+            if item:
+                items.append(item)
+        return items
+
+    def get_pending_booking_ids(self, object_id=None, date_str=None):
+        return sorted(
+            booking_id for _, booking_id in self.pending
+            if (object_id is None or self.bookings[booking_id]['object_id'] == object_id)
+            and (date_str is None or self.bookings[booking_id]['date'] == date_str)
+        )
+
+    def get_bookings_by_date(self, date_str):
+        items = []
+        for booking_id in self.bookings_by_date.get(date_str, []):
+            item = self._with_object(self.bookings[booking_id], 'name')
+            if item:
+                items.append(item)
+        items.sort(key=lambda item: (self.objects[item['object_id']]['sort_order'], item['id']))
+        return items
+
+
+_storage = None
+
+
+def get_storage():
+    """Активное хранилище (по умолчанию SQLite)."""
+    global _storage
+    if _storage is None:
+        _storage = SQLiteStorage()
+    return _storage
+
+
+def set_storage(storage):
+    """Подменить активное хранилище, например на MemoryStorage в тестовых прогонах."""
+    global _storage
+    _storage = storage
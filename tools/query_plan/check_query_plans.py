@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Check EXPLAIN QUERY PLAN for every SQL statement issued by database.py.
+
+Workflow:
+- Create a temporary database with init_db() and seed it with bookings.
+- Call each registered database function; the SQL it executes is captured
+  through sqlite3 trace callbacks (parameters already expanded).
+- Run EXPLAIN QUERY PLAN for each captured statement.
+- Flag full table scans and temporary B-trees unless they are explicitly allowed.
+
+Exit code is 1 when at least one statement is flagged.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import database  # noqa: E402
+
+_EXPLAINED_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+# Registered calls: name -> callable. Each name is reported together with
+# the statements it executed.
+REGISTERED_CALLS: Dict[str, Callable[[], object]] = {
+    "get_admins": lambda: database.get_admins(),
+    "get_admins_page": lambda: database.get_admins_page(),
+    "get_admins_page_next": lambda: database.get_admins_page(start=2),
+    "count_admins": lambda: database.count_admins(),
+    "get_admin_notifications_enabled": lambda: database.get_admin_notifications_enabled(1),
+    "get_global_notifications_enabled": lambda: database.get_global_notifications_enabled(),
+    "get_admins_for_notifications": lambda: database.get_admins_for_notifications("house"),
+    "get_admin_subscriptions": lambda: database.get_admin_subscriptions(1),
+    "set_admin_subscription": lambda: database.set_admin_subscription(1, "house", False),
+    "get_faq": lambda: database.get_faq(),
+    "get_faq_page": lambda: database.get_faq_page(),
+    "get_faq_page_prev": lambda: database.get_faq_page(before=3, limit=1),
+    "get_faq_by_id": lambda: database.get_faq_by_id(1),
+    "update_faq": lambda: database.update_faq(1, question="?"),
+    "use_ref_token": lambda: database.use_ref_token("missing", 1),
+    "is_user_in_support": lambda: database.is_user_in_support(1),
+    "get_objects_by_category": lambda: database.get_objects_by_category("house"),
+    "get_all_objects": lambda: database.get_all_objects(),
+    "get_all_objects_admin": lambda: database.get_all_objects_admin(),
+    "get_object_by_id": lambda: database.get_object_by_id(1),
+    "add_object": lambda: database.add_object("Новый", "house", 4, 1000, 1500),
+    "update_object": lambda: database.update_object(1, sort_order=1),
+    "is_manual_blocked": lambda: database.is_manual_blocked(1, "2030-01-01"),
+    "toggle_object_manual_block": lambda: database.toggle_object_manual_block(1, "2030-01-01", 1),
+    "get_bookings_for_object_month": lambda: database.get_bookings_for_object_month(1, 2030, 1),
+    "get_day_status": lambda: database.get_day_status(1, "2030-01-02"),
+    "create_booking": lambda: database.create_booking(1, "2031-01-01", 1, "A", "1"),
+    "confirm_booking": lambda: database.confirm_booking(1, 1),
+    "reject_booking": lambda: database.reject_booking(2, 1),
+    "confirm_bookings": lambda: database.confirm_bookings([3, 4, 5], 1),
+    "reject_bookings": lambda: database.reject_bookings([6, 7], 1),
+    "cancel_booking": lambda: database.cancel_booking(1, 1),
+    "get_booking_by_id": lambda: database.get_booking_by_id(1),
+    "get_free_objects_on_date": lambda: database.get_free_objects_on_date("house", "2030-01-02"),
+    "get_free_objects_on_date_guests": lambda: database.get_free_objects_on_date("gazebo_fishing", "2030-01-02", 8),
+    "get_pending_bookings": lambda: database.get_pending_bookings(),
+    "get_pending_bookings_page": lambda: database.get_pending_bookings_page(),
+    "get_pending_bookings_page_next": lambda: database.get_pending_bookings_page(start=2500),
+    "get_pending_bookings_page_prev": lambda: database.get_pending_bookings_page(before=2500),
+    "count_pending_bookings": lambda: database.count_pending_bookings(),
+    "expire_pending_bookings": lambda: database.expire_pending_bookings("2000-01-01 00:00:00", 100),
+    "get_pending_booking_ids": lambda: database.get_pending_booking_ids(1, "2030-01-02"),
+    "get_pending_booking_ids_by_date": lambda: database.get_pending_booking_ids(date_str="2030-01-02"),
+    "get_bookings_by_date": lambda: database.get_bookings_by_date("2030-01-02"),
+    "create_booking_digest": lambda: database.create_booking_digest([1, 2, 3]),
+    "get_booking_digest": lambda: database.get_booking_digest(1, 7),
+    "purge_booking_digests": lambda: database.purge_booking_digests(7),
+    "get_calendar_data_for_api": lambda: database.get_calendar_data_for_api(1, 2030, 1),
+    "archive_old_bookings": lambda: database.archive_old_bookings(3650),
+    "purge_ref_tokens": lambda: database.purge_ref_tokens(7),
+    "purge_stale_support_sessions": lambda: database.purge_stale_support_sessions(72),
+    "touch_support_session": lambda: database.touch_support_session(5),
+    "save_support_message_links": lambda: database.save_support_message_links([(1, 10, 5), (2, 11, 5)]),
+    "get_support_message_user": lambda: database.get_support_message_user(1, 10, 30),
+    "purge_support_message_links": lambda: database.purge_support_message_links(30),
+    "save_fsm_states": lambda: database.save_fsm_states([
+        ("1:1:1::default", "BookingStates:entering_name", "{}", "2030-01-01 00:00:00"),
+        ("1:2:2::default", None, "{}", "2030-01-01 00:00:00"),
+    ]),
+    "load_fsm_state": lambda: database.load_fsm_state("1:1:1::default", 24),
+    "purge_fsm_states": lambda: database.purge_fsm_states(24),
+}
+
+# Accepted plan fragments per call, with the reason they are fine.
+ALLOWED: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    # Full lists by design: tiny tables, every row is rendered
+    "get_admins": (("SCAN admins", "full list of admins"),),
+    "get_faq": (("SCAN faq", "full FAQ list in rowid order"),),
+    # First page: rowid order with LIMIT, stops after one page
+    "get_admins_page": (("SCAN admins", "first page in rowid order with LIMIT"),),
+    "get_faq_page": (("SCAN faq", "first page in rowid order with LIMIT"),),
+    "count_admins": (("SCAN admins", "tiny table, header counter"),),
+    "get_admins_for_notifications": (("SCAN a", "every admin is checked against its settings"),),
+    "get_all_objects_admin": (
+        ("SCAN objects", "admin list of all objects"),
+        ("USE TEMP B-TREE FOR ORDER BY", "sorting a handful of objects"),
+    ),
+    # Ordering the few rows of one object and day by status priority
+    "get_day_status": (("USE TEMP B-TREE FOR ORDER BY", "rows of a single object and day"),),
+    # Sorting the bookings of a single day by object order
+    "get_bookings_by_date": (("USE TEMP B-TREE FOR ORDER BY", "at most one row per object"),),
+    # Background maintenance is allowed to scan
+    "archive_old_bookings": (("SCAN bookings", "background maintenance"),),
+    "purge_ref_tokens": (("SCAN ref_tokens", "background maintenance"),),
+    "purge_stale_support_sessions": (("SCAN active_chats", "background maintenance"),),
+    "purge_booking_digests": (("SCAN booking_digests", "background maintenance, a few rows per day"),),
+}
+
+
+def _seed(bookings: int) -> None:
+    """Fill bookings and manual blocks so the planner sees realistic tables."""
+    rnd = random.Random(42)
+    objects = [obj["id"] for obj in database.get_all_objects_admin()]
+    start = date(2029, 1, 1)
+    rows = []
+    for i in range(bookings):
+        day = start + timedelta(days=rnd.randrange(730))
+        status = rnd.choice(("pending", "confirmed", "cancelled"))
+        rows.append((rnd.choice(objects), day.isoformat(), 1000 + i, "Name", "1234567", status))
+    conn = database.get_connection()
+    conn.executemany(
+        "INSERT INTO bookings (object_id, date, user_id, user_name, user_phone, status) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO object_manual_blocks (object_id, date, admin_id) VALUES (?, ?, 1)",
+        [(rnd.choice(objects), (start + timedelta(days=rnd.randrange(730))).isoformat()) for _ in range(bookings // 10)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _capture(func: Callable[[], object]) -> List[str]:
+    """Run func and return the SQL statements it executed."""
+    statements: List[str] = []
+    original = database.get_connection
+
+    def traced_connection():
+        conn = original()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    database.get_connection = traced_connection
+    try:
+        func()
+    finally:
+        database.get_connection = original
+    return [s for s in statements if s.lstrip().upper().startswith(_EXPLAINED_PREFIXES)]
+
+
+def _plan(sql: str) -> List[str]:
+    conn = database.get_connection()
+    try:
+        return [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    finally:
+        conn.close()
+
+
+def _problems(name: str, plan: List[str]) -> List[str]:
+    """Plan lines that are full scans or temp B-trees and not allowed for this call."""
+    allowed = [fragment for fragment, _ in ALLOWED.get(name, ())]
+    result = []
+    for line in plan:
+        full_scan = line.startswith("SCAN ") and " USING " not in line
+        temp_btree = "USE TEMP B-TREE" in line
+        if not (full_scan or temp_btree):
+            continue
+        if any(fragment in line for fragment in allowed):
+            continue
+        result.append(line)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check query plans of database.py")
+    parser.add_argument("--bookings", type=int, default=5000, help="Seeded bookings count")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    flagged = 0
+    with tempfile.TemporaryDirectory(prefix="query_plan_") as tmp_dir:
+        database.DATA_DIR = tmp_dir
+        database.DB_PATH = os.path.join(tmp_dir, "bot.db")
+        database.init_db()
+        _seed(args.bookings)
+
+        for name, func in REGISTERED_CALLS.items():
+            for sql in _capture(func):
+                plan = _plan(sql)
+                problems = _problems(name, plan)
+                if problems:
+                    flagged += 1
+                if problems or args.verbose:
+                    print(f"{'FLAG' if problems else 'ok  '} {name}: {' '.join(sql.split())}")
+                    for line in plan:
+                        marker = "!!" if line in problems else "  "
+                        print(f"     {marker} {line}")
+
+    print(f"calls: {len(REGISTERED_CALLS)}, flagged statements: {flagged}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Run the same conformance checks against every storage backend.
+
+Workflow:
+- Build a fresh backend (SQLite in a temporary directory, in-memory).
+- Run each check; a check returns a value and raises AssertionError on failure.
+- Compare the values returned by all backends (timestamps are ignored).
+- Optionally time a simple booking workload per backend.
+
+Exit code is 1 when a check fails or the backends disagree.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import database  # noqa: E402
+from storage import BookingStorage, MemoryStorage, SQLiteStorage  # noqa: E402
+
+_VOLATILE_FIELDS = {"created_at", "updated_at"}
+
+
+def _normalize(value):
+    """Drop timestamps so results of different backends can be compared."""
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if k not in _VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def check_objects(s: BookingStorage):
+    houses = s.get_objects_by_category("house")
+    assert [o["name"] for o in houses] == ["Домик №1", "Домик №2", "Домик №3", "Домик №4"]
+    assert s.update_object(houses[0]["id"], is_active=0, unknown=1)
+    assert not s.update_object(houses[0]["id"], unknown=1)
+    assert len(s.get_objects_by_category("house")) == 3
+    assert len(s.get_all_objects_admin()) == len(s.get_all_objects()) + 1
+    assert s.get_object_by_id(10_000) is None
+    return s.get_all_objects_admin()
+
+
+def check_booking_lifecycle(s: BookingStorage):
+    first = s.create_booking(1, "2030-05-10", 100, "Анна", "+7 900 000-00-00")
+    assert first is not None
+    assert s.create_booking(1, "2030-05-10", 101, "Борис", "1234567") is None
+    assert s.get_day_status(1, "2030-05-10") == "pending"
+    assert s.confirm_booking(first, 1)
+    assert not s.confirm_booking(first, 1)
+    assert s.get_day_status(1, "2030-05-10") == "booked"
+    assert s.cancel_booking(first, 1)
+    assert s.get_day_status(1, "2030-05-10") == "available"
+    second = s.create_booking(1, "2030-05-10", 101, "Борис", "1234567")
+    assert second is not None
+    assert s.reject_booking(second, 2)
+    assert not s.cancel_booking(second, 2)
+    return [s.get_booking_by_id(first), s.get_booking_by_id(second), s.get_booking_by_id(10_000)]
+
+
+def check_manual_blocks(s: BookingStorage):
+    assert s.toggle_object_manual_block(2, "2030-06-01", 1) == "blocked"
+    assert s.is_manual_blocked(2, "2030-06-01")
+    assert s.get_day_status(2, "2030-06-01") == "booked"
+    assert s.create_booking(2, "2030-06-01", 1, "A", "1234567") is None
+    assert s.toggle_object_manual_block(2, "2030-06-02", 1) == "blocked"
+    assert s.toggle_object_manual_block(2, "2030-06-02", 1) == "unblocked"
+    return s.get_bookings_for_object_month(2, 2030, 6)
+
+
+def check_month_and_lists(s: BookingStorage):
+    ids = [s.create_booking(3, f"2030-12-{day:02d}", 200 + day, "Имя", "1234567") for day in (31, 1, 15)]
+    s.create_booking(3, "2031-01-01", 300, "Имя", "1234567")
+    s.create_booking(4, "2030-12-15", 301, "Имя", "1234567")
+    s.toggle_object_manual_block(3, "2030-12-20", 1)
+    assert s.confirm_booking(ids[1], 1)
+    month = s.get_bookings_for_object_month(3, 2030, 12)
+    assert [b["date"] for b in month] == ["2030-12-01", "2030-12-15", "2030-12-20", "2030-12-31"]
+    pending = s.get_pending_bookings()
+    assert ids[1] not in [b["id"] for b in pending]
+    by_date = s.get_bookings_by_date("2030-12-15")
+    assert [b["object_id"] for b in by_date] == [3, 4]
+    calendar = s.get_calendar_data_for_api(3, 2030, 12)
+    assert calendar["2030-12-01"] == "booked" and calendar["2030-12-15"] == "partially"
+    assert calendar["2030-12-20"] == "booked" and calendar["2030-12-02"] == "available"
+    return [month, pending, by_date, calendar]
+
+
+def check_bulk_status(s: BookingStorage):
+    ids = [s.create_booking(object_id, "2030-07-01", 400 + object_id, "Имя", "1234567") for object_id in (1, 2, 3)]
+    other_day = s.create_booking(1, "2030-07-02", 410, "Имя", "1234567")
+    assert s.get_pending_booking_ids(date_str="2030-07-01") == ids
+    assert s.get_pending_booking_ids(object_id=1) == [ids[0], other_day]
+    assert s.confirm_booking(ids[1], 1)
+    confirmed = s.confirm_bookings([ids[2], ids[0], ids[1], ids[0]], 2)
+    assert [b["id"] for b in confirmed] == [ids[0], ids[2]]
+    assert all(b["status"] == "confirmed" and b["admin_id"] == 2 for b in confirmed)
+    rejected = s.reject_bookings([other_day, 10_000], 3)
+    assert [b["id"] for b in rejected] == [other_day]
+    assert s.reject_bookings([], 3) == []
+    assert s.get_pending_booking_ids(object_id=1) == []
+    return [confirmed, rejected]
+
+
+def check_expire_pending(s: BookingStorage):
+    ids = [s.create_booking(object_id, "2030-08-01", 500 + object_id, "Имя", "1234567") for object_id in (1, 2, 3)]
+    assert s.confirm_booking(ids[1], 1)
+    assert s.expire_pending_bookings("2000-01-01 00:00:00", 10) == []
+    first = s.expire_pending_bookings("2100-01-01 00:00:00", 1)
+    assert [b["id"] for b in first] == [ids[0]]
+    rest = s.expire_pending_bookings("2100-01-01 00:00:00", 10)
+    assert [b["id"] for b in rest] == [ids[2]]
+    assert all(b["status"] == "cancelled" and b["admin_id"] is None for b in first + rest)
+    assert s.get_day_status(1, "2030-08-01") == "available"
+    assert s.get_pending_booking_ids() == []
+    return [first, rest]
+
+
+def check_free_objects_on_date(s: BookingStorage):
+    fishing = s.get_objects_by_category("gazebo_fishing")
+    day = "2030-09-01"
+    assert s.get_free_objects_on_date("gazebo_fishing", day) == fishing
+    booked = s.create_booking(fishing[0]["id"], day, 600, "Имя", "1234567")
+    s.create_booking(fishing[1]["id"], day, 601, "Имя", "1234567")
+    assert s.confirm_booking(booked, 1)
+    s.toggle_object_manual_block(fishing[2]["id"], day, 1)
+    cancelled = s.create_booking(fishing[3]["id"], day, 602, "Имя", "1234567")
+    assert s.reject_booking(cancelled, 1)
+    free = s.get_free_objects_on_date("gazebo_fishing", day)
+    assert [o["id"] for o in free] == [o["id"] for o in fishing[3:]]
+    large = s.get_free_objects_on_date("gazebo_fishing", day, guests=8)
+    assert large and all(o["capacity"] >= 8 for o in large)
+    assert s.get_free_objects_on_date("gazebo_fishing", "2030-09-02", guests=100) == []
+    return [free, large]
+
+
+CHECKS: List[Callable[[BookingStorage], object]] = [
+    check_objects,
+    check_booking_lifecycle,
+    check_manual_blocks,
+    check_month_and_lists,
+    check_bulk_status,
+    check_expire_pending,
+    check_free_objects_on_date,
+]
+
+
+def _workload(s: BookingStorage, bookings: int) -> float:
+    """Create, confirm and read back bookings; returns seconds spent."""
+    objects = [o["id"] for o in s.get_all_objects()]
+    started = time.perf_counter()
+    for i in range(bookings):
+        object_id = objects[i % len(objects)]
+        date_str = f"{2040 + i // 4000:04d}-{1 + (i // 300) % 12:02d}-{1 + i % 28:02d}"
+        booking_id = s.create_booking(object_id, date_str, i, "Load", "1234567")
+        if booking_id and i % 2:
+            s.confirm_booking(booking_id, 1)
+        s.get_bookings_for_object_month(object_id, int(date_str[:4]), int(date_str[5:7]))
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Storage backends conformance check")
+    parser.add_argument("--bench", type=int, default=0, help="Also time N bookings per backend")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="storage_conformance_") as tmp_dir:
+        def sqlite_factory() -> BookingStorage:
+            path = os.path.join(tmp_dir, f"bot-{time.perf_counter_ns()}.db")
+            database.DATA_DIR = tmp_dir
+            database.DB_PATH = path
+            database.init_db()
+            return SQLiteStorage()
+
+        factories: Dict[str, Callable[[], BookingStorage]] = {
+            "sqlite": sqlite_factory,
+            "memory": MemoryStorage,
+        }
+
+        failed = 0
+        for check in CHECKS:
+            results = {}
+            for name, factory in factories.items():
+                try:
+                    results[name] = _normalize(check(factory()))
+                    print(f"ok   {check.__name__} [{name}]")
+                except AssertionError as e:
+                    failed += 1
+                    print(f"FAIL {check.__name__} [{name}]: {e!r}")
+            values = list(results.values())
+            if len(values) == len(factories) and any(v != values[0] for v in values[1:]):
+                failed += 1
+                print(f"FAIL {check.__name__}: backends returned different results")
+
+        if args.bench:
+            for name, factory in factories.items():
+                print(f"bench {name}: {args.bench} bookings in {_workload(factory(), args.bench):.2f} s")
+
+    print(f"checks: {len(CHECKS)}, failures: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())